@@ -0,0 +1,62 @@
+"""add_workflow_checkpoints
+
+Revision ID: d4e9f3a2b8c5
+Revises: c3d8e2f1a7b4
+Create Date: 2026-10-17 11:02:47.913520
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e9f3a2b8c5'
+down_revision: Union[str, None] = 'c3d8e2f1a7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('workflow_runs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('workflow', sa.JSON(), nullable=False),
+    sa.Column('initial_context', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_runs_id'), 'workflow_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_workflow_runs_user_id'), 'workflow_runs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_workflow_runs_status'), 'workflow_runs', ['status'], unique=False)
+    op.create_table('workflow_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.String(length=36), nullable=False),
+    sa.Column('step_index', sa.Integer(), nullable=False),
+    sa.Column('step_key', sa.String(length=64), nullable=False),
+    sa.Column('agent', sa.String(length=50), nullable=False),
+    sa.Column('task', sa.String(length=255), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['workflow_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_checkpoints_id'), 'workflow_checkpoints', ['id'], unique=False)
+    op.create_index(op.f('ix_workflow_checkpoints_run_id'), 'workflow_checkpoints', ['run_id'], unique=False)
+    op.create_index(op.f('ix_workflow_checkpoints_step_key'), 'workflow_checkpoints', ['step_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_workflow_checkpoints_step_key'), table_name='workflow_checkpoints')
+    op.drop_index(op.f('ix_workflow_checkpoints_run_id'), table_name='workflow_checkpoints')
+    op.drop_index(op.f('ix_workflow_checkpoints_id'), table_name='workflow_checkpoints')
+    op.drop_table('workflow_checkpoints')
+    op.drop_index(op.f('ix_workflow_runs_status'), table_name='workflow_runs')
+    op.drop_index(op.f('ix_workflow_runs_user_id'), table_name='workflow_runs')
+    op.drop_index(op.f('ix_workflow_runs_id'), table_name='workflow_runs')
+    op.drop_table('workflow_runs')
@@ -18,6 +18,7 @@ from app.services.paper_service import paper_service
 from app.services.citation_service import citation_service
 from app.services.agent_service import agent_coordinator
 from app.services.token_service import token_service
+from app.services.job_service import job_service
 from app.services.translation_service import TranslationService
 
 # OAuth2 密码Bearer
@@ -191,6 +192,10 @@ def get_token_service() -> Generator:
     """获取Token服务"""
     yield token_service
 
+def get_job_service() -> Generator:
+    """获取后台任务服务"""
+    yield job_service
+
 def get_translation_service() -> Generator:
     """获取翻译服务"""
     # 创建翻译服务实例，使用默认LLM服务或专用LLM服务
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import topics, outlines, papers, citations, search, agents, tokens, mcp, mcp_external, auth, users, interests, translation
+from .endpoints import topics, outlines, papers, citations, search, agents, tokens, mcp, mcp_external, auth, users, interests, translation, jobs
 
 api_router = APIRouter()
 
@@ -21,7 +21,8 @@ async def api_root():
             "auth": "/auth",
             "users": "/users",
             "interests": "/interests",
-            "translation": "/translation"
+            "translation": "/translation",
+            "jobs": "/jobs"
         }
     }
 
@@ -64,5 +65,8 @@ api_router.include_router(interests.router, prefix="/interests", tags=["interest
 # 翻译相关路由
 api_router.include_router(translation.router, prefix="/translation", tags=["translation"])
 
+# 后台任务相关路由
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+
 # 导出路由器供主应用使用
 __all__ = ["api_router"]
\ No newline at end of file
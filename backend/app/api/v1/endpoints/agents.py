@@ -9,9 +9,11 @@ from app.schemas.agent import (
     PlanRequest,
     PlanResponse,
     PlanAndExecuteRequest,
-    PlanAndExecuteResponse
+    PlanAndExecuteResponse,
+    WorkflowRunResponse
 )
-from app.services.agent_service import AgentCoordinator
+from app.services.agent_service import AgentCoordinator, WorkflowExecutionError
+from app.services.workflow_checkpoint_service import workflow_checkpoint_service
 from app.api.deps import get_agent_coordinator
 
 router = APIRouter()
@@ -45,9 +47,47 @@ async def execute_workflow(
             initial_context=request.context
         )
         return result
+    except WorkflowExecutionError as e:
+        # 返回运行ID，调用方可以通过/workflow/runs/{run_id}查询或恢复
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"执行工作流失败: {str(e.cause)}", "run_id": e.run_id}
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"执行工作流失败: {str(e)}")
 
+@router.get("/workflow/runs/{run_id}", response_model=WorkflowRunResponse)
+async def get_workflow_run(run_id: str):
+    """获取工作流运行记录和已完成的步骤"""
+    run = await workflow_checkpoint_service.load_run(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="工作流运行记录不存在")
+    return {
+        "run_id": run["run_id"],
+        "status": run["status"],
+        "error": run["error"],
+        "total_steps": len(run["workflow"]),
+        "completed_steps": run["completed_steps"]
+    }
+
+@router.post("/workflow/runs/{run_id}/resume", response_model=WorkflowResponse)
+async def resume_workflow(
+    run_id: str,
+    agent_coordinator: AgentCoordinator = Depends(get_agent_coordinator)
+):
+    """恢复执行工作流，已完成的步骤从检查点恢复"""
+    try:
+        return await agent_coordinator.resume_workflow(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except WorkflowExecutionError as e:
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"恢复工作流失败: {str(e.cause)}", "run_id": e.run_id}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"恢复工作流失败: {str(e)}")
+
 @router.post("/plan", response_model=PlanResponse)
 async def generate_plan(
     request: PlanRequest,
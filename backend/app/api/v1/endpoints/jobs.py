@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import List, AsyncGenerator
+from sqlalchemy.orm import Session
+import asyncio
+import json
+
+from app.schemas.job import JobSubmitRequest, JobResponse, JobResultResponse
+from app.services.job_service import JobService, TERMINAL_STATUSES
+from app.api.deps import get_job_service, get_db, get_current_active_user
+from app.db.session import SessionLocal
+from app.models.user import User
+from app.models.job import Job
+from app.core.logger import get_logger
+
+# 创建日志器
+logger = get_logger("jobs_api")
+
+router = APIRouter()
+
+def _get_user_job(job_service: JobService, db: Session, job_id: str, current_user: User) -> Job:
+    """获取当前用户的任务，不存在或无权访问时返回404"""
+    job = job_service.get_job(db, job_id)
+    if job is None or (job.user_id != current_user.id and not current_user.is_superuser):
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+@router.post("", response_model=JobResponse)
+async def submit_job(
+    request: JobSubmitRequest,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """提交后台任务"""
+    if request.job_type not in job_service.handlers:
+        raise HTTPException(status_code=400, detail=f"未知的任务类型: {request.job_type}")
+    try:
+        return job_service.submit(db, request.job_type, request.params, user_id=current_user.id)
+    except Exception as e:
+        logger.error(f"提交任务失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交任务失败: {str(e)}")
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    limit: int = 20,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取当前用户的任务列表"""
+    return job_service.list_jobs(db, user_id=current_user.id, limit=limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取任务状态和最近的进度事件"""
+    return _get_user_job(job_service, db, job_id, current_user)
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取任务结果，任务未结束时返回409"""
+    job = _get_user_job(job_service, db, job_id, current_user)
+    if job.status not in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"任务尚未结束，当前状态: {job.status}")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """取消任务"""
+    _get_user_job(job_service, db, job_id, current_user)
+    return job_service.cancel(db, job_id)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    job_id: str,
+    job_service: JobService = Depends(get_job_service),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """以SSE方式推送任务进度事件，任务结束时推送最终状态"""
+    _get_user_job(job_service, db, job_id, current_user)
+
+    async def generate_stream() -> AsyncGenerator[bytes, None]:
+        last_seq = 0
+        while True:
+            # 每次轮询使用新的会话，读取其他进程写入的最新状态
+            poll_db = SessionLocal()
+            try:
+                job = job_service.get_job(poll_db, job_id)
+                if job is None:
+                    break
+                for event in job.events or []:
+                    if event.get("seq", 0) > last_seq:
+                        last_seq = event["seq"]
+                        yield f"data: {json.dumps({'type': 'progress', **event}, ensure_ascii=False)}\n\n".encode('utf-8')
+                if job.status in TERMINAL_STATUSES:
+                    status_msg = {"type": "status", "status": job.status, "error": job.error}
+                    yield f"data: {json.dumps(status_msg, ensure_ascii=False)}\n\n".encode('utf-8')
+                    break
+            finally:
+                poll_db.close()
+            await asyncio.sleep(job_service.poll_interval)
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncGenerator
+import json
 
 from app.schemas.paper import (
     PaperSectionRequest,
@@ -47,6 +49,30 @@ async def generate_full_paper(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"生成完整论文失败: {str(e)}")
 
+@router.post("/generate/stream")
+async def generate_full_paper_stream(
+    request: FullPaperRequest,
+    paper_service: PaperService = Depends(get_paper_service)
+):
+    """流式生成完整论文（SSE），每个章节完成后立即推送，最后推送摘要和完整论文"""
+    async def generate_stream() -> AsyncGenerator[bytes, None]:
+        async for event in paper_service.generate_full_paper_streaming(
+            topic=request.topic,
+            outline=request.outline,
+            literature=request.literature
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8')
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.post("/improve", response_model=SectionImprovementResponse)
 async def improve_section(
     request: SectionImprovementRequest,
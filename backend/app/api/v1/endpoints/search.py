@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncGenerator
+import json
 
 from app.schemas.search import (
     SearchRequest,
     SearchResponse,
     PaperDetailRequest,
     PaperDetailResponse,
+    PaperBatchRequest,
+    PaperBatchResponse,
     TrendRequest,
-    TrendResponse
+    TrendResponse,
+    CacheInvalidateRequest,
+    CacheInvalidateResponse
 )
+from app.models.user import User
 from app.services.academic_search_service import AcademicSearchService
-from app.api.deps import get_academic_search_service
+from app.services.cache_service import cache_service
+from app.api.deps import get_academic_search_service, get_current_active_superuser
 
 router = APIRouter()
 
@@ -44,7 +52,8 @@ async def search_literature(
             sort_by=request.sort_by,
             years=request.years,
             categories=request.categories,
-            fields=request.fields
+            fields=request.fields,
+            use_local_index=request.use_local_index
         )
 
         # 验证搜索结果
@@ -68,7 +77,10 @@ async def search_literature(
             "results": results,
             "total": total,
             "query": request.query,
-            "sources_stats": sources_stats
+            "sources_stats": sources_stats,
+            "sources_latency": search_result.get("sources_latency", {}),
+            "timed_out_sources": search_result.get("timed_out_sources", []),
+            "failed_sources": search_result.get("failed_sources", [])
         }
     except Exception as e:
         # 记录详细错误信息
@@ -81,6 +93,58 @@ async def search_literature(
         # 返回友好的错误信息
         raise HTTPException(status_code=500, detail=f"搜索文献失败: {str(e)}")
 
+@router.post("/literature/stream")
+async def search_literature_stream(
+    request: SearchRequest,
+    http_request: Request,
+    search_service: AcademicSearchService = Depends(get_academic_search_service)
+):
+    """流式搜索学术文献，每个搜索源返回后立即推送去重后的新结果，最后推送合并排序后的最终结果
+
+    默认使用SSE；请求头Accept为application/x-ndjson时每行输出一个JSON事件。
+    """
+    import logging
+    logger = logging.getLogger("app")
+    logger.info(f"开始流式搜索学术文献: 查询={request.query}, 限制={request.limit}, 来源={request.sources}, 排序={request.sort_by}")
+
+    ndjson = "application/x-ndjson" in http_request.headers.get("accept", "")
+
+    def encode(event: Dict[str, Any]) -> bytes:
+        data = json.dumps(event, ensure_ascii=False)
+        return f"{data}\n".encode('utf-8') if ndjson else f"data: {data}\n\n".encode('utf-8')
+
+    async def generate_stream() -> AsyncGenerator[bytes, None]:
+        # 参数验证
+        if not request.query or not request.query.strip():
+            logger.warning("搜索查询为空")
+            yield encode({"type": "final", "results": [], "total": 0, "query": request.query, "sources_stats": {}})
+            return
+        try:
+            async for event in search_service.search_academic_papers_stream(
+                query=request.query,
+                limit=request.limit,
+                sources=request.sources,
+                sort_by=request.sort_by,
+                years=request.years,
+                categories=request.categories,
+                fields=request.fields,
+                use_local_index=request.use_local_index
+            ):
+                yield encode(event)
+        except Exception as e:
+            logger.error(f"流式搜索文献失败: {str(e)}")
+            yield encode({"type": "error", "message": f"搜索文献失败: {str(e)}"})
+
+    return StreamingResponse(
+        generate_stream(),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.post("/paper", response_model=PaperDetailResponse)
 async def get_paper_details(
     request: PaperDetailRequest,
@@ -125,6 +189,36 @@ async def get_paper_details(
         # 返回友好的错误信息
         raise HTTPException(status_code=500, detail=f"获取论文详情失败: {str(e)}")
 
+@router.post("/papers/batch", response_model=PaperBatchResponse)
+async def get_papers_details_batch(
+    request: PaperBatchRequest,
+    search_service: AcademicSearchService = Depends(get_academic_search_service)
+):
+    """批量获取Semantic Scholar论文详情"""
+    try:
+        import logging
+        logger = logging.getLogger("app")
+        logger.info(f"开始批量获取论文详情: {len(request.paper_ids)} 篇")
+
+        papers = await search_service.get_papers_details_batch(request.paper_ids)
+        missing = [pid for pid in dict.fromkeys(request.paper_ids) if pid not in papers]
+
+        logger.info(f"批量获取论文详情成功: 找到 {len(papers)} 篇，未找到 {len(missing)} 篇")
+        return {
+            "papers": papers,
+            "missing": missing
+        }
+    except Exception as e:
+        # 记录详细错误信息
+        import traceback
+        import logging
+        logger = logging.getLogger("app")
+        logger.error(f"批量获取论文详情失败: {str(e)}")
+        logger.error(traceback.format_exc())
+
+        # 返回友好的错误信息
+        raise HTTPException(status_code=500, detail=f"批量获取论文详情失败: {str(e)}")
+
 @router.post("/trends", response_model=TrendResponse)
 async def get_research_trends(
     request: TrendRequest,
@@ -206,3 +300,20 @@ async def get_research_trends(
             "trends": [],
             "field": request.field
         }
+
+@router.post("/cache/invalidate", response_model=CacheInvalidateResponse)
+async def invalidate_search_cache(
+    request: CacheInvalidateRequest,
+    _: User = Depends(get_current_active_superuser)  # 只允许超级管理员访问
+):
+    """按标签或命名空间使搜索缓存失效（管理员专用），例如某个搜索源故障恢复后只清除该搜索源的结果"""
+    try:
+        invalidated = await cache_service.invalidate_tags(request.tags)
+        for namespace in request.namespaces:
+            invalidated.extend(await cache_service.invalidate_namespace(namespace))
+        return {"invalidated": invalidated}
+    except Exception as e:
+        import logging
+        logger = logging.getLogger("app")
+        logger.error(f"缓存失效失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"缓存失效失败: {str(e)}")
@@ -6,4 +6,7 @@ from app.models.topic import Topic
 from app.models.outline import Outline
 from app.models.paper import Paper
 from app.models.citation import Citation
-from app.models.token_usage import TokenUsage
\ No newline at end of file
+from app.models.token_usage import TokenUsage
+from app.models.job import Job
+from app.models.workflow_run import WorkflowRun
+from app.models.workflow_checkpoint import WorkflowCheckpoint
@@ -6,6 +6,10 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.api.v1 import api_router
 from app.services.mcp_adapter import mcp_adapter
+from app.services.job_service import job_service
+from app.services.source_executor import source_executor
+from app.services.literature_index import literature_index
+from app.services.cache_service import cache_service
 from app.core.config import settings
 from app.core.logger import setup_logging
 from app.db.session import SessionLocal
@@ -82,6 +86,27 @@ async def startup_event():
         except Exception as e:
             print(f"MCP适配器初始化失败: {str(e)}")
 
+    # 在API进程内启动后台任务工作池（也可以通过scripts/run_job_worker.py独立运行）
+    if settings.config.get("jobs", {}).get("run_in_api", True):
+        try:
+            job_service.start()
+        except Exception as e:
+            print(f"后台任务工作池启动失败: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 停止工作池，正在执行的任务重新排队
+    await job_service.stop()
+
+    # 关闭搜索源线程池
+    source_executor.shutdown()
+
+    # 关闭本地文献索引
+    literature_index.close()
+
+    # 关闭Redis缓存连接
+    await cache_service.close()
+
 @app.get("/")
 async def root():
     return {"message": "欢迎使用学术论文辅助平台"}
@@ -4,5 +4,8 @@ from .outline import Outline
 from .paper import Paper
 from .citation import Citation
 from .token_usage import TokenUsage
+from .job import Job
+from .workflow_run import WorkflowRun
+from .workflow_checkpoint import WorkflowCheckpoint
 
-__all__ = ["User", "Topic", "Outline", "Paper", "Citation", "TokenUsage"]
\ No newline at end of file
+__all__ = ["User", "Topic", "Outline", "Paper", "Citation", "TokenUsage", "Job", "WorkflowRun", "WorkflowCheckpoint"]
\ No newline at end of file
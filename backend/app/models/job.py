@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Boolean
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class Job(Base):
+    """后台任务模型"""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, index=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    job_type = Column(String(50), nullable=False, index=True)  # full_paper, workflow, predefined_workflow, plan_and_execute
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, running, succeeded, failed, cancelled
+    params = Column(JSON, nullable=True)  # 任务参数
+    result = Column(JSON, nullable=True)  # 任务结果
+    error = Column(Text, nullable=True)
+    progress = Column(Integer, nullable=False, default=0)  # 进度百分比 0-100
+    progress_message = Column(String(255), nullable=True)
+    events = Column(JSON, nullable=True)  # 最近的进度事件列表
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    worker_id = Column(String(100), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<Job(id='{self.id}', job_type='{self.job_type}', status='{self.status}')>"
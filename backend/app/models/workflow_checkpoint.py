@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class WorkflowCheckpoint(Base):
+    """工作流步骤检查点，按智能体、任务和解析后的输入的哈希保存步骤结果"""
+    __tablename__ = "workflow_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String(36), ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False, index=True)
+    step_index = Column(Integer, nullable=False)
+    step_key = Column(String(64), nullable=False, index=True)  # sha256(agent, task, 解析后的输入)
+    agent = Column(String(50), nullable=False)
+    task = Column(String(255), nullable=False)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<WorkflowCheckpoint(run_id='{self.run_id}', step_index={self.step_index}, task='{self.task}')>"
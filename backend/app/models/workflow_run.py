@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class WorkflowRun(Base):
+    """智能体工作流运行记录，保存工作流定义和初始上下文以便恢复执行"""
+    __tablename__ = "workflow_runs"
+
+    id = Column(String(36), primary_key=True, index=True)  # UUID
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    workflow = Column(JSON, nullable=False)  # 工作流步骤
+    initial_context = Column(JSON, nullable=True)
+    status = Column(String(20), nullable=False, default="running", index=True)  # running, succeeded, failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<WorkflowRun(id='{self.id}', status='{self.status}')>"
@@ -31,6 +31,8 @@ class WorkflowResponse(BaseModel):
     """工作流响应"""
     workflow_results: List[WorkflowStepResult] = Field(..., description="工作流结果")
     final_context: Dict[str, Any] = Field(..., description="最终上下文")
+    run_id: Optional[str] = Field(None, description="工作流运行ID，失败后可用于恢复执行")
+    resumed_steps: int = Field(0, description="从检查点恢复的步骤数")
 
 class PlanRequest(BaseModel):
     """规划请求"""
@@ -50,3 +52,19 @@ class PlanAndExecuteResponse(BaseModel):
     """规划并执行响应"""
     workflow_results: List[WorkflowStepResult] = Field(..., description="工作流结果")
     final_context: Dict[str, Any] = Field(..., description="最终上下文")
+    run_id: Optional[str] = Field(None, description="工作流运行ID，失败后可用于恢复执行")
+    resumed_steps: int = Field(0, description="从检查点恢复的步骤数")
+
+class WorkflowRunStep(BaseModel):
+    """已完成的工作流步骤"""
+    step_index: int = Field(..., description="步骤序号")
+    agent: str = Field(..., description="智能体ID")
+    task: str = Field(..., description="任务描述")
+
+class WorkflowRunResponse(BaseModel):
+    """工作流运行记录"""
+    run_id: str = Field(..., description="工作流运行ID")
+    status: str = Field(..., description="状态: running, succeeded, failed")
+    error: Optional[str] = Field(None, description="错误信息")
+    total_steps: int = Field(..., description="总步骤数")
+    completed_steps: List[WorkflowRunStep] = Field(..., description="已保存检查点的步骤")
@@ -0,0 +1,44 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class JobSubmitRequest(BaseModel):
+    """后台任务提交请求"""
+    job_type: str = Field(..., description="任务类型: full_paper, workflow, predefined_workflow, plan_and_execute")
+    params: Dict[str, Any] = Field(default_factory=dict, description="任务参数")
+
+class JobEvent(BaseModel):
+    """任务进度事件"""
+    seq: int = Field(..., description="事件序号")
+    time: str = Field(..., description="时间")
+    progress: int = Field(..., description="进度百分比")
+    message: str = Field(..., description="进度消息")
+    data: Optional[Any] = Field(None, description="事件数据")
+
+class JobResponse(BaseModel):
+    """后台任务状态"""
+    id: str = Field(..., description="任务ID")
+    job_type: str = Field(..., description="任务类型")
+    status: str = Field(..., description="状态: pending, running, succeeded, failed, cancelled")
+    progress: int = Field(0, description="进度百分比")
+    progress_message: Optional[str] = Field(None, description="最新进度消息")
+    error: Optional[str] = Field(None, description="错误信息")
+    attempts: int = Field(0, description="执行次数")
+    cancel_requested: bool = Field(False, description="是否已请求取消")
+    created_at: Optional[datetime] = Field(None, description="创建时间")
+    started_at: Optional[datetime] = Field(None, description="开始时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+    events: Optional[List[JobEvent]] = Field(None, description="最近的进度事件")
+
+    class Config:
+        from_attributes = True
+
+class JobResultResponse(BaseModel):
+    """后台任务结果"""
+    id: str = Field(..., description="任务ID")
+    status: str = Field(..., description="状态")
+    result: Optional[Any] = Field(None, description="任务结果")
+    error: Optional[str] = Field(None, description="错误信息")
+
+    class Config:
+        from_attributes = True
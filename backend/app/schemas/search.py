@@ -10,6 +10,7 @@ class SearchRequest(BaseModel):
     years: str = Field("all", description="年份范围：all, last_1, last_5, last_10")
     categories: Optional[List[str]] = Field(None, description="arXiv类别列表")
     fields: Optional[List[str]] = Field(None, description="返回字段列表")
+    use_local_index: Optional[bool] = Field(None, description="是否先查询本地文献索引，为空时使用配置")
 
 class Paper(BaseModel):
     """学术论文"""
@@ -21,6 +22,7 @@ class Paper(BaseModel):
     venue: Optional[str] = Field(None, description="发表期刊/会议")
     citations: Optional[int] = Field(None, description="引用次数")
     source: str = Field(..., description="来源")
+    relevance_score: Optional[float] = Field(None, description="与查询的相关性得分（按相关性排序时返回）")
 
 class SearchResponse(BaseModel):
     """学术搜索响应"""
@@ -28,6 +30,9 @@ class SearchResponse(BaseModel):
     total: int = Field(..., description="总结果数")
     query: str = Field(..., description="搜索查询")
     sources_stats: Dict[str, int] = Field({}, description="各搜索源的结果数量")
+    sources_latency: Dict[str, int] = Field({}, description="各搜索源的耗时（毫秒），仅并发查询时返回")
+    timed_out_sources: List[str] = Field([], description="超过截止时间的搜索源")
+    failed_sources: List[str] = Field([], description="查询失败的搜索源")
 
 class PaperDetailRequest(BaseModel):
     """论文详情请求"""
@@ -46,6 +51,15 @@ class PaperDetailResponse(BaseModel):
     references: Optional[List[Dict[str, Any]]] = Field(None, description="参考文献")
     source: str = Field(..., description="来源")
 
+class PaperBatchRequest(BaseModel):
+    """批量论文详情请求"""
+    paper_ids: List[str] = Field(..., description="Semantic Scholar论文ID列表")
+
+class PaperBatchResponse(BaseModel):
+    """批量论文详情响应"""
+    papers: Dict[str, PaperDetailResponse] = Field({}, description="论文ID到论文详情的映射")
+    missing: List[str] = Field([], description="未找到的论文ID")
+
 class TrendRequest(BaseModel):
     """研究趋势请求"""
     field: str = Field(..., description="学术领域")
@@ -62,3 +76,12 @@ class TrendResponse(BaseModel):
     """研究趋势响应"""
     trends: List[Trend] = Field(..., description="研究趋势")
     field: str = Field(..., description="学术领域")
+
+class CacheInvalidateRequest(BaseModel):
+    """缓存失效请求"""
+    tags: Dict[str, Any] = Field(default_factory=dict, description="要失效的标签，如{\"source\": \"arxiv\"}，值为列表时每个元素一个标签")
+    namespaces: List[str] = Field(default_factory=list, description="要失效的命名空间，如academic_papers_search")
+
+class CacheInvalidateResponse(BaseModel):
+    """缓存失效响应"""
+    invalidated: List[str] = Field(..., description="已失效的标签")
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncGenerator
 import asyncio
 import httpx
 import time
@@ -8,10 +8,32 @@ import arxiv
 from app.core.config import settings
 from app.core.logger import get_logger
 from app.services.cache_service import cache_service
+from app.services.source_executor import source_executor, SourceTimeoutError
+from app.services.source_rate_limiter import source_rate_limiter
+from app.services.arxiv_client import arxiv_client
+from app.services.literature_index import literature_index
+from app.services.paper_dedup import paper_deduplicator, normalize_title
+from app.services.reranker import reranker
 
 # 创建日志器
 logger = get_logger("academic_search")
 
+
+def _search_cache_tags(params: Dict[str, Any]) -> Dict[str, Any]:
+    """综合搜索缓存的标签：每个可能提供结果的搜索源，某个搜索源的缓存失效时这些综合结果同样失效"""
+    search_sources = params["self"]._resolve_sources(params.get("sources"))
+    return {"source": [name for name, enabled in search_sources.items() if enabled]}
+
+
+def _is_complete_search(result: Dict[str, Any]) -> bool:
+    """综合搜索结果是否可以缓存：有结果，且没有搜索源超时或失败；否则一个慢或故障的上游会使降级结果被缓存整个TTL"""
+    return bool(
+        isinstance(result, dict)
+        and result.get("results")
+        and not result.get("timed_out_sources")
+        and not result.get("failed_sources")
+    )
+
 class AcademicSearchService:
     """学术搜索服务，用于搜索和获取学术文献"""
 
@@ -42,17 +64,31 @@ class AcademicSearchService:
         )
         self.use_semantic_scholar_api_key = self.semantic_scholar_config.get("use_api_key", True)
         self.semantic_scholar_api_key = settings.SEMANTIC_SCHOLAR_API_KEY if self.use_semantic_scholar_api_key else None
+        # /paper/batch每次请求的最大ID数（API上限为500）
+        self.semantic_scholar_batch_size = min(self.semantic_scholar_config.get("batch_size", 100), 500)
 
         # arXiv配置
         self.arxiv_config = self.config.get("arxiv", {})
         self.arxiv_sort_by = self.arxiv_config.get("sort_by", "relevance")
         self.arxiv_categories = self.arxiv_config.get("categories", [])
+        # 异步arXiv客户端共享本服务的httpx客户端
+        arxiv_client.bind(self.client)
 
         # Google Scholar配置
         self.google_scholar_config = self.config.get("google_scholar", {})
         self.google_scholar_proxy = self.google_scholar_config.get("proxy", "")
         self.google_scholar_timeout = self.google_scholar_config.get("timeout", 30)
 
+        # 并发查询配置
+        self.fan_out_config = self.config.get("fan_out", {})
+
+        # 正在写入本地文献索引的后台任务
+        self._index_tasks = set()
+
+        # 主题推荐等待研究趋势的最长时间（秒），超时先使用空列表，趋势本身缓存在cache_service的research_trends命名空间中
+        self.trends_config = self.config.get("trends", {})
+        self.trends_topic_wait = self.trends_config.get("topic_wait", 3)
+
         logger.info("学术搜索服务初始化完成")
 
     async def search_google_scholar(self, query: str, limit: int = 10, sort_by: str = "relevance", years: str = "all") -> List[Dict[str, Any]]:
@@ -65,44 +101,48 @@ class AcademicSearchService:
                 logger.info("Google Scholar搜索已禁用")
                 return []
 
-            # 设置代理（如果配置了）
-            if self.google_scholar_proxy:
-                scholarly.use_proxy(proxy=self.google_scholar_proxy, timeout=self.google_scholar_timeout)
+            # scholarly是同步库，在Google Scholar专用线程池中执行，避免阻塞事件循环
+            def fetch_publications():
+                # 设置代理（如果配置了）
+                if self.google_scholar_proxy:
+                    scholarly.use_proxy(proxy=self.google_scholar_proxy, timeout=self.google_scholar_timeout)
 
-            # 使用scholarly库搜索Google Scholar
-            # 注意：这是同步操作，可能会阻塞
-            search_query = scholarly.search_pubs(query)
-            results = []
+                # 使用scholarly库搜索Google Scholar
+                search_query = scholarly.search_pubs(query)
+                results = []
 
-            # 获取指定数量的结果
-            for _ in range(limit):
-                try:
-                    publication = next(search_query)
-                    # 提取需要的字段
-                    result = {
-                        "title": publication.get("bib", {}).get("title", ""),
-                        "authors": publication.get("bib", {}).get("author", []),
-                        "year": publication.get("bib", {}).get("pub_year", ""),
-                        "venue": publication.get("bib", {}).get("venue", ""),
-                        "abstract": publication.get("bib", {}).get("abstract", ""),
-                        "url": publication.get("pub_url", ""),
-                        "citations": publication.get("num_citations", 0),
-                        "source": "google_scholar"
-                    }
+                # 获取指定数量的结果
+                for _ in range(limit):
+                    try:
+                        publication = next(search_query)
+                        # 提取需要的字段
+                        result = {
+                            "title": publication.get("bib", {}).get("title", ""),
+                            "authors": publication.get("bib", {}).get("author", []),
+                            "year": publication.get("bib", {}).get("pub_year", ""),
+                            "venue": publication.get("bib", {}).get("venue", ""),
+                            "abstract": publication.get("bib", {}).get("abstract", ""),
+                            "url": publication.get("pub_url", ""),
+                            "citations": publication.get("num_citations", 0),
+                            "source": "google_scholar"
+                        }
 
-                    # 年份过滤
-                    if years == "last_1" and result["year"] and int(result["year"]) < 2023:
-                        continue
-                    elif years == "last_5" and result["year"] and int(result["year"]) < 2019:
-                        continue
-                    elif years == "last_10" and result["year"] and int(result["year"]) < 2014:
-                        continue
+                        # 年份过滤
+                        if years == "last_1" and result["year"] and int(result["year"]) < 2023:
+                            continue
+                        elif years == "last_5" and result["year"] and int(result["year"]) < 2019:
+                            continue
+                        elif years == "last_10" and result["year"] and int(result["year"]) < 2014:
+                            continue
 
-                    results.append(result)
-                except StopIteration:
-                    break
-                except Exception as e:
-                    logger.error(f"处理Google Scholar结果时出错: {str(e)}")
+                        results.append(result)
+                    except StopIteration:
+                        break
+                    except Exception as e:
+                        logger.error(f"处理Google Scholar结果时出错: {str(e)}")
+                return results
+
+            results = await source_executor.run("google_scholar", fetch_publications)
 
             # 排序
             if sort_by == "citations":
@@ -113,12 +153,15 @@ class AcademicSearchService:
             logger.info(f"Google Scholar搜索完成，找到 {len(results)} 条结果")
             return results
 
+        except SourceTimeoutError as e:
+            logger.error(f"Google Scholar搜索超时: {str(e)}")
+            return []
         except Exception as e:
             logger.error(f"Google Scholar搜索失败: {str(e)}")
             return []
 
     @staticmethod
-    @cache_service.cached(prefix="arxiv_search", ttl=3600)  # 缓存一小时
+    @cache_service.cached(prefix="arxiv_search", ttl=3600, tags={"source": "arxiv"}, condition=bool)  # 缓存一小时，空结果不缓存
     async def search_arxiv(query: str, limit: int = 10, sort_by: str = "relevance", categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """搜索arXiv"""
         try:
@@ -130,6 +173,15 @@ class AcademicSearchService:
                 category_filter = " AND (" + " OR ".join([f"cat:{cat}" for cat in categories]) + ")"
                 query = query + category_filter
 
+            # 优先使用原生异步客户端，失败时回退到arxiv库
+            if arxiv_client.enabled:
+                try:
+                    results = await arxiv_client.search(query, limit, sort_by)
+                    logger.info(f"arXiv异步搜索完成，找到 {len(results)} 条结果")
+                    return results
+                except Exception as e:
+                    logger.error(f"arXiv异步搜索失败，回退到arxiv库: {str(e)}")
+
             # 处理排序
             if sort_by == "date":
                 sort_criterion = arxiv.SortCriterion.SubmittedDate
@@ -138,42 +190,50 @@ class AcademicSearchService:
 
             # 使用更健壮的方式搜索arxiv
             try:
-                # 直接使用同步方式搜索，避免使用线程池
                 logger.info(f"开始arXiv搜索: {query}, 限制: {limit}")
 
-                # 使用arxiv库搜索
-                search = arxiv.Search(
-                    query=query,
-                    max_results=limit,
-                    sort_by=sort_criterion
-                )
+                # arxiv库是同步的，在arXiv专用线程池中执行，避免阻塞事件循环
+                def fetch_results():
+                    # 使用arxiv库搜索
+                    search = arxiv.Search(
+                        query=query,
+                        max_results=limit,
+                        sort_by=sort_criterion
+                    )
 
-                # 使用更简单的方式获取结果
-                results = []
-                for paper in search.results():
-                    try:
-                        # 提取需要的字段
-                        paper_data = {
-                            "title": paper.title,
-                            "authors": [author.name for author in paper.authors],
-                            "year": paper.published.year if hasattr(paper, "published") else "",
-                            "abstract": paper.summary,
-                            "url": paper.pdf_url,
-                            "categories": paper.categories,
-                            "source": "arxiv"
-                        }
-                        results.append(paper_data)
+                    # 使用更简单的方式获取结果
+                    results = []
+                    for paper in search.results():
+                        try:
+                            # 提取需要的字段
+                            paper_data = {
+                                "title": paper.title,
+                                "authors": [author.name for author in paper.authors],
+                                "year": paper.published.year if hasattr(paper, "published") else "",
+                                "abstract": paper.summary,
+                                "url": paper.pdf_url,
+                                "categories": paper.categories,
+                                "source": "arxiv"
+                            }
+                            results.append(paper_data)
 
-                        # 如果已经获取了足够的结果，就停止
-                        if len(results) >= limit:
-                            break
-                    except Exception as e:
-                        logger.error(f"处理arXiv结果时出错: {str(e)}")
-                        continue
+                            # 如果已经获取了足够的结果，就停止
+                            if len(results) >= limit:
+                                break
+                        except Exception as e:
+                            logger.error(f"处理arXiv结果时出错: {str(e)}")
+                            continue
+                    return results
+
+                results = await source_executor.run("arxiv", fetch_results)
 
                 logger.info(f"arXiv搜索完成，找到 {len(results)} 条结果")
                 return results
 
+            except SourceTimeoutError as e:
+                # 超时说明arXiv响应缓慢，不再使用备用方法重试
+                logger.error(f"arXiv搜索超时: {str(e)}")
+                return []
             except Exception as e:
                 logger.error(f"直接搜索arXiv失败: {str(e)}")
 
@@ -199,7 +259,6 @@ class AcademicSearchService:
                         logger.error(f"arXiv备用方法获取结果失败: {str(e)}")
                         return []
 
-                # 使用run_in_executor替代asyncio.to_thread
                 max_retries = 3
                 base_delay = 2
 
@@ -211,8 +270,7 @@ class AcademicSearchService:
                             logger.info(f"arXiv备用请求前等待 {wait_time:.2f} 秒")
                             await asyncio.sleep(wait_time)
 
-                        loop = asyncio.get_event_loop()
-                        search_results = await loop.run_in_executor(None, get_results)
+                        search_results = await source_executor.run("arxiv", get_results)
 
                         if search_results:  # 如果有结果，跳出重试循环
                             break
@@ -256,7 +314,7 @@ class AcademicSearchService:
             # 返回空列表而不是抛出异常
             return []
 
-    @cache_service.cached(prefix="semantic_scholar_search", ttl=3600)  # 缓存一小时
+    @cache_service.cached(prefix="semantic_scholar_search", ttl=3600, tags={"source": "semantic_scholar"}, condition=bool)  # 缓存一小时，空结果不缓存
     async def search_semantic_scholar(self, query: str, limit: int = 10, sort_by: str = "relevance", years: str = "all", fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """搜索Semantic Scholar"""
         try:
@@ -313,14 +371,11 @@ class AcademicSearchService:
             base_delay = 2  # 初始延迟秒数
             max_delay = 60  # 最大延迟秒数
 
+            data = None
             for retry in range(max_retries):
                 try:
-                    # 添加随机延迟，避免多个请求同时发送
-                    if retry > 0:
-                        # 指数退避与抖动结合
-                        delay = min(base_delay * (2 ** retry) + random.uniform(0, 1), max_delay)
-                        logger.info(f"Semantic Scholar请求前等待 {delay:.2f} 秒")
-                        await asyncio.sleep(delay)
+                    # 等待共享令牌桶，所有工作进程共用Semantic Scholar的请求配额
+                    await source_rate_limiter.acquire("semantic_scholar")
 
                     # 发送请求
                     response = await self.client.get(url, params=params, headers=headers)
@@ -335,10 +390,13 @@ class AcademicSearchService:
                     logger.warning(f"Semantic Scholar请求失败，状态码: {status_code}")
 
                     if status_code == 429:  # Too Many Requests
-                        # 使用更长的延迟
-                        wait_time = min(base_delay * (2 ** retry) + random.uniform(0, 5), max_delay)
-                        logger.warning(f"Semantic Scholar请求限制，等待 {wait_time:.2f} 秒后重试 ({retry+1}/{max_retries})")
-                        await asyncio.sleep(wait_time)
+                        # 按Retry-After暂停所有工作进程的请求，下一次acquire会等待暂停结束
+                        wait_time = await source_rate_limiter.penalize(
+                            "semantic_scholar",
+                            e.response.headers.get("Retry-After"),
+                            min(base_delay * (2 ** retry) + random.uniform(0, 5), max_delay)
+                        )
+                        logger.warning(f"Semantic Scholar请求限制，{wait_time:.2f} 秒后重试 ({retry+1}/{max_retries})")
                     elif status_code == 503:  # Service Unavailable
                         # 服务不可用，等待后重试
                         wait_time = min(base_delay * (2 ** retry) + random.uniform(0, 3), max_delay)
@@ -364,6 +422,10 @@ class AcademicSearchService:
                         logger.error(f"Semantic Scholar请求失败，所有重试均失败: {str(e)}")
                         return []
 
+            if data is None:
+                logger.error("Semantic Scholar请求失败，所有重试均失败")
+                return []
+
             # 处理结果
             results = []
             for paper in data.get("data", []):
@@ -375,6 +437,7 @@ class AcademicSearchService:
                     "url": paper.get("url", ""),
                     "venue": paper.get("venue", ""),
                     "citations": paper.get("citationCount", 0),
+                    "paper_id": paper.get("paperId", ""),
                     "source": "semantic_scholar"
                 }
                 results.append(result)
@@ -386,7 +449,229 @@ class AcademicSearchService:
             logger.error(f"Semantic Scholar搜索失败: {str(e)}")
             return []
 
-    @cache_service.cached(prefix="academic_papers_search", ttl=3600)  # 缓存一小时
+    def _merge_results(self, all_papers: List[Any], sort_by: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """合并多个搜索源的结果：去重并合并重复论文的元数据（见paper_dedup）、转换为可序列化的字典并排序
+
+        按相关性排序且提供了query时，用TF-IDF重排序器（见reranker）按标题和完整摘要打分，得分保存在relevance_score中。
+        """
+        # 跳过非字典类型的论文
+        valid_papers = []
+        for paper in all_papers:
+            if not isinstance(paper, dict):
+                logger.warning(f"跳过非字典类型的论文: {type(paper)}")
+                continue
+            valid_papers.append(paper)
+
+        # 去重（规范化标题、DOI/arXiv ID和近似重复检测）
+        try:
+            deduplicated = paper_deduplicator.deduplicate(valid_papers)
+        except Exception as e:
+            logger.error(f"论文去重失败: {str(e)}")
+            deduplicated = valid_papers
+
+        # 相关性重排序（在截断摘要之前进行）
+        if sort_by == "relevance" and query and reranker.enabled:
+            deduplicated = reranker.rerank(query, deduplicated)
+
+        unique_papers = {}
+        for paper in deduplicated:
+            try:
+                title = str(paper.get("title", "")).lower() if paper.get("title") is not None else ""
+                if title and title not in unique_papers:
+                    # 确保每个论文对象都是可序列化的
+                    serializable_paper = {
+                        "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
+                        "authors": paper.get("authors", []),
+                        "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
+                        "abstract": str(paper.get("abstract", ""))[:300] if paper.get("abstract") is not None else "",  # 限制摘要长度
+                        "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
+                        "source": str(paper.get("source", "unknown")) if paper.get("source") is not None else "unknown"
+                    }
+
+                    # 可选字段，如果存在则添加
+                    if "citations" in paper and paper["citations"] is not None:
+                        serializable_paper["citations"] = int(paper["citations"]) if isinstance(paper["citations"], (int, float)) else 0
+                    if "venue" in paper and paper["venue"] is not None:
+                        serializable_paper["venue"] = str(paper["venue"])
+                    if "categories" in paper and paper["categories"] is not None:
+                        serializable_paper["categories"] = paper["categories"]
+                    if paper.get("paper_id"):
+                        serializable_paper["paper_id"] = str(paper["paper_id"])
+                    if "relevance_score" in paper:
+                        serializable_paper["relevance_score"] = paper["relevance_score"]
+
+                    unique_papers[title] = serializable_paper
+            except Exception as e:
+                logger.error(f"处理论文数据时出错: {str(e)}")
+                continue
+
+        # 排序
+        try:
+            if sort_by == "citations":
+                sorted_papers = sorted(
+                    unique_papers.values(),
+                    key=lambda x: int(x.get("citations", 0)) if x.get("citations") is not None else 0,
+                    reverse=True
+                )
+            elif sort_by == "date":
+                sorted_papers = sorted(
+                    unique_papers.values(),
+                    key=lambda x: int(x.get("year", 0)) if x.get("year") and str(x.get("year", "")).isdigit() else 0,
+                    reverse=True
+                )
+            else:
+                # 按相关性排序（已由重排序器排序，未启用时保持原顺序）
+                sorted_papers = list(unique_papers.values())
+        except Exception as e:
+            logger.error(f"排序论文时出错: {str(e)}")
+            sorted_papers = list(unique_papers.values())
+
+        return sorted_papers
+
+    def _index_results(self, papers: List[Any]) -> None:
+        """在后台把远程搜索结果写入本地文献索引，不增加搜索延迟"""
+        if not literature_index.enabled or not papers:
+            return
+        task = asyncio.create_task(literature_index.add_papers(list(papers)))
+        self._index_tasks.add(task)
+        task.add_done_callback(self._index_tasks.discard)
+
+    async def _search_source_with_deadline(self, source_name: str, coro, deadline: float) -> Dict[str, Any]:
+        """在截止时间内执行单个搜索源，返回结果、耗时、是否超时和是否失败"""
+        start_time = time.monotonic()
+        timed_out = False
+        failed = False
+        try:
+            results = await asyncio.wait_for(coro, timeout=deadline)
+            if not isinstance(results, list):
+                logger.error(f"搜索源 {source_name} 返回了非列表结果: {type(results)}")
+                results = []
+        except asyncio.TimeoutError:
+            logger.warning(f"搜索源 {source_name} 超过截止时间 {deadline} 秒，丢弃其结果")
+            results = []
+            timed_out = True
+        except Exception as e:
+            logger.error(f"搜索源 {source_name} 失败: {str(e)}")
+            results = []
+            failed = True
+
+        return {
+            "source": source_name,
+            "results": results,
+            "latency_ms": int((time.monotonic() - start_time) * 1000),
+            "timed_out": timed_out,
+            "failed": failed
+        }
+
+    def _source_deadline(self, source_name: str) -> float:
+        """获取搜索源的截止时间"""
+        source_deadlines = self.fan_out_config.get("source_deadlines", {}) or {}
+        return source_deadlines.get(source_name, self.fan_out_config.get("deadline", 8.0))
+
+    def _source_coros(
+        self,
+        query: str,
+        limit: int,
+        search_sources: Dict[str, bool],
+        sort_by: str,
+        years: str,
+        categories: Optional[List[str]],
+        fields: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """为每个启用的搜索源创建查询协程"""
+        coros = {}
+        if search_sources.get("arxiv", False):
+            coros["arxiv"] = AcademicSearchService.search_arxiv(query, limit, sort_by, categories)
+        if search_sources.get("semantic_scholar", False):
+            coros["semantic_scholar"] = self.search_semantic_scholar(query, limit, sort_by, years, fields)
+        if search_sources.get("google_scholar", False):
+            coros["google_scholar"] = self.search_google_scholar(query, limit, sort_by, years)
+        return coros
+
+    async def _fan_out_search(
+        self,
+        query: str,
+        limit: int,
+        search_sources: Dict[str, bool],
+        sort_by: str,
+        years: str,
+        categories: Optional[List[str]],
+        fields: Optional[List[str]]
+    ) -> Dict[str, Any]:
+        """并发查询所有启用的搜索源，每个搜索源有独立的截止时间，合并截止时间内返回的结果"""
+        coros = self._source_coros(query, limit, search_sources, sort_by, years, categories, fields)
+
+        if not coros:
+            logger.warning("没有启用的搜索源，返回空结果")
+            return {
+                "results": [],
+                "total": 0,
+                "query": query,
+                "sources_stats": {},
+                "sources_latency": {}
+            }
+
+        logger.info(f"并发查询搜索源: {list(coros.keys())}")
+        outcomes = await asyncio.gather(*[
+            self._search_source_with_deadline(name, coro, self._source_deadline(name))
+            for name, coro in coros.items()
+        ])
+
+        all_papers = []
+        sources_stats = {}
+        sources_latency = {}
+        timed_out_sources = []
+        failed_sources = []
+        for outcome in outcomes:
+            name = outcome["source"]
+            sources_stats[name] = len(outcome["results"])
+            sources_latency[name] = outcome["latency_ms"]
+            if outcome["timed_out"]:
+                timed_out_sources.append(name)
+            if outcome["failed"]:
+                failed_sources.append(name)
+            all_papers.extend(outcome["results"])
+
+        self._index_results(all_papers)
+        sorted_papers = self._merge_results(all_papers, sort_by, query)
+        logger.info(
+            f"并发搜索完成，找到 {len(sorted_papers)} 条去重结果，"
+            f"各搜索源耗时(毫秒): {sources_latency}，超时: {timed_out_sources}"
+        )
+
+        return {
+            "results": sorted_papers[:limit],
+            "total": len(sorted_papers),
+            "query": query,
+            "sources_stats": sources_stats,
+            "sources_latency": sources_latency,
+            "timed_out_sources": timed_out_sources,
+            "failed_sources": failed_sources
+        }
+
+    def _resolve_sources(self, sources: Optional[List[str]]) -> Dict[str, bool]:
+        """确定要使用的搜索源"""
+        search_sources = {}
+        if sources:
+            for source in sources:
+                if source in self.enabled_sources and self.enabled_sources[source]:
+                    search_sources[source] = True
+        else:
+            search_sources = self.enabled_sources
+        return search_sources
+
+    def _local_response(self, query: str, local_results: List[Dict[str, Any]], limit: int, sort_by: str, latency_ms: int) -> Dict[str, Any]:
+        """用本地文献索引的结果构造搜索响应"""
+        sorted_papers = self._merge_results(local_results, sort_by, query)
+        return {
+            "results": sorted_papers[:limit],
+            "total": len(sorted_papers),
+            "query": query,
+            "sources_stats": {"local_index": len(sorted_papers)},
+            "sources_latency": {"local_index": latency_ms}
+        }
+
+    @cache_service.cached(prefix="academic_papers_search", ttl=3600, tags=_search_cache_tags, condition=_is_complete_search)  # 缓存一小时
     async def search_academic_papers(
         self,
         query: str,
@@ -395,28 +680,220 @@ class AcademicSearchService:
         sort_by: str = None,
         years: str = None,
         categories: Optional[List[str]] = None,
-        fields: Optional[List[str]] = None
+        fields: Optional[List[str]] = None,
+        fan_out: Optional[bool] = None,
+        use_local_index: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """综合搜索学术论文"""
+        """综合搜索学术论文
+
+        先查询本地文献索引（见literature_index），匹配结果足够时直接返回，否则查询远程搜索源；
+        远程搜索源没有返回结果（例如上游故障）时使用本地的部分结果。指定了categories或fields时不使用本地文献索引。
+        fan_out为True时并发查询所有启用的搜索源（见_fan_out_search），
+        为False时优先使用arXiv，arXiv没有结果时再查询其他搜索源；为None时使用配置academic_search.fan_out.enabled。
+        """
+        # 使用默认参数（如果未指定）
+        if limit is None:
+            limit = self.default_params.get("limit", 10)
+        if sort_by is None:
+            sort_by = self.default_params.get("sort_by", "relevance")
+        if years is None:
+            years = self.default_params.get("years", "all")
+
+        if use_local_index is None:
+            use_local_index = literature_index.enabled
+
+        local_results = []
+        local_latency = 0
+        # 本地文献索引不保存arXiv分类和Semantic Scholar领域，指定了categories或fields时不使用
+        if use_local_index and query and query.strip() and not categories and not fields:
+            start_time = time.monotonic()
+            search_sources = self._resolve_sources(sources)
+            local_results = await literature_index.search(
+                query, limit, [name for name, enabled in search_sources.items() if enabled], years
+            )
+            local_latency = int((time.monotonic() - start_time) * 1000)
+
+            if literature_index.satisfies(local_results, limit):
+                literature_index.local_hits += 1
+                logger.info(f"本地文献索引命中: {query}, {len(local_results)} 条结果, 耗时 {local_latency} 毫秒")
+                return self._local_response(query, local_results, limit, sort_by, local_latency)
+            literature_index.local_misses += 1
+
+        result = await self._search_remote_sources(query, limit, sources, sort_by, years, categories, fields, fan_out)
+
+        if not result.get("results") and local_results:
+            logger.warning(f"远程搜索源没有返回结果，使用本地文献索引的 {len(local_results)} 条结果")
+            local_result = self._local_response(query, local_results, limit, sort_by, local_latency)
+            # 保留远程搜索源的超时和失败信息，上游故障时的降级结果不缓存
+            local_result["timed_out_sources"] = result.get("timed_out_sources", [])
+            local_result["failed_sources"] = result.get("failed_sources", [])
+            return local_result
+        return result
+
+    async def search_academic_papers_stream(
+        self,
+        query: str,
+        limit: int = None,
+        sources: Optional[List[str]] = None,
+        sort_by: str = None,
+        years: str = None,
+        categories: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        use_local_index: Optional[bool] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式综合搜索学术论文
+
+        并发查询所有启用的搜索源，每个搜索源返回后立即产出一个source事件，只包含之前的事件中没有出现过的论文
+        （已去重并转换为与最终结果相同的结构）；所有搜索源结束后产出final事件，内容与search_academic_papers的返回值相同。
+        命中search_academic_papers的缓存或本地文献索引的匹配结果足够时只产出final事件。最终结果写回缓存。
+        """
+        # 与search_academic_papers使用同一个缓存键和标签，在填充默认参数之前生成
+        cache_params = dict(
+            query=query, limit=limit, sources=sources, sort_by=sort_by, years=years,
+            categories=categories, fields=fields, use_local_index=use_local_index
+        )
+        cache_key = AcademicSearchService.search_academic_papers.cache_key(self, **cache_params)
+        cache_tags = AcademicSearchService.search_academic_papers.cache_tags(self, **cache_params)
+        cached = await cache_service.get(cache_key)
+        if cached is not None:
+            yield {"type": "final", "cached": True, **cached}
+            return
+
+        if limit is None:
+            limit = self.default_params.get("limit", 10)
+        if sort_by is None:
+            sort_by = self.default_params.get("sort_by", "relevance")
+        if years is None:
+            years = self.default_params.get("years", "all")
+        if use_local_index is None:
+            use_local_index = literature_index.enabled
+
+        search_sources = self._resolve_sources(sources)
+        emitted_titles = set()
+
+        def new_papers(papers: List[Any]) -> List[Dict[str, Any]]:
+            """去重并过滤掉已经推送过的论文"""
+            fresh = []
+            for paper in self._merge_results(papers, sort_by, query):
+                key = normalize_title(paper["title"])
+                if key and key not in emitted_titles:
+                    emitted_titles.add(key)
+                    fresh.append(paper)
+            return fresh[:limit]
+
+        # 本地文献索引，指定了categories或fields时不使用（索引不保存分类和领域）
+        local_results = []
+        local_latency = 0
+        if use_local_index and query and query.strip() and not categories and not fields:
+            start_time = time.monotonic()
+            local_results = await literature_index.search(
+                query, limit, [name for name, enabled in search_sources.items() if enabled], years
+            )
+            local_latency = int((time.monotonic() - start_time) * 1000)
+
+            if literature_index.satisfies(local_results, limit):
+                literature_index.local_hits += 1
+                result = self._local_response(query, local_results, limit, sort_by, local_latency)
+                await cache_service.set(cache_key, result, 3600, tags=cache_tags)
+                yield {"type": "final", **result}
+                return
+            literature_index.local_misses += 1
+
+            if local_results:
+                yield {
+                    "type": "source",
+                    "source": "local_index",
+                    "results": new_papers(local_results),
+                    "count": len(local_results),
+                    "latency_ms": local_latency,
+                    "timed_out": False
+                }
+
+        coros = self._source_coros(query, limit, search_sources, sort_by, years, categories, fields)
+        tasks = [
+            asyncio.create_task(self._search_source_with_deadline(name, coro, self._source_deadline(name)))
+            for name, coro in coros.items()
+        ]
+
+        all_papers = []
+        sources_stats = {}
+        sources_latency = {}
+        timed_out_sources = []
+        failed_sources = []
         try:
-            # 使用默认参数（如果未指定）
-            if limit is None:
-                limit = self.default_params.get("limit", 10)
-            if sort_by is None:
-                sort_by = self.default_params.get("sort_by", "relevance")
-            if years is None:
-                years = self.default_params.get("years", "all")
+            for next_outcome in asyncio.as_completed(tasks):
+                outcome = await next_outcome
+                name = outcome["source"]
+                sources_stats[name] = len(outcome["results"])
+                sources_latency[name] = outcome["latency_ms"]
+                if outcome["timed_out"]:
+                    timed_out_sources.append(name)
+                if outcome["failed"]:
+                    failed_sources.append(name)
+                all_papers.extend(outcome["results"])
+
+                yield {
+                    "type": "source",
+                    "source": name,
+                    "results": new_papers(outcome["results"]),
+                    "count": len(outcome["results"]),
+                    "latency_ms": outcome["latency_ms"],
+                    "timed_out": outcome["timed_out"]
+                }
+        finally:
+            # 客户端断开连接时取消仍在进行的查询
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        self._index_results(all_papers)
+
+        if not all_papers and local_results:
+            logger.warning(f"远程搜索源没有返回结果，使用本地文献索引的 {len(local_results)} 条结果")
+            result = self._local_response(query, local_results, limit, sort_by, local_latency)
+            result["timed_out_sources"] = timed_out_sources
+            result["failed_sources"] = failed_sources
+        else:
+            sorted_papers = self._merge_results(all_papers, sort_by, query)
+            result = {
+                "results": sorted_papers[:limit],
+                "total": len(sorted_papers),
+                "query": query,
+                "sources_stats": sources_stats,
+                "sources_latency": sources_latency,
+                "timed_out_sources": timed_out_sources,
+                "failed_sources": failed_sources
+            }
+        logger.info(f"流式搜索完成，找到 {result['total']} 条去重结果，各搜索源耗时(毫秒): {sources_latency}")
+
+        # 与search_academic_papers相同，有搜索源超时或失败时不缓存
+        if _is_complete_search(result):
+            await cache_service.set(cache_key, result, 3600, tags=cache_tags)
+        yield {"type": "final", **result}
 
+    async def _search_remote_sources(
+        self,
+        query: str,
+        limit: int,
+        sources: Optional[List[str]],
+        sort_by: str,
+        years: str,
+        categories: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        fan_out: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """查询远程搜索源"""
+        try:
             logger.info(f"综合搜索学术论文: {query}, 限制: {limit}, 排序: {sort_by}, 年份: {years}")
 
             # 确定要使用的搜索源
-            search_sources = {}
-            if sources:
-                for source in sources:
-                    if source in self.enabled_sources and self.enabled_sources[source]:
-                        search_sources[source] = True
-            else:
-                search_sources = self.enabled_sources
+            search_sources = self._resolve_sources(sources)
+
+            # 并发查询所有搜索源
+            if fan_out is None:
+                fan_out = self.fan_out_config.get("enabled", True)
+            if fan_out:
+                return await self._fan_out_search(query, limit, search_sources, sort_by, years, categories, fields)
 
             # 优先使用arXiv（不需要API密钥）
             if search_sources.get("arxiv", False):
@@ -429,6 +906,7 @@ class AcademicSearchService:
                     if not isinstance(arxiv_results, list):
                         logger.warning(f"arXiv搜索返回了非列表结果: {type(arxiv_results)}")
                         arxiv_results = []
+                    self._index_results(arxiv_results)
 
                     # 确保结果是可序列化的
                     serializable_results = []
@@ -522,60 +1000,10 @@ class AcademicSearchService:
                     logger.error(f"搜索源 {source_name} 返回了非列表结果: {type(result)}")
                     sources_stats[source_name] = 0
 
-            # 去重（基于标题）
-            unique_papers = {}
-            for paper in all_papers:
-                # 跳过非字典类型的论文
-                if not isinstance(paper, dict):
-                    logger.warning(f"跳过非字典类型的论文: {type(paper)}")
-                    continue
-
-                try:
-                    title = str(paper.get("title", "")).lower() if paper.get("title") is not None else ""
-                    if title and title not in unique_papers:
-                        # 确保每个论文对象都是可序列化的
-                        serializable_paper = {
-                            "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
-                            "authors": paper.get("authors", []),
-                            "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
-                            "abstract": str(paper.get("abstract", ""))[:300] if paper.get("abstract") is not None else "",  # 限制摘要长度
-                            "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
-                            "source": str(paper.get("source", "unknown")) if paper.get("source") is not None else "unknown"
-                        }
-
-                        # 可选字段，如果存在则添加
-                        if "citations" in paper and paper["citations"] is not None:
-                            serializable_paper["citations"] = int(paper["citations"]) if isinstance(paper["citations"], (int, float)) else 0
-                        if "venue" in paper and paper["venue"] is not None:
-                            serializable_paper["venue"] = str(paper["venue"])
-                        if "categories" in paper and paper["categories"] is not None:
-                            serializable_paper["categories"] = paper["categories"]
-
-                        unique_papers[title] = serializable_paper
-                except Exception as e:
-                    logger.error(f"处理论文数据时出错: {str(e)}")
-                    continue
+            self._index_results(all_papers)
 
-            # 排序
-            try:
-                if sort_by == "citations":
-                    sorted_papers = sorted(
-                        unique_papers.values(),
-                        key=lambda x: int(x.get("citations", 0)) if x.get("citations") is not None else 0,
-                        reverse=True
-                    )
-                elif sort_by == "date":
-                    sorted_papers = sorted(
-                        unique_papers.values(),
-                        key=lambda x: int(x.get("year", 0)) if x.get("year") and str(x.get("year", "")).isdigit() else 0,
-                        reverse=True
-                    )
-                else:
-                    # 默认按相关性排序（保持原顺序）
-                    sorted_papers = list(unique_papers.values())
-            except Exception as e:
-                logger.error(f"排序论文时出错: {str(e)}")
-                sorted_papers = list(unique_papers.values())
+            # 去重并排序
+            sorted_papers = self._merge_results(all_papers, sort_by, query)
 
             logger.info(f"综合搜索完成，找到 {len(sorted_papers)} 条去重结果")
 
@@ -597,7 +1025,113 @@ class AcademicSearchService:
                 "sources_stats": {}
             }
 
-    @cache_service.cached(prefix="paper_details", ttl=86400)  # 缓存24小时
+    def _format_semantic_scholar_details(self, paper: Dict[str, Any]) -> Dict[str, Any]:
+        """将Semantic Scholar论文转换为可序列化的论文详情"""
+        return {
+            "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
+            "authors": [str(author.get("name", "")) for author in paper.get("authors") or []],
+            "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
+            "abstract": str(paper.get("abstract", "")) if paper.get("abstract") is not None else "",
+            "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
+            "venue": str(paper.get("venue", "")) if paper.get("venue") is not None else "",
+            "citations": int(paper.get("citationCount", 0)) if paper.get("citationCount") is not None else 0,
+            "references": paper.get("references", []),
+            "source": "semantic_scholar"
+        }
+
+    def _paper_details_cache_key(self, paper_id: str, source: str = "semantic_scholar") -> str:
+        """get_paper_details的缓存键"""
+        return AcademicSearchService.get_paper_details.cache_key(self, paper_id, source)
+
+    async def _post_semantic_scholar_batch(self, paper_ids: List[str], headers: Dict[str, str]) -> List[Optional[Dict[str, Any]]]:
+        """调用/paper/batch获取一批论文，返回与paper_ids顺序一致的列表，未找到的论文为None"""
+        url = f"{self.semantic_scholar_api_url}/paper/batch"
+        params = {"fields": self.semantic_scholar_fields}
+
+        max_retries = 3
+        retry_delay = 2  # 初始延迟秒数
+        for retry in range(max_retries):
+            try:
+                await source_rate_limiter.acquire("semantic_scholar")
+                response = await self.client.post(url, params=params, json={"ids": paper_ids}, headers=headers)
+                response.raise_for_status()
+                papers = response.json()
+                if not isinstance(papers, list):
+                    logger.error(f"Semantic Scholar批量接口返回了非列表结果: {type(papers)}")
+                    return []
+                return papers
+            except Exception as e:
+                if retry < max_retries - 1:
+                    # 如果是429错误，增加更长的延迟
+                    if hasattr(e, 'response') and getattr(e.response, 'status_code', None) == 429:
+                        # 按Retry-After暂停所有工作进程的请求，下一次acquire会等待暂停结束
+                        wait_time = await source_rate_limiter.penalize(
+                            "semantic_scholar", e.response.headers.get("Retry-After"), retry_delay * (2 ** retry)
+                        )
+                        logger.warning(f"Semantic Scholar请求限制，{wait_time:.1f}秒后重试")
+                    else:
+                        await asyncio.sleep(retry_delay)
+                else:
+                    logger.error(f"Semantic Scholar批量获取论文详情失败: {str(e)}")
+                    return []
+        return []
+
+    async def get_papers_details_batch(self, paper_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取Semantic Scholar论文详情
+
+        先查paper_details缓存，未命中的ID按batch_size分块调用POST /paper/batch，
+        每篇论文的结果按ID写回paper_details缓存，之后的get_paper_details可以直接命中。
+        返回{论文ID: 论文详情}，未找到的论文不包含在结果中。
+        """
+        try:
+            # 去重并保持顺序
+            unique_ids = list(dict.fromkeys(pid for pid in paper_ids if pid))
+            if not unique_ids:
+                return {}
+
+            details = {}
+            missing_ids = []
+            for paper_id in unique_ids:
+                cached = await cache_service.get(self._paper_details_cache_key(paper_id))
+                if cached:
+                    details[paper_id] = cached
+                else:
+                    missing_ids.append(paper_id)
+
+            logger.info(f"批量获取论文详情: 共 {len(unique_ids)} 篇，缓存命中 {len(details)} 篇")
+            if not missing_ids:
+                return details
+
+            # 添加API密钥
+            headers = {}
+            if self.semantic_scholar_api_key and self.semantic_scholar_api_key != "your_semantic_scholar_api_key":
+                headers["x-api-key"] = self.semantic_scholar_api_key
+
+            for start in range(0, len(missing_ids), self.semantic_scholar_batch_size):
+                chunk = missing_ids[start:start + self.semantic_scholar_batch_size]
+                papers = await self._post_semantic_scholar_batch(chunk, headers)
+
+                for paper_id, paper in zip(chunk, papers):
+                    if not paper:
+                        continue
+                    try:
+                        paper_details = self._format_semantic_scholar_details(paper)
+                    except Exception as e:
+                        logger.error(f"处理Semantic Scholar论文详情时出错: {paper_id}, {str(e)}")
+                        continue
+                    details[paper_id] = paper_details
+                    await cache_service.set(
+                        self._paper_details_cache_key(paper_id), paper_details, 86400, tags={"source": "semantic_scholar"}
+                    )
+
+            logger.info(f"批量获取论文详情完成: 找到 {len(details)}/{len(unique_ids)} 篇")
+            return details
+
+        except Exception as e:
+            logger.error(f"批量获取论文详情失败: {str(e)}")
+            return {}
+
+    @cache_service.cached(prefix="paper_details", ttl=86400, tags=lambda params: {"source": params["source"]})  # 缓存24小时
     async def get_paper_details(self, paper_id: str, source: str = "semantic_scholar") -> Dict[str, Any]:
         """获取论文详情"""
         try:
@@ -626,17 +1160,19 @@ class AcademicSearchService:
                     paper = None
                     for retry in range(max_retries):
                         try:
+                            await source_rate_limiter.acquire("semantic_scholar")
                             response = await self.client.get(url, params=params, headers=headers)
                             response.raise_for_status()
                             paper = response.json()
                             break
                         except Exception as e:
                             if retry < max_retries - 1:
-                                # 如果是429错误，增加更长的延迟
+                                # 如果是429错误，按Retry-After暂停所有工作进程的请求
                                 if hasattr(e, 'response') and getattr(e.response, 'status_code', None) == 429:
-                                    wait_time = retry_delay * (2 ** retry)  # 指数退避
-                                    logger.warning(f"Semantic Scholar请求限制，等待{wait_time}秒后重试")
-                                    await asyncio.sleep(wait_time)
+                                    wait_time = await source_rate_limiter.penalize(
+                                        "semantic_scholar", e.response.headers.get("Retry-After"), retry_delay * (2 ** retry)
+                                    )
+                                    logger.warning(f"Semantic Scholar请求限制，{wait_time:.1f}秒后重试")
                                 else:
                                     await asyncio.sleep(retry_delay)
                             else:
@@ -649,31 +1185,30 @@ class AcademicSearchService:
                         logger.error("Semantic Scholar返回了空结果")
                         return {}
 
-                    # 确保返回的数据是可序列化的
-                    return {
-                        "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
-                        "authors": [str(author.get("name", "")) for author in paper.get("authors", [])],
-                        "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
-                        "abstract": str(paper.get("abstract", "")) if paper.get("abstract") is not None else "",
-                        "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
-                        "venue": str(paper.get("venue", "")) if paper.get("venue") is not None else "",
-                        "citations": int(paper.get("citationCount", 0)) if paper.get("citationCount") is not None else 0,
-                        "references": paper.get("references", []),
-                        "source": "semantic_scholar"
-                    }
+                    return self._format_semantic_scholar_details(paper)
                 except Exception as e:
                     logger.error(f"处理Semantic Scholar论文详情时出错: {str(e)}")
                     return {}
 
             elif source == "arxiv":
+                # 优先使用原生异步客户端
+                if arxiv_client.enabled:
+                    try:
+                        paper = await arxiv_client.get_paper(paper_id)
+                        if paper is None:
+                            logger.warning(f"arXiv未找到论文: {paper_id}")
+                            return {}
+                        paper["year"] = str(paper["year"])
+                        return paper
+                    except Exception as e:
+                        logger.error(f"arXiv异步获取论文详情失败，回退到arxiv库: {str(e)}")
+
                 try:
-                    # 使用arxiv库获取详情
+                    # 使用arxiv库获取详情，在arXiv专用线程池中执行
                     search = arxiv.Search(id_list=[paper_id])
 
-                    # 直接使用同步方式获取结果
                     try:
-                        # 直接获取结果
-                        results = list(search.results())
+                        results = await source_executor.run("arxiv", lambda: list(search.results()))
                         if not results:
                             logger.warning(f"arXiv未找到论文: {paper_id}")
                             return {}
@@ -690,6 +1225,9 @@ class AcademicSearchService:
                             "categories": result.categories if hasattr(result, "categories") else [],
                             "source": "arxiv"
                         }
+                    except SourceTimeoutError as e:
+                        logger.error(f"获取arXiv论文详情超时: {str(e)}")
+                        return {}
                     except Exception as e:
                         logger.error(f"直接获取arXiv论文详情失败: {str(e)}")
 
@@ -708,9 +1246,7 @@ class AcademicSearchService:
                                 logger.error(f"arXiv备用方法获取结果失败: {str(e)}")
                                 return None
 
-                        # 使用run_in_executor执行同步操作
-                        loop = asyncio.get_event_loop()
-                        result = await loop.run_in_executor(None, get_result)
+                        result = await source_executor.run("arxiv", get_result)
 
                         if result is None:
                             logger.error(f"arXiv备用方法未找到论文: {paper_id}")
@@ -738,9 +1274,42 @@ class AcademicSearchService:
             logger.error(f"获取论文详情失败: {str(e)}")
             return {}
 
-    @cache_service.cached(prefix="research_trends", ttl=86400)  # 缓存24小时
-    async def get_research_trends(self, field: str) -> List[Dict[str, Any]]:
-        """获取研究趋势"""
+    def _normalize_field(self, field: str) -> str:
+        """规范化研究领域，作为趋势缓存的键"""
+        return " ".join(field.casefold().split())
+
+    @cache_service.cached(prefix="research_trends", ttl=21600, stale_grace=86400, condition=bool)  # 缓存六小时
+    async def _cached_research_trends(self, field: str) -> List[Dict[str, Any]]:
+        """按规范化的领域缓存研究趋势，空结果（搜索失败）不缓存"""
+        return await self._compute_research_trends(field)
+
+    async def get_research_trends(self, field: str, max_wait: Optional[float] = None) -> List[Dict[str, Any]]:
+        """获取研究趋势
+
+        趋势按规范化的领域缓存在research_trends命名空间中（TTL可在cache.namespaces中配置），
+        过期后在宽限期内先返回旧值并在后台刷新，同一领域的并发请求共享一次计算。
+        max_wait不为None时最多等待max_wait秒，超时返回空列表，计算在后台继续并写入缓存。
+        """
+        if not field or not isinstance(field, str) or not field.strip():
+            logger.warning(f"研究领域参数无效: {field}, 返回空列表")
+            return []
+
+        try:
+            # 缓存未命中时计算在独立的任务中进行，等待超时不会取消计算
+            if max_wait is None:
+                trends = await self._cached_research_trends(self._normalize_field(field))
+            else:
+                trends = await asyncio.wait_for(self._cached_research_trends(self._normalize_field(field)), timeout=max_wait)
+        except asyncio.TimeoutError:
+            logger.warning(f"研究趋势计算超过 {max_wait} 秒，先使用空列表: {field}")
+            return []
+        except Exception as e:
+            logger.error(f"获取研究趋势失败: {str(e)}")
+            return []
+        return list(trends or [])
+
+    async def _compute_research_trends(self, field: str) -> List[Dict[str, Any]]:
+        """搜索并计算研究趋势（不使用趋势缓存）"""
         try:
             logger.info(f"获取研究趋势: {field}")
 
@@ -753,41 +1322,38 @@ class AcademicSearchService:
             query = f"survey {field} recent advances"
             logger.info(f"研究趋势查询: {query}")
 
-            # 搜索最近的综述论文
+            # 并发执行主要查询（最近五年的综述，按日期排序）和备用查询（领域名称，按相关性排序）
             try:
-                # 使用更健壮的查询方式
-                try:
-                    # 尝试使用主要查询
-                    search_result = await self.search_academic_papers(
+                primary_result, backup_result = await asyncio.gather(
+                    self.search_academic_papers(
                         query=query,
                         limit=15,  # 获取更多结果以增加筛选后的有效数据
                         sort_by="date",
                         years="last_5"
-                    )
-                except Exception as search_error:
-                    # 记录原始错误
-                    logger.error(f"主要研究趋势查询失败: {str(search_error)}")
-
-                    # 降级：使用更简单的查询
-                    try:
-                        logger.info(f"尝试使用备用查询: {field}")
-                        search_result = await self.search_academic_papers(
-                            query=field,
-                            limit=15,
-                            sort_by="relevance"
-                        )
-                    except Exception as backup_error:
-                        logger.error(f"备用研究趋势查询也失败: {str(backup_error)}")
-                        # 返回空结果而不是抛出异常
-                        return []
+                    ),
+                    self.search_academic_papers(
+                        query=field,
+                        limit=15,
+                        sort_by="relevance"
+                    ),
+                    return_exceptions=True
+                )
 
-                # 验证搜索结果格式
-                if not isinstance(search_result, dict) or "results" not in search_result:
-                    logger.warning(f"搜索结果格式无效: {type(search_result)}, 返回空列表")
-                    return []
+                # 主要查询失败或没有结果时使用备用查询的结果
+                search_result = None
+                for name, result in (("主要", primary_result), ("备用", backup_result)):
+                    if isinstance(result, Exception):
+                        logger.error(f"{name}研究趋势查询失败: {str(result)}")
+                        continue
+                    if not isinstance(result, dict) or "results" not in result:
+                        logger.warning(f"{name}研究趋势查询结果格式无效: {type(result)}")
+                        continue
+                    if result["results"]:
+                        search_result = result
+                        break
 
                 # 检查结果是否为空
-                if not search_result["results"]:
+                if search_result is None:
                     logger.warning(f"搜索结果为空，返回空列表")
                     return []
 
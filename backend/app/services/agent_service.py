@@ -4,13 +4,28 @@ import json
 import importlib
 import re
 import time
+from app.core.config import settings
 from app.core.logger import get_logger
 from app.services.llm_service import llm_service
+from app.services.workflow_checkpoint_service import workflow_checkpoint_service, build_step_key
 from app.services.llm.token_counter import estimate_cost
 
 # 创建日志器
 logger = get_logger("agent_service")
 
+
+class WorkflowExecutionError(Exception):
+    """工作流执行失败，run_id为运行记录ID（未启用检查点时为None），可用于查询和恢复"""
+
+    def __init__(self, run_id: Optional[str], cause: Exception):
+        self.run_id = run_id
+        self.cause = cause
+        message = str(cause) or type(cause).__name__
+        if run_id is not None:
+            message = f"{message}（运行ID: {run_id}）"
+        super().__init__(message)
+
+
 class Agent:
     """智能体基类"""
 
@@ -733,25 +748,131 @@ class AgentCoordinator:
         logger.info(f"委派任务给智能体 {agent_id}: {task[:50]}...")
         return await self.agents[agent_id].act(task, context)
 
-    async def execute_workflow(self, workflow: List[Dict[str, Any]], initial_context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """执行工作流"""
-        context = initial_context or {}
-        results = []
+    def _build_dependencies(self, workflow: List[Dict[str, Any]], initial_context: Dict[str, Any]) -> List[set]:
+        """根据步骤参数中的$变量引用构建依赖关系
+
+        - "$<task>_result" 依赖最近一个执行该task的前序步骤
+        - 初始上下文中已有的变量不产生依赖
+        - 其他无法确定来源的变量（可能是前序步骤结果中的字段）依赖所有前序步骤
+        - 参数中没有$变量引用且没有depends_on的步骤依赖上一个步骤（因而可以看到所有前序步骤的结果），
+          与原来的顺序执行一致；只有显式声明依赖或通过$变量引用确定依赖的步骤才会并发执行
+        - 步骤中显式指定的depends_on（步骤序号或task名称）优先于自动推断
+        """
+        dependencies = []
+        for i, step in enumerate(workflow):
+            step_deps = set()
+
+            explicit_deps = step.get("depends_on")
+            if explicit_deps is not None:
+                for ref in explicit_deps:
+                    if isinstance(ref, int):
+                        if 0 <= ref < i:
+                            step_deps.add(ref)
+                    else:
+                        producers = [j for j in range(i) if workflow[j].get("task") == ref]
+                        if producers:
+                            step_deps.add(producers[-1])
+                dependencies.append(step_deps)
+                continue
+
+            refs = [
+                value[1:] for value in (step.get("params") or {}).values()
+                if isinstance(value, str) and value.startswith("$")
+            ]
+            if not refs:
+                if i > 0:
+                    step_deps.add(i - 1)
+                dependencies.append(step_deps)
+                continue
+
+            for var_name in refs:
+                producers = [j for j in range(i) if f"{workflow[j].get('task')}_result" == var_name]
+                if producers:
+                    step_deps.add(producers[-1])
+                elif var_name not in initial_context:
+                    step_deps.update(range(i))
+            dependencies.append(step_deps)
+
+        return dependencies
+
+    def _merge_step_result(self, context: Dict[str, Any], task: str, step_result: Any) -> None:
+        """将步骤结果合并到上下文中"""
+        # 使用任务名称作为结果的键
+        context[f"{task}_result"] = step_result
+
+        # 同时将结果的各个字段添加到上下文中
+        if isinstance(step_result, dict):
+            for key, value in step_result.items():
+                context[key] = value
+
+    async def execute_workflow(
+        self,
+        workflow: List[Dict[str, Any]],
+        initial_context: Dict[str, Any] = None,
+        run_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """执行工作流
+
+        根据参数中的$变量引用和depends_on构建依赖图（没有引用的步骤依赖上一个步骤），互不依赖的步骤并发执行（并发数由workflow.max_parallel限制）。
+        每个步骤只能看到初始上下文和其所有上游步骤的结果，结果按步骤顺序合并，保证输出与执行时序无关。
+        启用检查点时每个步骤的结果按智能体、任务和解析后的输入的哈希持久化，
+        传入已有的run_id时已完成的步骤直接从检查点恢复。
+        步骤失败时抛出WorkflowExecutionError，其中的run_id可用于查询和恢复这次运行。
+        """
+        initial_context = dict(initial_context or {})
+        max_parallel = settings.config.get("workflow", {}).get("max_parallel", 4)
+
+        # 创建运行记录
+        checkpoints = workflow_checkpoint_service if workflow_checkpoint_service.enabled else None
+        if checkpoints is not None and run_id is None:
+            try:
+                run_id = await checkpoints.create_run(workflow, initial_context)
+            except Exception as e:
+                logger.error(f"创建工作流运行记录失败，不使用检查点: {str(e)}")
+                checkpoints = None
+        resumed_steps = []
 
         # 记录开始时间
         start_time = time.time()
-        logger.info(f"开始执行工作流: {len(workflow)} 个步骤")
+        logger.info(f"开始执行工作流: {len(workflow)} 个步骤，最大并发数: {max_parallel}")
 
-        for i, step in enumerate(workflow):
+        # 构建依赖关系，max_parallel<=1时退化为严格顺序执行
+        if max_parallel <= 1:
+            dependencies = [{i - 1} if i > 0 else set() for i in range(len(workflow))]
+        else:
+            dependencies = self._build_dependencies(workflow, initial_context)
+
+        # 计算每个步骤的所有上游步骤
+        ancestors: List[set] = []
+        for i, step_deps in enumerate(dependencies):
+            step_ancestors = set(step_deps)
+            for dep in step_deps:
+                step_ancestors |= ancestors[dep]
+            ancestors.append(step_ancestors)
+
+        semaphore = asyncio.Semaphore(max(1, max_parallel))
+        step_results: Dict[int, Any] = {}
+        step_times: Dict[int, float] = {}
+        tasks: Dict[int, asyncio.Task] = {}
+
+        async def run_step(i: int, step: Dict[str, Any]) -> None:
             agent_id = step.get("agent")
             task = step.get("task")
             params = step.get("params", {})
 
+            # 等待上游步骤完成
+            if dependencies[i]:
+                await asyncio.gather(*(tasks[dep] for dep in dependencies[i]))
+
             if not agent_id or not task:
                 logger.error("工作流步骤缺少agent或task")
-                continue
+                return
 
-            logger.info(f"执行工作流步骤 {i+1}/{len(workflow)}: {agent_id}.{task}")
+            # 步骤上下文：初始上下文加上所有上游步骤的结果（按步骤顺序合并）
+            context = dict(initial_context)
+            for ancestor in sorted(ancestors[i]):
+                if ancestor in step_results:
+                    self._merge_step_result(context, workflow[ancestor].get("task"), step_results[ancestor])
 
             # 处理参数中的变量引用
             processed_params = {}
@@ -770,48 +891,112 @@ class AgentCoordinator:
             # 合并上下文和处理后的参数
             step_context = {**context, **processed_params}
 
-            # 执行任务
-            step_result = await self.delegate_task(agent_id, task, step_context)
+            # 从检查点恢复
+            step_key = build_step_key(agent_id, task, step_context)
+            if checkpoints is not None and run_id is not None:
+                try:
+                    checkpoint = await checkpoints.load(run_id, step_key)
+                except Exception as e:
+                    logger.error(f"加载工作流检查点失败: {str(e)}")
+                    checkpoint = None
+                if checkpoint is not None:
+                    logger.info(f"工作流步骤 {i+1}/{len(workflow)} 从检查点恢复: {agent_id}.{task}")
+                    step_results[i] = checkpoint["result"]
+                    step_times[i] = time.time() - start_time
+                    resumed_steps.append(i)
+                    return
+
+            async with semaphore:
+                logger.info(f"执行工作流步骤 {i+1}/{len(workflow)}: {agent_id}.{task}")
+                step_results[i] = await self.delegate_task(agent_id, task, step_context)
+            step_times[i] = time.time() - start_time
+
+            # 保存检查点，失败的步骤（返回error）不保存
+            result = step_results[i]
+            if checkpoints is not None and run_id is not None and not (isinstance(result, dict) and "error" in result):
+                try:
+                    await checkpoints.save(run_id, i, step_key, agent_id, task, result)
+                except Exception as e:
+                    logger.error(f"保存工作流检查点失败: {str(e)}")
 
-            # 更新上下文
-            # 使用任务名称作为结果的键
-            result_key = f"{task}_result"
-            context[result_key] = step_result
+        for i, step in enumerate(workflow):
+            tasks[i] = asyncio.ensure_future(run_step(i, step))
 
-            # 同时将结果的各个字段添加到上下文中
-            if isinstance(step_result, dict):
-                for key, value in step_result.items():
-                    context[key] = value
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException as e:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            if checkpoints is not None and run_id is not None:
+                try:
+                    await checkpoints.finish_run(run_id, "failed", str(e) or type(e).__name__)
+                except Exception as finish_error:
+                    logger.error(f"更新工作流运行状态失败: {str(finish_error)}")
+            if run_id is not None:
+                logger.error(f"工作流执行失败，可以通过运行ID {run_id} 恢复")
+            if isinstance(e, Exception):
+                raise WorkflowExecutionError(run_id, e) from e
+            raise
+
+        # 按步骤顺序合并结果，记录结果和执行历史
+        context = dict(initial_context)
+        results = []
+        for i, step in enumerate(workflow):
+            if i not in step_results:
+                continue
+
+            agent_id = step.get("agent")
+            task = step.get("task")
+            params = step.get("params", {})
+            step_result = step_results[i]
+
+            self._merge_step_result(context, task, step_result)
 
-            # 记录结果
             results.append({
                 "agent": agent_id,
                 "task": task,
                 "params": params,
                 "result": step_result,
-                "execution_time": time.time() - start_time
+                "execution_time": step_times[i]
             })
 
-            # 记录执行历史
             self.execution_history.append({
                 "workflow_step": i+1,
                 "agent_id": agent_id,
                 "task": task,
                 "params": params,
                 "result_summary": self._get_result_summary(step_result),
-                "execution_time": time.time() - start_time
+                "execution_time": step_times[i]
             })
 
+        if checkpoints is not None and run_id is not None:
+            try:
+                await checkpoints.finish_run(run_id, "succeeded")
+            except Exception as e:
+                logger.error(f"更新工作流运行状态失败: {str(e)}")
+
         # 计算总执行时间
         total_execution_time = time.time() - start_time
-        logger.info(f"工作流执行完成，耗时: {total_execution_time:.2f}秒")
+        logger.info(f"工作流执行完成，耗时: {total_execution_time:.2f}秒，从检查点恢复 {len(resumed_steps)} 个步骤")
 
         return {
             "workflow_results": results,
             "final_context": context,
-            "execution_time": total_execution_time
+            "execution_time": total_execution_time,
+            "run_id": run_id,
+            "resumed_steps": len(resumed_steps)
         }
 
+    async def resume_workflow(self, run_id: str) -> Dict[str, Any]:
+        """恢复执行失败的工作流，已完成的步骤从检查点恢复"""
+        run = await workflow_checkpoint_service.load_run(run_id)
+        if run is None:
+            raise ValueError(f"未找到工作流运行记录: {run_id}")
+
+        logger.info(f"恢复工作流: {run_id}, 已完成步骤: {len(run['completed_steps'])}/{len(run['workflow'])}")
+        return await self.execute_workflow(run["workflow"], run["initial_context"], run_id=run_id)
+
     def _get_result_summary(self, result: Any) -> Dict[str, Any]:
         """获取结果摘要，用于记录执行历史"""
         if isinstance(result, dict):
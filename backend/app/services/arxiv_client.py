@@ -0,0 +1,199 @@
+"""
+原生异步arXiv客户端：基于httpx流式读取Atom feed，边接收边解析，并通过共享限流器遵守arXiv的请求频率限制
+"""
+
+from typing import Dict, List, Any, Optional, AsyncGenerator
+from xml.etree.ElementTree import XMLPullParser, Element
+import asyncio
+import time
+import httpx
+from app.core.config import settings
+from app.core.logger import get_logger
+
+# 创建日志器
+logger = get_logger("arxiv_client")
+
+# Atom命名空间
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+# 排序方式映射
+SORT_BY = {
+    "relevance": "relevance",
+    "date": "submittedDate",
+    "submittedDate": "submittedDate",
+    "lastUpdatedDate": "lastUpdatedDate"
+}
+
+
+class ArxivRateLimiter:
+    """arXiv请求限流器：相邻两次请求至少间隔min_interval秒，所有调用方共享"""
+
+    def __init__(self, min_interval: float = 3.0):
+        """初始化限流器"""
+        self.min_interval = min_interval
+        self.last_request_at = 0.0
+        self._lock = asyncio.Lock()
+
+        # 指标
+        self.total_requests = 0
+        self.total_wait_time = 0.0
+
+    async def acquire(self) -> None:
+        """等待直到可以发起下一次请求"""
+        async with self._lock:
+            wait_time = self.last_request_at + self.min_interval - time.monotonic()
+            if wait_time > 0:
+                self.total_wait_time += wait_time
+                await asyncio.sleep(wait_time)
+            self.last_request_at = time.monotonic()
+            self.total_requests += 1
+
+
+def _text(element: Element, tag: str) -> str:
+    """获取子元素文本并规整空白"""
+    child = element.find(tag)
+    if child is None or child.text is None:
+        return ""
+    return " ".join(child.text.split())
+
+
+def parse_entry(entry: Element) -> Dict[str, Any]:
+    """将Atom entry转换为与arxiv库结果一致的字典"""
+    entry_id = _text(entry, f"{ATOM_NS}id")
+    published = _text(entry, f"{ATOM_NS}published")
+
+    pdf_url = ""
+    for link in entry.findall(f"{ATOM_NS}link"):
+        if link.get("title") == "pdf":
+            pdf_url = link.get("href", "")
+            break
+    if not pdf_url and entry_id:
+        pdf_url = entry_id.replace("/abs/", "/pdf/")
+
+    return {
+        "title": _text(entry, f"{ATOM_NS}title"),
+        "authors": [_text(author, f"{ATOM_NS}name") for author in entry.findall(f"{ATOM_NS}author")],
+        "year": int(published[:4]) if published[:4].isdigit() else "",
+        "abstract": (entry.findtext(f"{ATOM_NS}summary") or "").strip(),
+        "url": pdf_url,
+        "categories": [c.get("term") for c in entry.findall(f"{ATOM_NS}category") if c.get("term")],
+        "entry_id": entry_id,
+        "source": "arxiv"
+    }
+
+
+class ArxivClient:
+    """异步arXiv客户端，配置来自academic_search.arxiv"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None, config: Optional[Dict[str, Any]] = None):
+        """初始化客户端"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("arxiv", {})
+        self.enabled = config.get("async_client", True)
+        self.api_url = config.get("api_url", "https://export.arxiv.org/api/query")
+        self.page_size = config.get("page_size", 100)
+        self.timeout = config.get("timeout", 20)
+        self.limiter = ArxivRateLimiter(config.get("min_interval", 3.0))
+        self.client = client
+
+    def bind(self, client: httpx.AsyncClient) -> None:
+        """使用调用方共享的httpx客户端"""
+        self.client = client
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取httpx客户端，未绑定时创建一个"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+        return self.client
+
+    async def _stream_feed(self, params: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """请求一页Atom feed，每解析完一个entry就产出一条结果"""
+        await self.limiter.acquire()
+
+        parser = XMLPullParser(events=("end",))
+        async with self._get_client().stream("GET", self.api_url, params=params, timeout=self.timeout) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag != f"{ATOM_NS}entry":
+                        continue
+                    result = parse_entry(element)
+                    element.clear()
+                    # arXiv用一个特殊的entry返回查询错误
+                    if "/api/errors" in result["entry_id"]:
+                        raise ValueError(f"arXiv查询错误: {result['abstract'] or result['title']}")
+                    yield result
+        parser.close()
+
+    async def stream_search(
+        self,
+        query: str,
+        max_results: int = 10,
+        sort_by: str = "relevance",
+        categories: Optional[List[str]] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """搜索arXiv，边接收边产出结果，结果不足时按page_size分页"""
+        if categories:
+            query = query + " AND (" + " OR ".join([f"cat:{cat}" for cat in categories]) + ")"
+
+        start = 0
+        while start < max_results:
+            page_size = min(self.page_size, max_results - start)
+            params = {
+                "search_query": query,
+                "start": start,
+                "max_results": page_size,
+                "sortBy": SORT_BY.get(sort_by, "relevance"),
+                "sortOrder": "descending"
+            }
+
+            received = 0
+            feed = self._stream_feed(params)
+            try:
+                async for result in feed:
+                    received += 1
+                    yield result
+                    if received >= page_size:
+                        break
+            finally:
+                # 调用方提前停止或本页已满时关闭生成器，释放HTTP连接
+                await feed.aclose()
+
+            # 返回的结果少于请求数量，说明没有更多结果
+            if received < page_size:
+                break
+            start += received
+
+    async def search(
+        self,
+        query: str,
+        max_results: int = 10,
+        sort_by: str = "relevance",
+        categories: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """搜索arXiv，返回结果列表"""
+        return [result async for result in self.stream_search(query, max_results, sort_by, categories)]
+
+    async def get_paper(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """按arXiv ID获取论文，未找到时返回None"""
+        feed = self._stream_feed({"id_list": paper_id, "max_results": 1})
+        try:
+            async for result in feed:
+                return result
+            return None
+        finally:
+            # 提前结束时关闭生成器，释放HTTP连接
+            await feed.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限流器指标"""
+        return {
+            "total_requests": self.limiter.total_requests,
+            "total_wait_time": self.limiter.total_wait_time,
+            "min_interval": self.limiter.min_interval
+        }
+
+
+# 创建全局arXiv客户端，限流器在所有调用方之间共享
+arxiv_client = ArxivClient()
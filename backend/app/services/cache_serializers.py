@@ -0,0 +1,144 @@
+"""
+缓存值序列化：可选的orjson/msgpack序列化和zstd/lz4/zlib压缩
+
+序列化结果以两个字节开头，分别记录序列化格式和压缩方式，读取时按头部解码，
+因此修改配置后Redis中已有的条目仍然可以读取。
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import json
+import zlib
+from app.core.config import settings
+from app.core.logger import get_logger
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+# 创建日志器
+logger = get_logger("cache_serializers")
+
+# 头部第一个字节：序列化格式；第二个字节：压缩方式
+FORMAT_JSON = b"j"
+FORMAT_MSGPACK = b"m"
+COMPRESSION_NONE = b"n"
+COMPRESSION_ZLIB = b"z"
+COMPRESSION_ZSTD = b"s"
+COMPRESSION_LZ4 = b"l"
+
+
+class SerializationError(Exception):
+    """值无法序列化"""
+    pass
+
+
+def _dumps_json(value: Any) -> bytes:
+    """JSON序列化，orjson可用时使用orjson"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _loads_json(data: bytes) -> Any:
+    """JSON反序列化"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CacheSerializer:
+    """缓存值序列化器，配置来自cache.serializer、cache.compression和cache.compress_min_bytes"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化序列化器，所选的库未安装时退回JSON和zlib"""
+        if config is None:
+            config = settings.config.get("cache", {})
+
+        self.format = FORMAT_JSON
+        if config.get("serializer", "json") == "msgpack":
+            if MSGPACK_AVAILABLE:
+                self.format = FORMAT_MSGPACK
+            else:
+                logger.warning("msgpack未安装，缓存序列化使用JSON")
+
+        compression = config.get("compression", "zlib")
+        self.compression = {
+            "none": COMPRESSION_NONE,
+            "zlib": COMPRESSION_ZLIB,
+            "zstd": COMPRESSION_ZSTD,
+            "lz4": COMPRESSION_LZ4
+        }.get(compression, COMPRESSION_ZLIB)
+        if self.compression == COMPRESSION_ZSTD and not ZSTD_AVAILABLE:
+            logger.warning("zstandard未安装，缓存压缩使用zlib")
+            self.compression = COMPRESSION_ZLIB
+        if self.compression == COMPRESSION_LZ4 and not LZ4_AVAILABLE:
+            logger.warning("lz4未安装，缓存压缩使用zlib")
+            self.compression = COMPRESSION_ZLIB
+        # 序列化结果超过这个字节数时才压缩
+        self.compress_min_bytes = config.get("compress_min_bytes", 4096)
+        self.compress_level = config.get("compress_level", 3)
+
+    def serialize(self, value: Any) -> bytes:
+        """序列化并按需压缩，无法序列化时抛出SerializationError"""
+        return self.encode(value)[0]
+
+    def encode(self, value: Any, compress: bool = True) -> Tuple[bytes, int]:
+        """序列化并按需压缩，同时返回压缩前的字节数（用于估算内存占用）"""
+        try:
+            if self.format == FORMAT_MSGPACK:
+                payload = msgpack.packb(value, use_bin_type=True)
+            else:
+                payload = _dumps_json(value)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise SerializationError(str(e))
+
+        raw_size = len(payload)
+        compression = COMPRESSION_NONE
+        if compress and self.compression != COMPRESSION_NONE and raw_size >= self.compress_min_bytes:
+            if self.compression == COMPRESSION_ZSTD:
+                compressed = zstandard.ZstdCompressor(level=self.compress_level).compress(payload)
+            elif self.compression == COMPRESSION_LZ4:
+                compressed = lz4.frame.compress(payload)
+            else:
+                compressed = zlib.compress(payload, self.compress_level)
+            # 压缩后没有变小时保存原始数据
+            if len(compressed) < len(payload):
+                payload = compressed
+                compression = self.compression
+
+        return self.format + compression + payload, raw_size
+
+    def deserialize(self, data: bytes) -> Any:
+        """按头部解压并反序列化"""
+        data_format, compression, payload = data[:1], data[1:2], data[2:]
+
+        if compression == COMPRESSION_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compression == COMPRESSION_ZSTD:
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif compression == COMPRESSION_LZ4:
+            payload = lz4.frame.decompress(payload)
+
+        if data_format == FORMAT_MSGPACK:
+            return msgpack.unpackb(payload, raw=False)
+        return _loads_json(payload)
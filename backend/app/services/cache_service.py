@@ -1,143 +1,686 @@
-from typing import Any, Dict, Optional, Callable, Awaitable
-import json
+from typing import Any, Dict, Optional, Callable, Awaitable, List, Tuple, Union
+from collections import OrderedDict
 import hashlib
+import heapq
+import inspect
 import time
 import asyncio
 from functools import wraps
+from app.core.config import settings
 from app.core.logger import get_logger
+from app.services.cache_serializers import CacheSerializer, SerializationError
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
 
 logger = get_logger("cache")
 
+
+def _encode_key_part(value: Any) -> str:
+    """把参数编码为缓存键的一部分，比json.dumps快；不支持的类型抛出TypeError"""
+    if value is None or isinstance(value, (str, bool, int, float)):
+        # repr区分字符串"1"和数字1
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(map(_encode_key_part, value)) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            f"{_encode_key_part(k)}:{_encode_key_part(v)}"
+            for k, v in sorted(value.items(), key=lambda item: str(item[0]))
+        ) + "}"
+    raise TypeError(f"不支持作为缓存键的类型: {type(value)}")
+
+
+def _format_tags(tags: Optional[Dict[str, Any]]) -> List[str]:
+    """把标签字典转换为"名称=值"形式的标签列表，值为列表时每个元素一个标签，值为None的标签忽略"""
+    result = set()
+    for name, value in (tags or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        for item in values:
+            if item is not None:
+                result.add(f"{name}={item}")
+    return sorted(result)
+
+
 class CacheService:
-    """简单的内存缓存服务"""
+    """两级缓存服务：进程内L1 + Redis L2
 
-    def __init__(self, default_ttl: int = 3600):
+    L1是有界内存缓存，按LRU顺序淘汰，同时限制条目数和估算的总字节数；过期时间记录在最小堆中，
+    每次读写时顺带清理已过期的条目，不依赖同一个键被再次读取。
+    启用L2（cache.type为redis）时写入同时写L1和Redis，读取先查L1再查Redis，Redis命中后回填L1，
+    因此一个工作进程缓存的结果对所有工作进程可见；L1条目最多保留l1_ttl秒，限制各进程之间的不一致时间。
+    缓存键形如"命名空间:哈希"，命名空间（即cached装饰器的prefix）可以在cache.namespaces中单独配置TTL。
+    条目在TTL之后还保留stale_grace秒：get只返回新鲜的值，cached装饰器在宽限期内直接返回旧值并在后台刷新，
+    同一个键同时只有一次重新计算（进程内合并并发请求，启用Redis时用锁保证只有一个工作进程刷新）。
+    条目可以带标签（如source=arxiv、user=1），每个条目还自动带有命名空间标签ns=命名空间。每个标签有一个代数，
+    条目记录写入时各标签的代数，读取时任一标签的代数已经增加则视为失效，因此按标签或命名空间失效只需递增代数，
+    耗时与标签数成正比，与条目数无关。启用Redis时代数保存在Redis中，所有工作进程共享。
+    """
+
+    def __init__(
+        self,
+        default_ttl: int = 3600,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        config: Optional[Dict[str, Any]] = None
+    ):
         """
         初始化缓存服务
 
         Args:
             default_ttl: 默认缓存过期时间（秒）
+            max_entries: L1最大条目数，0表示不限制
+            max_bytes: L1估算的最大总字节数，0表示不限制
+            config: 缓存配置（cache节），用于L2和命名空间TTL
         """
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        config = config or {}
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         self.default_ttl = default_ttl
-        logger.info(f"缓存服务初始化完成，默认TTL: {default_ttl}秒")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # 过期时间堆：(过期时间, 键)，键被覆盖后旧记录在弹出时跳过
+        self._expiry_heap: List[Tuple[float, str]] = []
 
-    def _generate_key(self, prefix: str, args: tuple, kwargs: dict) -> str:
-        """生成缓存键"""
-        # 将参数转换为字符串，跳过不可序列化的对象
-        try:
-            # 处理args，跳过第一个参数（通常是self）
-            if len(args) > 0:
-                serializable_args = args[1:] if len(args) > 1 else ()
-            else:
-                serializable_args = ()
-
-            # 尝试序列化
-            args_str = json.dumps(serializable_args, sort_keys=True)
-        except TypeError:
-            # 如果序列化失败，使用参数的字符串表示
-            args_str = str(hash(str(serializable_args)))
-            logger.warning(f"无法序列化args参数，使用哈希值: {args_str}")
+        # 命名空间TTL：{命名空间: {"ttl": 秒, "l1_ttl": 秒}}
+        self.namespaces: Dict[str, Dict[str, Any]] = config.get("namespaces", {}) or {}
 
-        try:
-            # 处理kwargs
-            serializable_kwargs = {k: v for k, v in kwargs.items() if self._is_serializable(v)}
-            kwargs_str = json.dumps(serializable_kwargs, sort_keys=True)
-        except TypeError:
-            # 如果序列化失败，使用参数的字符串表示
-            kwargs_str = str(hash(str(kwargs)))
-            logger.warning(f"无法序列化kwargs参数，使用哈希值: {kwargs_str}")
-
-        # 生成哈希
-        key = f"{prefix}:{args_str}:{kwargs_str}"
-        hashed_key = hashlib.md5(key.encode()).hexdigest()
-        return hashed_key
-
-    def _is_serializable(self, obj: Any) -> bool:
-        """检查对象是否可序列化为JSON"""
-        try:
-            json.dumps(obj)
-            return True
-        except (TypeError, OverflowError):
-            return False
+        # Redis L2
+        self.use_redis = config.get("enabled", True) and config.get("type", "memory") == "redis"
+        if self.use_redis and not REDIS_AVAILABLE:
+            logger.warning("redis未安装，缓存只使用进程内L1")
+            self.use_redis = False
+        self.redis_prefix = config.get("prefix", "apa:")
+        self.l1_ttl = config.get("l1_ttl", 60)
+        # 过期后仍可返回旧值的宽限期（秒）和后台刷新锁的超时时间
+        self.stale_grace = config.get("stale_grace", 300)
+        self.refresh_lock_timeout = config.get("refresh_lock_timeout", 30)
+        # 正在进行的重新计算：缓存键 -> 任务
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # 缓存值序列化器（L2存储和L1大小估算）
+        self.serializer = CacheSerializer(config)
+        self._background_tasks = set()
+        # 本进程已知的标签代数：标签 -> 代数；启用Redis时Redis中的代数键保留tag_ttl秒
+        self._generations: Dict[str, int] = {}
+        self.tag_ttl = config.get("tag_ttl", 7 * 24 * 3600)
+        self._redis = None
+        # Redis出错后在这个时间之前只使用L1
+        self._redis_retry_at = 0.0
 
-    async def get(self, key: str) -> Optional[Any]:
-        """获取缓存值"""
-        if key not in self.cache:
+        # 指标
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.invalidations = 0
+        self.invalidated_hits = 0
+        logger.info(
+            f"缓存服务初始化完成，默认TTL: {default_ttl}秒，最大条目数: {max_entries}，最大字节数: {max_bytes}，"
+            f"Redis L2: {'启用' if self.use_redis else '未启用'}"
+        )
+
+    def _build_key(self, prefix: str, params: Dict[str, Any]) -> str:
+        """按参数名排序生成缓存键，跳过不能作为缓存键的参数"""
+        parts = []
+        for name in sorted(params):
+            try:
+                parts.append(f"{name}={_encode_key_part(params[name])}")
+            except TypeError:
+                logger.debug(f"参数 {name} 不能作为缓存键，已跳过")
+        hashed_key = hashlib.md5(";".join(parts).encode("utf-8")).hexdigest()
+        # 保留前缀作为命名空间
+        return f"{prefix}:{hashed_key}"
+
+    def _make_param_binder(self, func: Callable) -> Tuple[Callable[..., Dict[str, Any]], Optional[str]]:
+        """根据函数签名创建参数绑定函数，返回(绑定函数, 不参与缓存键的参数名)
+
+        位置参数和关键字参数按参数名对齐并填充默认值，同一次调用无论以何种方式传参都得到相同的参数字典；
+        只有第一个参数名为self或cls时才跳过它，静态方法的第一个参数会参与缓存键。
+        """
+        parameters = list(inspect.signature(func).parameters.values())
+        positional = [
+            p.name for p in parameters
+            if p.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+        ]
+        defaults = {p.name: p.default for p in parameters if p.default is not inspect.Parameter.empty}
+        skip = positional[0] if positional and positional[0] in ("self", "cls") else None
+
+        def bind(*args, **kwargs) -> Dict[str, Any]:
+            params = dict(defaults)
+            params.update(zip(positional, args))
+            if len(args) > len(positional):
+                params["*args"] = args[len(positional):]
+            params.update(kwargs)
+            return params
+
+        return bind, skip
+
+    def _make_key_builder(self, prefix: str, func: Callable) -> Callable[..., str]:
+        """根据函数签名创建缓存键生成函数"""
+        bind, skip = self._make_param_binder(func)
+
+        def build_key(*args, **kwargs) -> str:
+            params = bind(*args, **kwargs)
+            if skip is not None:
+                params.pop(skip, None)
+            return self._build_key(prefix, params)
+
+        return build_key
+
+    def _entry_tags(self, key: str, tags: Optional[Dict[str, Any]]) -> List[str]:
+        """条目的标签：调用方指定的标签加上命名空间标签"""
+        return sorted(set(_format_tags(tags)) | {f"ns={key.split(':', 1)[0]}"})
+
+    def _entry_key(self, key: str) -> str:
+        """缓存条目在Redis中的键，与标签代数键和刷新锁键分开，clear只删除条目"""
+        return f"{self.redis_prefix}entry:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        """标签代数在Redis中的键"""
+        return f"{self.redis_prefix}tag:{tag}"
+
+    async def _current_generations(self, tags: List[str]) -> Dict[str, int]:
+        """获取标签的当前代数，启用Redis时从Redis读取并更新本进程已知的代数"""
+        redis_client = self._get_redis()
+        if redis_client is not None and tags:
+            try:
+                values = await redis_client.mget([self._tag_key(tag) for tag in tags])
+                for tag, value in zip(tags, values):
+                    if value is not None:
+                        self._generations[tag] = max(self._generations.get(tag, 0), int(value))
+            except Exception as e:
+                self._redis_failed(e)
+        return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def _is_current(self, generations: Optional[Dict[str, int]]) -> bool:
+        """条目写入时记录的标签代数是否仍然是最新的"""
+        for tag, generation in (generations or {}).items():
+            if generation < self._generations.get(tag, 0):
+                return False
+        return True
+
+    def _remove(self, key: str) -> None:
+        """删除条目并更新字节数"""
+        item = self.cache.pop(key, None)
+        if item is not None:
+            self.total_bytes -= item["size"]
+
+    def _purge_expired(self) -> None:
+        """从过期时间堆中清理所有已过期的条目"""
+        now = time.time()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            item = self.cache.get(key)
+            # 键已被覆盖（过期时间不同）或已删除时跳过
+            if item is not None and item["expires_at"] == expires_at:
+                self._remove(key)
+                self.expirations += 1
+
+        # 覆盖和删除留下的无效记录过多时重建堆
+        if len(heap) > 2 * len(self.cache) + 1000:
+            self._expiry_heap = [(item["expires_at"], key) for key, item in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _evict(self) -> None:
+        """超出条目数或字节数限制时按LRU顺序淘汰"""
+        while self.cache and (
+            (self.max_entries and len(self.cache) > self.max_entries)
+            or (self.max_bytes and self.total_bytes > self.max_bytes)
+        ):
+            key, item = self.cache.popitem(last=False)
+            self.total_bytes -= item["size"]
+            self.evictions += 1
+
+    def _namespace_ttl(self, key: str, ttl: Optional[int], stale_grace: Optional[int] = None) -> Tuple[int, int, int]:
+        """按命名空间确定TTL、L1的TTL和宽限期，命名空间配置优先于调用方传入的值"""
+        namespace = self.namespaces.get(key.split(":", 1)[0], {}) or {}
+        ttl = namespace.get("ttl", ttl if ttl is not None else self.default_ttl)
+        grace = namespace.get("stale_grace", stale_grace if stale_grace is not None else self.stale_grace)
+        if not self.use_redis:
+            return ttl, ttl + grace, grace
+        return ttl, min(ttl + grace, namespace.get("l1_ttl", self.l1_ttl)), grace
+
+    def _get_redis(self):
+        """延迟创建Redis连接，不可用时返回None"""
+        if not self.use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            try:
+                self._redis = aioredis.Redis(
+                    host=settings.REDIS_HOST,
+                    port=settings.REDIS_PORT,
+                    db=settings.REDIS_DB,
+                    password=settings.REDIS_PASSWORD,
+                    decode_responses=False
+                )
+            except Exception as e:
+                logger.error(f"Redis不可用，缓存只使用进程内L1: {str(e)}")
+                self.use_redis = False
+                return None
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        """Redis调用失败，30秒内只使用L1"""
+        self.l2_errors += 1
+        self._redis_retry_at = time.monotonic() + 30
+        logger.warning(f"Redis缓存调用失败，30秒内只使用进程内L1: {str(error)}")
+
+    def _l1_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """从L1获取缓存条目"""
+        self._purge_expired()
+        cache_item = self.cache.get(key)
+        if cache_item is None:
             return None
 
-        cache_item = self.cache[key]
         # 检查是否过期
         if cache_item["expires_at"] < time.time():
             # 过期，删除缓存
-            del self.cache[key]
+            self._remove(key)
+            self.expirations += 1
             return None
 
-        logger.debug(f"缓存命中: {key}")
-        return cache_item["value"]
+        self.cache.move_to_end(key)
+        return cache_item
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """设置缓存值"""
-        if ttl is None:
-            ttl = self.default_ttl
+    def _l1_set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        size: int,
+        fresh_until: Optional[float] = None,
+        generations: Optional[Dict[str, int]] = None
+    ) -> None:
+        """写入L1，ttl为物理过期时间，fresh_until之后的值视为旧值，size为估算的字节数，generations为写入时的标签代数"""
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"缓存值过大（{size}字节），跳过缓存: {key}")
+            return
 
+        self._purge_expired()
+        self._remove(key)
         expires_at = time.time() + ttl
         self.cache[key] = {
             "value": value,
-            "expires_at": expires_at
+            "expires_at": expires_at,
+            "fresh_until": fresh_until if fresh_until is not None else expires_at,
+            "generations": generations or {},
+            "size": size
         }
+        self.total_bytes += size
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        self._evict()
+
+    async def _get_entry(self, key: str) -> Tuple[Optional[Any], bool]:
+        """获取缓存值和是否新鲜，先查L1再查Redis；标签已失效的条目视为不存在"""
+        item = self._l1_get(key)
+        if item is not None:
+            if self._is_current(item["generations"]):
+                return item["value"], time.time() < item["fresh_until"]
+            self._remove(key)
+            self.invalidated_hits += 1
+
+        redis_client = self._get_redis()
+        if redis_client is None:
+            return None, False
+
+        try:
+            data = await redis_client.get(self._entry_key(key))
+        except Exception as e:
+            self._redis_failed(e)
+            data = None
+        envelope = None
+        if data is not None:
+            try:
+                envelope = self.serializer.deserialize(data)
+            except Exception as e:
+                logger.error(f"Redis缓存值解析失败: {key}, {str(e)}")
+        if not isinstance(envelope, dict) or envelope.get("v") is None:
+            self.l2_misses += 1
+            return None, False
+
+        generations = envelope.get("t") or {}
+        await self._current_generations(list(generations))
+        if not self._is_current(generations):
+            self.invalidated_hits += 1
+            self.l2_misses += 1
+            return None, False
+
+        self.l2_hits += 1
+        # 回填L1
+        _, l1_ttl, _ = self._namespace_ttl(key, None)
+        self._l1_set(key, envelope["v"], l1_ttl, len(data) + len(key) + 100, envelope.get("f"), generations)
+        logger.debug(f"Redis缓存命中: {key}")
+        return envelope["v"], time.time() < envelope.get("f", 0)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取新鲜的缓存值，超过TTL的旧值视为未命中"""
+        value, fresh = await self._get_entry(key)
+        if value is not None and fresh:
+            self.hits += 1
+            logger.debug(f"缓存命中: {key}")
+            return value
+        self.misses += 1
+        return None
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        stale_grace: Optional[int] = None,
+        tags: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """设置缓存值，同时写入L1和Redis；条目在TTL之后还保留stale_grace秒供cached装饰器返回旧值
+
+        值只序列化一次，同时用于Redis存储和L1大小估算；无法序列化的值不缓存，返回False。
+        tags为{名称: 值}，值为列表时每个元素一个标签，可以通过invalidate_tags按标签使条目失效。
+        """
+        generations = await self._current_generations(self._entry_tags(key, tags))
+        return await self._store(key, value, ttl, stale_grace, generations)
+
+    async def _store(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int],
+        stale_grace: Optional[int],
+        generations: Dict[str, int]
+    ) -> bool:
+        """按给定的标签代数写入L1和Redis"""
+        ttl, l1_ttl, grace = self._namespace_ttl(key, ttl, stale_grace)
+        fresh_until = time.time() + ttl
+        redis_client = self._get_redis()
+
+        try:
+            data, raw_size = self.serializer.encode(
+                {"v": value, "f": fresh_until, "t": generations}, compress=redis_client is not None
+            )
+        except SerializationError as e:
+            logger.warning(f"缓存值无法序列化，跳过缓存: {key}, {str(e)}")
+            return False
+
+        self._l1_set(key, value, l1_ttl, raw_size + len(key) + 100, fresh_until, generations)
+        if redis_client is not None:
+            try:
+                await redis_client.set(self._entry_key(key), data, ex=max(1, int(ttl + grace)))
+            except Exception as e:
+                self._redis_failed(e)
         logger.debug(f"缓存设置: {key}, TTL: {ttl}秒")
+        return True
 
     async def delete(self, key: str) -> None:
         """删除缓存值"""
         if key in self.cache:
-            del self.cache[key]
-            logger.debug(f"缓存删除: {key}")
+            self._remove(key)
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.delete(self._entry_key(key))
+            except Exception as e:
+                self._redis_failed(e)
+        logger.debug(f"缓存删除: {key}")
+
+    async def invalidate_tags(self, tags: Dict[str, Any]) -> List[str]:
+        """使带有任一给定标签的缓存条目失效，返回失效的标签
+
+        只递增各标签的代数，不遍历条目，耗时与标签数成正比；失效的条目在下次读取时删除，
+        不会再作为旧值返回。启用Redis时代数在Redis中递增，其他工作进程读取Redis时看到新的代数，
+        它们L1中的条目最多在l1_ttl秒后失效。
+        """
+        names = _format_tags(tags)
+        if not names:
+            return []
+        for tag in names:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for tag in names:
+                    pipe.incr(self._tag_key(tag))
+                    pipe.expire(self._tag_key(tag), self.tag_ttl)
+                results = await pipe.execute()
+                for tag, value in zip(names, results[::2]):
+                    self._generations[tag] = max(self._generations[tag], int(value))
+            except Exception as e:
+                self._redis_failed(e)
+
+        self.invalidations += len(names)
+        logger.info(f"缓存标签已失效: {', '.join(names)}")
+        return names
+
+    async def invalidate_namespace(self, namespace: str) -> List[str]:
+        """使命名空间（cached装饰器的prefix）下的所有缓存条目失效"""
+        return await self.invalidate_tags({"ns": namespace})
 
     async def clear(self) -> None:
-        """清空缓存"""
+        """清空缓存（包括Redis中的所有缓存条目）
+
+        只删除条目键，保留标签代数：删除代数后各工作进程已知的代数高于Redis中的代数，之后的失效不再生效。
+        """
         self.cache.clear()
+        self._expiry_heap = []
+        self.total_bytes = 0
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                batch = []
+                async for redis_key in redis_client.scan_iter(match=self._entry_key("*"), count=500):
+                    batch.append(redis_key)
+                    if len(batch) >= 500:
+                        await redis_client.delete(*batch)
+                        batch = []
+                if batch:
+                    await redis_client.delete(*batch)
+            except Exception as e:
+                self._redis_failed(e)
         logger.info("缓存已清空")
 
-    def cached(self, prefix: str, ttl: Optional[int] = None):
+    async def close(self) -> None:
+        """关闭Redis连接"""
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception as e:
+                logger.error(f"关闭Redis缓存连接失败: {str(e)}")
+            self._redis = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存指标"""
+        return {
+            "entries": len(self.cache),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "l2_enabled": self.use_redis,
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "inflight": len(self._inflight),
+            "tags": len(self._generations),
+            "invalidations": self.invalidations,
+            "invalidated_hits": self.invalidated_hits
+        }
+
+    async def _acquire_refresh_lock(self, key: str) -> bool:
+        """启用Redis时获取跨进程刷新锁，保证只有一个工作进程刷新同一个键"""
+        redis_client = self._get_redis()
+        if redis_client is None:
+            return True
+        try:
+            acquired = await redis_client.set(
+                f"{self.redis_prefix}lock:{key}", "1", nx=True, ex=self.refresh_lock_timeout
+            )
+            return bool(acquired)
+        except Exception as e:
+            self._redis_failed(e)
+            return True
+
+    async def _release_refresh_lock(self, key: str) -> None:
+        """释放跨进程刷新锁"""
+        redis_client = self._get_redis()
+        if redis_client is not None:
+            try:
+                await redis_client.delete(f"{self.redis_prefix}lock:{key}")
+            except Exception as e:
+                self._redis_failed(e)
+
+    def _recompute(
+        self,
+        cache_key: str,
+        func: Callable[..., Awaitable[Any]],
+        args: tuple,
+        kwargs: dict,
+        ttl: Optional[int],
+        stale_grace: Optional[int],
+        tags: List[str],
+        condition: Optional[Callable[[Any], bool]] = None,
+        locked: bool = False
+    ) -> asyncio.Task:
+        """启动重新计算并写入缓存，同一个键同时只有一个计算任务"""
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            return task
+
+        async def compute() -> Any:
+            try:
+                # 在计算之前读取标签代数，计算期间发生的失效会使这次的结果同样失效
+                generations = await self._current_generations(tags)
+                result = await func(*args, **kwargs)
+                # 缓存结果（不满足condition或不可序列化的结果不缓存），写入失败不影响返回结果
+                try:
+                    if condition is not None and not condition(result):
+                        logger.debug(f"结果不满足缓存条件，不缓存: {func.__name__}")
+                    elif await self._store(cache_key, result, ttl, stale_grace, generations):
+                        logger.debug(f"缓存设置: {func.__name__}")
+                except Exception as e:
+                    logger.error(f"写入缓存失败: {func.__name__}, {str(e)}")
+                return result
+            finally:
+                self._inflight.pop(cache_key, None)
+                if locked:
+                    await self._release_refresh_lock(cache_key)
+
+        task = asyncio.ensure_future(compute())
+        self._inflight[cache_key] = task
+        return task
+
+    async def _refresh_in_background(
+        self,
+        cache_key: str,
+        func: Callable[..., Awaitable[Any]],
+        args: tuple,
+        kwargs: dict,
+        ttl: Optional[int],
+        stale_grace: Optional[int],
+        tags: List[str],
+        condition: Optional[Callable[[Any], bool]] = None
+    ) -> None:
+        """在后台刷新旧值，失败时保留旧值直到宽限期结束"""
+        if cache_key in self._inflight or not await self._acquire_refresh_lock(cache_key):
+            return
+        self.refreshes += 1
+        try:
+            await self._recompute(cache_key, func, args, kwargs, ttl, stale_grace, tags, condition, locked=True)
+        except Exception as e:
+            logger.error(f"后台刷新缓存失败: {func.__name__}, {str(e)}")
+
+    def cached(
+        self,
+        prefix: str,
+        ttl: Optional[int] = None,
+        stale_grace: Optional[int] = None,
+        tags: Optional[Union[Dict[str, Any], Callable[[Dict[str, Any]], Dict[str, Any]]]] = None,
+        condition: Optional[Callable[[Any], bool]] = None
+    ):
         """
         缓存装饰器，用于缓存异步函数的结果
 
+        超过TTL但仍在宽限期内的旧值直接返回，同时在后台刷新；未命中时并发调用共享同一次计算。
+
         Args:
             prefix: 缓存键前缀
             ttl: 缓存过期时间（秒）
+            stale_grace: 过期后仍返回旧值的宽限期（秒），为空时使用cache.stale_grace
+            tags: 条目的标签{名称: 值}，或根据调用参数（按参数名对齐并填充默认值，包括self）返回标签的函数
+            condition: 判断结果是否可以缓存的函数，返回False的结果（如空结果或部分失败的结果）直接返回但不缓存
         """
         def decorator(func: Callable[..., Awaitable[Any]]):
+            bind, skip = self._make_param_binder(func)
+
+            def resolve(params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+                """根据调用参数生成缓存键和标签"""
+                entry_tags = (tags(params) if callable(tags) else tags) or {}
+                if skip is not None:
+                    params.pop(skip, None)
+                return self._build_key(prefix, params), entry_tags
+
             @wraps(func)
             async def wrapper(*args, **kwargs):
                 try:
-                    # 生成缓存键
-                    cache_key = self._generate_key(prefix, args, kwargs)
+                    # 生成缓存键和标签
+                    cache_key, entry_tags = resolve(bind(*args, **kwargs))
 
                     # 尝试从缓存获取
-                    cached_value = await self.get(cache_key)
+                    cached_value, fresh = await self._get_entry(cache_key)
                     if cached_value is not None:
-                        logger.debug(f"缓存命中: {func.__name__}")
+                        if fresh:
+                            self.hits += 1
+                            logger.debug(f"缓存命中: {func.__name__}")
+                        else:
+                            self.stale_hits += 1
+                            logger.debug(f"缓存已过期，返回旧值并在后台刷新: {func.__name__}")
+                            task = asyncio.ensure_future(
+                                self._refresh_in_background(
+                                    cache_key, func, args, kwargs, ttl, stale_grace,
+                                    self._entry_tags(cache_key, entry_tags), condition
+                                )
+                            )
+                            self._background_tasks.add(task)
+                            task.add_done_callback(self._background_tasks.discard)
                         return cached_value
-
-                    # 执行原函数
-                    result = await func(*args, **kwargs)
-
-                    # 检查结果是否可序列化
-                    if self._is_serializable(result):
-                        # 缓存结果
-                        await self.set(cache_key, result, ttl)
-                        logger.debug(f"缓存设置: {func.__name__}")
-                    else:
-                        logger.warning(f"函数 {func.__name__} 的结果不可序列化，跳过缓存")
-
-                    return result
+                    self.misses += 1
+                    task = self._recompute(
+                        cache_key, func, args, kwargs, ttl, stale_grace, self._entry_tags(cache_key, entry_tags), condition
+                    )
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
-                    # 如果缓存过程中出现任何错误，记录日志并继续执行原函数
+                    # 缓存层（生成键、读取缓存）出错时记录日志并直接执行原函数
                     logger.error(f"缓存过程出错: {str(e)}")
                     return await func(*args, **kwargs)
+
+                # 执行原函数，并发的未命中请求共享同一次计算；shield保证调用方取消时计算继续。
+                # 原函数的异常直接抛给调用方，不再重试，避免上游故障时每个请求访问两次上游
+                return await asyncio.shield(task)
+
+            # 与装饰器相同的缓存键和标签，供直接读写该函数缓存的代码使用
+            wrapper.cache_key = lambda *args, **kwargs: resolve(bind(*args, **kwargs))[0]
+            wrapper.cache_tags = lambda *args, **kwargs: resolve(bind(*args, **kwargs))[1]
             return wrapper
         return decorator
 
 # 创建全局缓存服务实例
-cache_service = CacheService()
+_cache_config = settings.config.get("cache", {})
+cache_service = CacheService(
+    default_ttl=_cache_config.get("default_ttl", 3600),
+    max_entries=_cache_config.get("max_entries", 10000),
+    max_bytes=_cache_config.get("max_bytes", 256 * 1024 * 1024),
+    config=_cache_config
+)
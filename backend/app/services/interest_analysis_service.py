@@ -69,7 +69,8 @@ class InterestAnalysisService:
             response = await llm_service.acompletion(
                 messages=messages,
                 max_tokens=1500,
-                temperature=0.3
+                temperature=0.3,
+                hedge=True  # 交互式调用，使用对冲请求降低尾延迟
             )
 
             # 解析响应
@@ -0,0 +1,482 @@
+"""
+后台任务服务：持久化的任务存储（SQLAlchemy）、可配置并发的工作池和进度事件
+
+长时间运行的工作流（完整论文生成、智能体工作流）以任务形式提交，
+由工作池在后台执行，不受HTTP请求超时和客户端断开的影响。
+工作池可以运行在API进程内，也可以通过scripts/run_job_worker.py独立运行。
+"""
+
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import os
+import socket
+import uuid
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.context import set_current_user_id
+from app.db.session import SessionLocal
+from app.models.job import Job
+from app.utils.json_utils import safe_dumps
+
+# 创建日志器
+logger = get_logger("job_service")
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+TERMINAL_STATUSES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED}
+
+
+def _now() -> datetime:
+    """当前UTC时间"""
+    return datetime.now(timezone.utc)
+
+
+def _to_json(value: Any) -> Any:
+    """转换为可以存入JSON列的对象"""
+    return json.loads(safe_dumps(value))
+
+
+class JobContext:
+    """传递给任务处理函数的上下文，用于报告进度"""
+
+    def __init__(self, service: "JobService", job_id: str):
+        """初始化任务上下文"""
+        self.service = service
+        self.job_id = job_id
+
+    async def report(self, progress: int, message: str, data: Any = None) -> None:
+        """报告任务进度"""
+        await self.service._run_db(self.service._record_event, self.job_id, progress, message, data)
+
+
+# 任务处理函数：接收任务参数和任务上下文，返回任务结果
+JobHandler = Callable[[Dict[str, Any], JobContext], Awaitable[Any]]
+
+
+class JobService:
+    """后台任务服务"""
+
+    def __init__(self):
+        """初始化后台任务服务"""
+        config = settings.config.get("jobs", {})
+        self.concurrency = config.get("concurrency", 2)
+        self.poll_interval = config.get("poll_interval", 1.0)
+        self.heartbeat_interval = config.get("heartbeat_interval", 10)
+        self.stale_timeout = config.get("stale_timeout", 120)
+        self.max_attempts = config.get("max_attempts", 2)
+        self.max_events = config.get("max_events", 100)
+
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.handlers: Dict[str, JobHandler] = {}
+
+        # 工作协程和本进程正在执行的任务
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+        self._register_default_handlers()
+        logger.info(f"后台任务服务初始化完成，工作者ID: {self.worker_id}")
+
+    # ------------------------------------------------------------------
+    # 任务处理函数
+    # ------------------------------------------------------------------
+
+    def register_handler(self, job_type: str, handler: JobHandler) -> None:
+        """注册任务处理函数"""
+        self.handlers[job_type] = handler
+        logger.info(f"注册任务类型: {job_type}")
+
+    def _register_default_handlers(self) -> None:
+        """注册内置的任务类型"""
+        self.register_handler("full_paper", self._handle_full_paper)
+        self.register_handler("workflow", self._handle_workflow)
+        self.register_handler("predefined_workflow", self._handle_predefined_workflow)
+        self.register_handler("plan_and_execute", self._handle_plan_and_execute)
+
+    async def _handle_full_paper(self, params: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        """生成完整论文，每完成一个章节报告一次进度"""
+        from app.services.paper_service import paper_service
+
+        async for event in paper_service.generate_full_paper_streaming(
+            topic=params["topic"],
+            outline=params["outline"],
+            literature=params.get("literature")
+        ):
+            event_type = event.get("type")
+            if event_type == "section":
+                progress = 5 + int(85 * event["completed"] / max(event["total_sections"], 1))
+                await context.report(progress, f"章节 {event['data']['section_id']} 生成完成", event["data"])
+            elif event_type == "status":
+                await context.report(0, event.get("message", ""))
+            elif event_type == "abstract":
+                await context.report(95, "摘要生成完成")
+            elif event_type == "complete":
+                return event["data"]
+            elif event_type == "error":
+                raise Exception(event.get("message", "生成完整论文失败"))
+
+        raise Exception("论文生成未返回结果")
+
+    async def _handle_workflow(self, params: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        """执行自定义工作流"""
+        from app.services.agent_service import agent_coordinator
+
+        await context.report(0, "开始执行工作流")
+        return await agent_coordinator.execute_workflow(
+            workflow=params["workflow"],
+            initial_context=params.get("context")
+        )
+
+    async def _handle_predefined_workflow(self, params: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        """执行预定义工作流"""
+        from app.services.agent_service import agent_coordinator
+
+        await context.report(0, f"开始执行预定义工作流: {params['workflow_type']}")
+        return await agent_coordinator.execute_predefined_workflow(
+            params["workflow_type"],
+            params.get("params")
+        )
+
+    async def _handle_plan_and_execute(self, params: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+        """规划并执行任务"""
+        from app.services.agent_service import agent_coordinator
+
+        await context.report(0, "开始规划任务")
+        return await agent_coordinator.plan_and_execute(
+            goal=params["goal"],
+            context=params.get("context")
+        )
+
+    # ------------------------------------------------------------------
+    # 提交、查询和取消（供API使用，使用请求的数据库会话）
+    # ------------------------------------------------------------------
+
+    def submit(self, db: Session, job_type: str, params: Dict[str, Any], user_id: Optional[int] = None) -> Job:
+        """提交任务"""
+        if job_type not in self.handlers:
+            raise ValueError(f"未知的任务类型: {job_type}")
+
+        job = Job(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            job_type=job_type,
+            status=JOB_PENDING,
+            params=_to_json(params or {}),
+            progress=0,
+            events=[],
+            cancel_requested=False,
+            attempts=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        logger.info(f"提交任务: ID={job.id}, 类型={job_type}, 用户ID={user_id}")
+        return job
+
+    def get_job(self, db: Session, job_id: str) -> Optional[Job]:
+        """获取任务"""
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    def list_jobs(self, db: Session, user_id: Optional[int] = None, limit: int = 20) -> List[Job]:
+        """获取任务列表，按创建时间倒序"""
+        query = db.query(Job)
+        if user_id is not None:
+            query = query.filter(Job.user_id == user_id)
+        return query.order_by(Job.created_at.desc()).limit(limit).all()
+
+    def cancel(self, db: Session, job_id: str) -> Optional[Job]:
+        """取消任务：等待中的任务直接取消，运行中的任务由执行它的工作者取消"""
+        job = self.get_job(db, job_id)
+        if job is None or job.status in TERMINAL_STATUSES:
+            return job
+
+        if job.status == JOB_PENDING:
+            job.status = JOB_CANCELLED
+            job.finished_at = _now()
+        else:
+            job.cancel_requested = True
+        db.commit()
+        db.refresh(job)
+
+        # 任务在本进程中运行时立即取消，其他进程的工作者在下次心跳时取消
+        task = self._running.get(job_id)
+        if task is not None and not task.done():
+            task.cancel()
+
+        logger.info(f"请求取消任务: ID={job_id}, 状态={job.status}")
+        return job
+
+    # ------------------------------------------------------------------
+    # 工作池
+    # ------------------------------------------------------------------
+
+    async def _run_db(self, func: Callable, *args) -> Any:
+        """在线程池中执行同步数据库操作，避免阻塞事件循环"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    def start(self, concurrency: Optional[int] = None) -> None:
+        """启动工作池，需要在事件循环中调用"""
+        if self._workers:
+            return
+
+        self._stopping = False
+        concurrency = concurrency or self.concurrency
+        self._workers = [
+            asyncio.ensure_future(self._worker_loop(index))
+            for index in range(concurrency)
+        ]
+        self._workers.append(asyncio.ensure_future(self._reaper_loop()))
+        logger.info(f"后台任务工作池已启动，并发数: {concurrency}")
+
+    async def stop(self) -> None:
+        """停止工作池，正在执行的任务重新排队由其他工作者接手"""
+        if not self._workers:
+            return
+
+        self._stopping = True
+        for task in list(self._running.values()):
+            task.cancel()
+
+        # 等待工作协程把被中断的任务重新排队
+        for _ in range(50):
+            if not self._running:
+                break
+            await asyncio.sleep(0.1)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("后台任务工作池已停止")
+
+    async def run_forever(self, concurrency: Optional[int] = None) -> None:
+        """启动工作池并持续运行，供独立工作进程使用"""
+        self.start(concurrency)
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self.stop()
+
+    async def _worker_loop(self, index: int) -> None:
+        """工作协程：领取并执行任务"""
+        while not self._stopping:
+            try:
+                job = await self._run_db(self._claim_next_job)
+            except Exception as e:
+                logger.error(f"领取任务失败: {str(e)}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            logger.info(f"工作者 {index} 开始执行任务: ID={job['id']}, 类型={job['job_type']}")
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        """执行任务并记录结果"""
+        job_id = job["id"]
+        handler = self.handlers.get(job["job_type"])
+        if handler is None:
+            await self._run_db(self._finish, job_id, JOB_FAILED, None, f"未知的任务类型: {job['job_type']}")
+            return
+
+        task = asyncio.ensure_future(self._run_handler(handler, job))
+        self._running[job_id] = task
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id, task))
+
+        try:
+            result = await task
+            await self._run_db(self._finish, job_id, JOB_SUCCEEDED, result, None)
+            logger.info(f"任务完成: ID={job_id}")
+        except asyncio.CancelledError:
+            if self._stopping:
+                # 工作者停止，任务重新排队
+                await self._run_db(self._requeue, job_id)
+                logger.info(f"工作者停止，任务重新排队: ID={job_id}")
+            else:
+                await self._run_db(self._finish, job_id, JOB_CANCELLED, None, None)
+                logger.info(f"任务已取消: ID={job_id}")
+        except Exception as e:
+            logger.error(f"任务执行失败: ID={job_id}, 错误: {str(e)}")
+            await self._run_db(self._finish, job_id, JOB_FAILED, None, str(e))
+        finally:
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+
+    async def _run_handler(self, handler: JobHandler, job: Dict[str, Any]) -> Any:
+        """在任务自己的上下文中执行处理函数，token使用记录到提交任务的用户"""
+        set_current_user_id(job["user_id"])
+        return await handler(job["params"] or {}, JobContext(self, job["id"]))
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task) -> None:
+        """定期更新心跳，并检查其他进程发出的取消请求"""
+        while not task.done():
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                cancel_requested = await self._run_db(self._touch, job_id)
+                if cancel_requested and not task.done():
+                    logger.info(f"收到取消请求: ID={job_id}")
+                    task.cancel()
+            except Exception as e:
+                logger.error(f"更新任务心跳失败: ID={job_id}, 错误: {str(e)}")
+
+    async def _reaper_loop(self) -> None:
+        """定期回收心跳超时的任务（工作进程崩溃或被终止）"""
+        while not self._stopping:
+            try:
+                await self._run_db(self._recover_stale_jobs)
+            except Exception as e:
+                logger.error(f"回收超时任务失败: {str(e)}")
+            await asyncio.sleep(self.stale_timeout)
+
+    # ------------------------------------------------------------------
+    # 工作者使用的数据库操作（同步，在线程池中执行，使用独立会话）
+    # ------------------------------------------------------------------
+
+    def _claim_next_job(self) -> Optional[Dict[str, Any]]:
+        """领取最早的等待中任务，使用条件更新保证多个工作进程不会领取同一个任务"""
+        db = SessionLocal()
+        try:
+            candidates = (
+                db.query(Job.id)
+                .filter(Job.status == JOB_PENDING)
+                .order_by(Job.created_at)
+                .limit(5)
+                .all()
+            )
+            for (job_id,) in candidates:
+                now = _now()
+                claimed = (
+                    db.query(Job)
+                    .filter(Job.id == job_id, Job.status == JOB_PENDING)
+                    .update({
+                        Job.status: JOB_RUNNING,
+                        Job.worker_id: self.worker_id,
+                        Job.started_at: now,
+                        Job.heartbeat_at: now,
+                        Job.attempts: Job.attempts + 1
+                    }, synchronize_session=False)
+                )
+                db.commit()
+                if claimed:
+                    job = db.query(Job).filter(Job.id == job_id).first()
+                    return {
+                        "id": job.id,
+                        "job_type": job.job_type,
+                        "params": job.params,
+                        "user_id": job.user_id
+                    }
+            return None
+        finally:
+            db.close()
+
+    def _touch(self, job_id: str) -> bool:
+        """更新心跳，返回是否收到取消请求"""
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return True
+            job.heartbeat_at = _now()
+            db.commit()
+            return bool(job.cancel_requested)
+        finally:
+            db.close()
+
+    def _record_event(self, job_id: str, progress: int, message: str, data: Any = None) -> None:
+        """记录进度事件，只保留最近max_events条"""
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+
+            events = list(job.events or [])
+            seq = events[-1]["seq"] + 1 if events else 1
+            event = {
+                "seq": seq,
+                "time": _now().isoformat(),
+                "progress": progress,
+                "message": message
+            }
+            if data is not None:
+                event["data"] = _to_json(data)
+            events.append(event)
+
+            # 重新赋值，使SQLAlchemy检测到JSON列的变化
+            job.events = events[-self.max_events:]
+            job.progress = max(job.progress or 0, progress)
+            job.progress_message = message[:255]
+            job.heartbeat_at = _now()
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        """记录任务的最终状态"""
+        db = SessionLocal()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+            job.status = status
+            job.result = _to_json(result) if result is not None else None
+            job.error = error
+            if status == JOB_SUCCEEDED:
+                job.progress = 100
+            job.finished_at = _now()
+            db.commit()
+        finally:
+            db.close()
+
+    def _requeue(self, job_id: str) -> None:
+        """任务重新排队"""
+        db = SessionLocal()
+        try:
+            db.query(Job).filter(Job.id == job_id, Job.status == JOB_RUNNING).update({
+                Job.status: JOB_PENDING,
+                Job.worker_id: None
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _recover_stale_jobs(self) -> None:
+        """心跳超时的运行中任务重新排队，超过最大尝试次数则标记为失败"""
+        db = SessionLocal()
+        try:
+            deadline = _now() - timedelta(seconds=self.stale_timeout)
+            stale_jobs = (
+                db.query(Job)
+                .filter(Job.status == JOB_RUNNING, Job.heartbeat_at < deadline)
+                .all()
+            )
+            for job in stale_jobs:
+                if job.cancel_requested:
+                    job.status = JOB_CANCELLED
+                    job.finished_at = _now()
+                elif job.attempts < self.max_attempts:
+                    logger.warning(f"任务心跳超时，重新排队: ID={job.id}, 工作者={job.worker_id}")
+                    job.status = JOB_PENDING
+                    job.worker_id = None
+                else:
+                    logger.warning(f"任务心跳超时且超过最大尝试次数，标记为失败: ID={job.id}")
+                    job.status = JOB_FAILED
+                    job.error = "工作者心跳超时"
+                    job.finished_at = _now()
+            db.commit()
+        finally:
+            db.close()
+
+
+# 创建全局后台任务服务实例
+job_service = JobService()
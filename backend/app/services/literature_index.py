@@ -0,0 +1,316 @@
+"""
+本地文献索引：持久化搜索结果，基于SQLite FTS5提供BM25全文检索
+"""
+
+from typing import Dict, List, Any, Optional, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.services.paper_dedup import normalize_title
+
+# 创建日志器
+logger = get_logger("literature_index")
+
+# 默认索引文件位于项目根目录下的data目录
+DEFAULT_INDEX_PATH = Path(__file__).parents[3] / "data" / "literature_index.db"
+
+# 年份范围对应的年数
+YEAR_RANGES = {"last_1": 1, "last_5": 5, "last_10": 10}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    paper_key TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL DEFAULT '[]',
+    abstract TEXT NOT NULL DEFAULT '',
+    year INTEGER,
+    venue TEXT NOT NULL DEFAULT '',
+    url TEXT NOT NULL DEFAULT '',
+    citations INTEGER,
+    categories TEXT NOT NULL DEFAULT '[]',
+    source TEXT NOT NULL,
+    source_ids TEXT NOT NULL DEFAULT '{}',
+    sources TEXT NOT NULL DEFAULT '',
+    fetched_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, authors, abstract, venue,
+    content='papers', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, authors, abstract, venue)
+    VALUES (new.id, new.title, new.authors, new.abstract, new.venue);
+END;
+
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, authors, abstract, venue)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.venue);
+END;
+
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, authors, abstract, venue)
+    VALUES ('delete', old.id, old.title, old.authors, old.abstract, old.venue);
+    INSERT INTO papers_fts(rowid, title, authors, abstract, venue)
+    VALUES (new.id, new.title, new.authors, new.abstract, new.venue);
+END;
+"""
+
+
+def _source_id(paper: Dict[str, Any]) -> str:
+    """获取论文在来源中的标识"""
+    return str(paper.get("paper_id") or paper.get("entry_id") or paper.get("url") or "")
+
+
+def _parse_year(value: Any) -> Optional[int]:
+    """解析年份"""
+    try:
+        year = int(str(value)[:4])
+        return year if year > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LiteratureIndex:
+    """本地文献索引，配置来自academic_search.local_index
+
+    SQLite连接在线程池中使用，所有访问通过锁串行化；查询按标题、作者、摘要、期刊加权的BM25排序。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化本地文献索引"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("local_index", {})
+        self.enabled = config.get("enabled", True)
+        self.path = Path(config.get("path") or DEFAULT_INDEX_PATH)
+        # 本地匹配结果数达到limit * min_recall时直接使用本地结果
+        self.min_recall = config.get("min_recall", 1.0)
+        # BM25列权重：标题、作者、摘要、期刊
+        self.weights = config.get("weights", [10.0, 2.0, 4.0, 1.0])
+        # 论文在这么多天内被远程搜索源返回过才算新鲜，0表示不限制
+        self.max_age_days = config.get("max_age_days", 30)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # 指标
+        self.local_hits = 0
+        self.local_misses = 0
+        self.stale_misses = 0
+        self.indexed_papers = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """打开索引数据库，首次使用时创建表结构"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            logger.info(f"本地文献索引已打开: {self.path}")
+        return self._conn
+
+    async def _run_db(self, func: Callable, *args) -> Any:
+        """在线程池中执行同步数据库操作，避免阻塞事件循环"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    def required_results(self, limit: int) -> int:
+        """直接使用本地结果所需的最少匹配数"""
+        return max(1, int(round(limit * self.min_recall)))
+
+    def satisfies(self, results: List[Dict[str, Any]], limit: int) -> bool:
+        """本地结果是否足以直接返回：max_age_days内更新过的匹配数达到required_results
+
+        匹配足够但大多已过期时仍查询远程搜索源，远程结果写回索引后更新时间随之刷新。
+        """
+        required = self.required_results(limit)
+        if len(results) < required:
+            return False
+        if not self.max_age_days:
+            return True
+        cutoff = (datetime.utcnow() - timedelta(days=self.max_age_days)).isoformat()
+        fresh = sum(1 for paper in results if (paper.get("indexed_at") or "") >= cutoff)
+        if fresh < required:
+            self.stale_misses += 1
+            return False
+        return True
+
+    async def add_papers(self, papers: List[Dict[str, Any]]) -> int:
+        """写入搜索结果，已存在的论文合并来源并更新字段，返回写入数量"""
+        if not self.enabled or not papers:
+            return 0
+        try:
+            return await self._run_db(self.add_papers_sync, papers)
+        except Exception as e:
+            logger.error(f"写入本地文献索引失败: {str(e)}")
+            return 0
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        sources: Optional[List[str]] = None,
+        years: str = "all"
+    ) -> List[Dict[str, Any]]:
+        """BM25全文检索，所有查询词都需要匹配"""
+        if not self.enabled:
+            return []
+        try:
+            return await self._run_db(self.search_sync, query, limit, sources, years)
+        except Exception as e:
+            logger.error(f"查询本地文献索引失败: {str(e)}")
+            return []
+
+    def add_papers_sync(self, papers: List[Dict[str, Any]]) -> int:
+        """同步写入搜索结果"""
+        now = datetime.utcnow().isoformat()
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for paper in papers:
+                    if not isinstance(paper, dict):
+                        continue
+                    title = str(paper.get("title") or "").strip()
+                    paper_key = normalize_title(title)
+                    if not paper_key:
+                        continue
+                    source = str(paper.get("source") or "unknown")
+
+                    row = conn.execute(
+                        "SELECT id, source_ids, abstract, citations FROM papers WHERE paper_key = ?",
+                        (paper_key,)
+                    ).fetchone()
+
+                    authors = paper.get("authors") or []
+                    abstract = str(paper.get("abstract") or "")
+                    citations = paper.get("citations")
+                    citations = int(citations) if isinstance(citations, (int, float)) else None
+
+                    if row is None:
+                        source_ids = {source: _source_id(paper)}
+                        conn.execute(
+                            "INSERT INTO papers (paper_key, title, authors, abstract, year, venue, url, citations, "
+                            "categories, source, source_ids, sources, fetched_at, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (
+                                paper_key, title, json.dumps(authors, ensure_ascii=False), abstract,
+                                _parse_year(paper.get("year")), str(paper.get("venue") or ""),
+                                str(paper.get("url") or ""), citations,
+                                json.dumps(paper.get("categories") or [], ensure_ascii=False),
+                                source, json.dumps(source_ids, ensure_ascii=False), f" {source} ", now, now
+                            )
+                        )
+                    else:
+                        source_ids = json.loads(row["source_ids"] or "{}")
+                        source_ids[source] = _source_id(paper) or source_ids.get(source, "")
+                        # 保留更完整的摘要和更新的引用数
+                        if len(abstract) < len(row["abstract"] or ""):
+                            abstract = row["abstract"]
+                        if citations is None:
+                            citations = row["citations"]
+                        conn.execute(
+                            "UPDATE papers SET abstract = ?, citations = ?, "
+                            "venue = CASE WHEN ? != '' THEN ? ELSE venue END, "
+                            "source_ids = ?, sources = ?, updated_at = ? WHERE id = ?",
+                            (
+                                abstract, citations,
+                                str(paper.get("venue") or ""), str(paper.get("venue") or ""),
+                                json.dumps(source_ids, ensure_ascii=False),
+                                " " + " ".join(sorted(source_ids)) + " ", now, row["id"]
+                            )
+                        )
+                    count += 1
+        self.indexed_papers += count
+        return count
+
+    def _build_match(self, query: str) -> str:
+        """把查询转换为FTS5 MATCH表达式，每个词加引号避免语法错误"""
+        terms = re.findall(r"\w+", query.lower())
+        return " AND ".join(f'"{term}"' for term in terms)
+
+    def search_sync(
+        self,
+        query: str,
+        limit: int = 10,
+        sources: Optional[List[str]] = None,
+        years: str = "all"
+    ) -> List[Dict[str, Any]]:
+        """同步BM25全文检索"""
+        match = self._build_match(query)
+        if not match:
+            return []
+
+        sql = (
+            "SELECT p.*, bm25(papers_fts, ?, ?, ?, ?) AS score FROM papers_fts "
+            "JOIN papers p ON p.id = papers_fts.rowid WHERE papers_fts MATCH ?"
+        )
+        params: List[Any] = list(self.weights) + [match]
+        if sources:
+            sql += " AND (" + " OR ".join("p.sources LIKE ?" for _ in sources) + ")"
+            params.extend(f"% {source} %" for source in sources)
+        if years in YEAR_RANGES:
+            sql += " AND p.year >= ?"
+            params.append(datetime.now().year - YEAR_RANGES[years])
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+
+        return [
+            {
+                "title": row["title"],
+                "authors": json.loads(row["authors"] or "[]"),
+                "year": row["year"] or "",
+                "abstract": row["abstract"],
+                "url": row["url"],
+                "venue": row["venue"],
+                "citations": row["citations"],
+                "categories": json.loads(row["categories"] or "[]"),
+                "source": row["source"],
+                "source_ids": json.loads(row["source_ids"] or "{}"),
+                "score": -row["score"],
+                "indexed_at": row["updated_at"]
+            }
+            for row in rows
+        ]
+
+    def count(self) -> int:
+        """索引中的论文数"""
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引指标"""
+        return {
+            "enabled": self.enabled,
+            "path": str(self.path),
+            "local_hits": self.local_hits,
+            "local_misses": self.local_misses,
+            "stale_misses": self.stale_misses,
+            "indexed_papers": self.indexed_papers
+        }
+
+    def close(self) -> None:
+        """关闭索引数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 创建全局本地文献索引
+literature_index = LiteratureIndex()
@@ -7,6 +7,7 @@ import os
 import json
 from pathlib import Path
 import asyncio
+import time
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from app.core.config import settings
 from app.core.logger import get_llm_logger
@@ -15,10 +16,17 @@ from app.utils.token_counter import token_counter
 from app.core.context import get_current_user_id
 from app.services.llm.adapter_factory import LLMAdapterFactory
 from app.services.llm.base_adapter import BaseLLMAdapter
+from app.services.llm.response_cache import response_cache, build_request_key
+from app.services.llm.single_flight import SingleFlight
+from app.services.llm.rate_limiter import ProviderLimiter, provider_limiters
+from app.services.llm.model_router import model_router, ModelUnavailableError
 
 # 创建LLM日志器
 logger = get_llm_logger("llm_service")
 
+# 仅用于统计记录、不影响模型输出的参数，不参与请求键计算
+NON_KEY_PARAMS = {"task", "task_type"}
+
 class LLMService:
     """LLM服务，使用适配器模式支持多种模型"""
 
@@ -33,6 +41,24 @@ class LLMService:
         # 创建适配器缓存
         self.adapters = {}
 
+        # LLM响应缓存
+        self.response_cache = response_cache
+
+        # 相同请求的并发合并
+        self.single_flight_enabled = settings.config.get("llm", {}).get("single_flight", {}).get("enabled", True)
+        self.single_flight = SingleFlight()
+
+        # 按延迟和健康状况路由模型
+        self.router = model_router
+
+        # 对冲请求配置：主模型超过历史延迟百分位仍未返回时向备用模型发起第二个请求
+        self.hedging_config = settings.config.get("llm", {}).get("hedging", {})
+        self.hedge_stats = {
+            "hedged": 0,
+            "primary_wins": 0,
+            "hedge_wins": 0
+        }
+
         # 设置回退模型
         self.fallback_models = []
 
@@ -186,6 +212,198 @@ class LLMService:
 
         return self.adapters[model]
 
+    def _get_limiter(self, model: str) -> ProviderLimiter:
+        """获取模型所属提供商的准入控制器"""
+        provider = self.model_configs.get(model, {}).get("provider", "default")
+        return provider_limiters.get(provider)
+
+    def _get_key_params(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """获取参与请求键计算的额外参数（排除仅用于统计的参数）"""
+        return {k: v for k, v in kwargs.items() if k not in NON_KEY_PARAMS}
+
+    async def _invoke_adapter(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        agent_type: str = None,
+        cache_key: Optional[str] = None,
+        **kwargs
+    ):
+        """调用模型适配器并记录token使用"""
+        # 记录请求
+        logger.info(f"LLM请求: 模型={model}, 消息数={len(messages)}")
+
+        # 获取适配器
+        adapter = self._get_adapter(model)
+
+        # 提供商准入控制，按预估的输入token加max_tokens计入每分钟token配额
+        limiter = self._get_limiter(model)
+        estimated_tokens = token_counter.count_message_tokens(messages) + max_tokens
+
+        # 熔断器半开时只放行有限的探测请求，名额已满时抛出ModelUnavailableError，由acompletion立即路由到其他模型
+        probe = self.router.begin_call(model)
+        try:
+            # 调用适配器，记录延迟和成败供路由器使用
+            async with limiter.acquire(estimated_tokens):
+                start_time = time.monotonic()
+                try:
+                    response = await adapter.acompletion(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        **kwargs
+                    )
+                except Exception:
+                    self.router.record_failure(model)
+                    raise
+                self.router.record_success(model, time.monotonic() - start_time, probe)
+        finally:
+            self.router.end_call(model, probe)
+
+        # 记录响应
+        token_usage = adapter.get_token_usage(response)
+        prompt_tokens = token_usage.get('prompt_tokens', 0)
+        completion_tokens = token_usage.get('completion_tokens', 0)
+        total_tokens = token_usage.get('total_tokens', 0)
+        limiter.record_actual_tokens(estimated_tokens, total_tokens)
+
+        logger.info(
+            f"LLM响应: 模型={model}, "
+            f"输入tokens={prompt_tokens}, "
+            f"输出tokens={completion_tokens}, "
+            f"总tokens={total_tokens}"
+        )
+
+        # 更新内部token使用统计
+        self.token_usage["prompt_tokens"] += prompt_tokens
+        self.token_usage["completion_tokens"] += completion_tokens
+        self.token_usage["total_tokens"] += total_tokens
+
+        # 记录token使用
+        token_service.record_usage(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            service="llm_service",
+            task=kwargs.get("task", "acompletion"),
+            task_type=kwargs.get("task_type", "default"),
+            user_id=get_current_user_id()
+        )
+
+        # 写入响应缓存
+        if cache_key is not None:
+            await self.response_cache.set(
+                cache_key, response, self.response_cache.get_ttl(agent_type)
+            )
+
+        return response
+
+    def _should_hedge(self, agent_type: Optional[str], hedge: Optional[bool]) -> bool:
+        """判断本次调用是否使用对冲请求"""
+        if not self.hedging_config.get("enabled", False):
+            return False
+        if hedge is not None:
+            return hedge
+        return agent_type in (self.hedging_config.get("agent_types") or [])
+
+    def _get_hedge_delay(self, model: str) -> float:
+        """对冲延迟：主模型历史延迟的指定百分位，限制在[min_delay, max_delay]之间"""
+        delay = self.router.get_health(model).percentile(self.hedging_config.get("percentile", 95))
+        if delay is None:
+            delay = self.hedging_config.get("default_delay", 8.0)
+        return max(
+            self.hedging_config.get("min_delay", 2.0),
+            min(delay, self.hedging_config.get("max_delay", 30.0))
+        )
+
+    def _get_hedge_model(self, model: str, agent_type: Optional[str]) -> Optional[str]:
+        """选择对冲用的备用模型，优先选择其他提供商的健康模型"""
+        candidates = self.router.candidates(
+            model, agent_type, self.available_models,
+            [m["model"] for m in self.fallback_models]
+        )
+        alternates = [m for m in self.router.rank(model, candidates) if m != model]
+        if not alternates:
+            return None
+
+        provider = self.model_configs.get(model, {}).get("provider")
+        other_providers = [m for m in alternates if self.model_configs.get(m, {}).get("provider") != provider]
+        return (other_providers or alternates)[0]
+
+    async def _hedged_invoke(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        agent_type: str = None,
+        cache_key: Optional[str] = None,
+        **kwargs
+    ):
+        """对冲调用：主模型在对冲延迟内未返回时向备用模型发起第二个请求，采用先返回的结果并取消另一个"""
+        hedge_model = self._get_hedge_model(model, agent_type)
+        if hedge_model is None:
+            return await self._invoke_adapter(
+                model, messages, max_tokens, temperature,
+                agent_type=agent_type, cache_key=cache_key, **kwargs
+            )
+
+        delay = self._get_hedge_delay(model)
+        tasks = {
+            asyncio.ensure_future(self._invoke_adapter(
+                model, messages, max_tokens, temperature,
+                agent_type=agent_type, cache_key=cache_key, **kwargs
+            )): model
+        }
+
+        try:
+            done, _ = await asyncio.wait(set(tasks), timeout=delay)
+            if not done:
+                logger.info(f"主模型 {model} 超过 {delay:.1f} 秒未返回，向 {hedge_model} 发起对冲请求")
+                self.hedge_stats["hedged"] += 1
+                tasks[asyncio.ensure_future(self._invoke_adapter(
+                    hedge_model, messages, max_tokens, temperature,
+                    agent_type=agent_type, cache_key=cache_key, **kwargs
+                ))] = hedge_model
+
+            pending = set(tasks)
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        if len(tasks) > 1:
+                            self.hedge_stats["primary_wins" if winner == model else "hedge_wins"] += 1
+                            logger.info(f"对冲请求完成，采用模型 {winner} 的结果")
+                        return task.result()
+                    if first_error is None or tasks[task] == model:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            for task, task_model in tasks.items():
+                if not task.done():
+                    task.cancel()
+                    self._record_cancelled_usage(task_model, messages, **kwargs)
+
+    def _record_cancelled_usage(self, model: str, messages: List[Dict[str, str]], **kwargs) -> None:
+        """记录被取消调用的token使用，提供商通常已按输入token计费，按预估输入token记录"""
+        prompt_tokens = token_counter.count_message_tokens(messages)
+        self.token_usage["prompt_tokens"] += prompt_tokens
+        self.token_usage["total_tokens"] += prompt_tokens
+        token_service.record_usage(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=0,
+            service="llm_service",
+            task=kwargs.get("task", "acompletion"),
+            task_type="hedge_cancelled",
+            user_id=get_current_user_id()
+        )
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -201,7 +419,36 @@ class LLMService:
         agent_type: str = None,  # 新增参数，用于指定智能体类型
         **kwargs
     ):
-        """异步调用LLM补全"""
+        """异步调用LLM补全，每次重试都会重新路由，熔断的模型会被立即绕过"""
+        # 模型正在半开探测时路由器已将其排除，立即重新路由到下一个模型，不等待重试退避；
+        # 固定模型或所有模型都不可用时交给重试处理
+        attempts = len(self.available_models) if kwargs.get("route", True) else 1
+        for attempt in range(max(1, attempts)):
+            try:
+                return await self._acompletion_once(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    agent_type=agent_type,
+                    **kwargs
+                )
+            except ModelUnavailableError as e:
+                if attempt >= attempts - 1:
+                    raise
+                logger.info(f"{str(e)}，立即重新路由")
+
+    async def _acompletion_once(
+        self,
+        model: str = None,
+        messages: List[Dict[str, str]] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        agent_type: str = None,
+        route: bool = True,
+        **kwargs
+    ):
+        """异步调用LLM补全（单次尝试），route=False时固定使用指定模型"""
         try:
             # 如果指定了智能体类型，从配置中获取对应的模型
             if agent_type:
@@ -230,52 +477,50 @@ class LLMService:
                 else:
                     raise ValueError(f"模型 {model} 不可用，且没有可用的回退模型")
 
-            # 记录请求
-            logger.info(f"LLM请求: 模型={model}, 消息数={len(messages)}")
-
-            # 获取适配器
-            adapter = self._get_adapter(model)
-
-            # 调用适配器
-            response = await adapter.acompletion(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs
-            )
-
-            # 记录响应
-            token_usage = adapter.get_token_usage(response)
-            prompt_tokens = token_usage.get('prompt_tokens', 0)
-            completion_tokens = token_usage.get('completion_tokens', 0)
-            total_tokens = token_usage.get('total_tokens', 0)
+            # 按健康状况选择模型，首选模型熔断或明显劣化时切换到其他候选模型
+            if route:
+                model = self.router.select(
+                    model, agent_type, self.available_models,
+                    [m["model"] for m in self.fallback_models]
+                )
+
+            # 非确定性调用可通过bypass_cache=True跳过缓存和请求合并
+            bypass_cache = kwargs.pop("bypass_cache", False)
+            # hedge=True/False显式开启或关闭对冲，默认按智能体类型决定
+            hedge = kwargs.pop("hedge", None)
+            request_key = None
+            if not bypass_cache:
+                request_key = build_request_key(
+                    model, messages, temperature, max_tokens, self._get_key_params(kwargs)
+                )
+
+            # 检查响应缓存
+            cache_key = None
+            if request_key is not None and self.response_cache.is_cacheable(agent_type):
+                cache_key = request_key
+                cached_response = await self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    logger.info(f"LLM响应缓存命中: 模型={model}, 智能体={agent_type}")
+                    return cached_response
+
+            # 延迟敏感的调用可以使用对冲请求
+            invoke = self._hedged_invoke if self._should_hedge(agent_type, hedge) else self._invoke_adapter
+
+            # 相同请求正在进行时合并为一次提供商调用
+            if request_key is not None and self.single_flight_enabled:
+                return await self.single_flight.do(
+                    request_key,
+                    lambda: invoke(
+                        model, messages, max_tokens, temperature,
+                        agent_type=agent_type, cache_key=cache_key, **kwargs
+                    )
+                )
 
-            logger.info(
-                f"LLM响应: 模型={model}, "
-                f"输入tokens={prompt_tokens}, "
-                f"输出tokens={completion_tokens}, "
-                f"总tokens={total_tokens}"
+            return await invoke(
+                model, messages, max_tokens, temperature,
+                agent_type=agent_type, cache_key=cache_key, **kwargs
             )
 
-            # 更新内部token使用统计
-            self.token_usage["prompt_tokens"] += prompt_tokens
-            self.token_usage["completion_tokens"] += completion_tokens
-            self.token_usage["total_tokens"] += total_tokens
-
-            # 记录token使用
-            token_service.record_usage(
-                model=model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-                service="llm_service",
-                task=kwargs.get("task", "acompletion"),
-                task_type=kwargs.get("task_type", "default"),
-                user_id=get_current_user_id()
-            )
-
-            return response
-
         except Exception as e:
             logger.error(f"LLM调用失败: {str(e)}")
             raise
@@ -393,41 +638,40 @@ class LLMService:
             default_model = self.available_models[0]
             logger.warning(f"默认模型 {settings.DEFAULT_MODEL} 不可用，使用 {default_model} 代替")
 
-        # 尝试主模型
-        try:
+        # 按健康状况排序候选模型，熔断打开的模型直接跳过
+        candidates = self.router.candidates(
+            default_model, None, self.available_models,
+            [m["model"] for m in self.fallback_models]
+        )
+        ranked = self.router.rank(default_model, candidates) or candidates
+
+        # 只有一个候选模型时保留重试
+        if len(ranked) == 1:
             return await self.acompletion(
-                model=default_model,
+                model=ranked[0],
                 messages=messages,
                 max_tokens=max_tokens,
                 temperature=temperature,
+                route=False,
                 **kwargs
             )
-        except Exception as e:
-            logger.warning(f"主模型调用失败，尝试回退: {str(e)}")
-
-            # 尝试回退模型
-            for fallback in self.fallback_models:
-                fallback_model = fallback["model"]
-                # 跳过主模型
-                if fallback_model == default_model:
-                    continue
-                # 跳过不可用的模型
-                if fallback_model not in self.available_models:
-                    continue
-
-                try:
-                    return await self.acompletion(
-                        model=fallback_model,
-                        messages=messages,
-                        max_tokens=max_tokens,
-                        temperature=temperature,
-                        **kwargs
-                    )
-                except Exception as e:
-                    logger.warning(f"回退模型 {fallback_model} 调用失败: {str(e)}")
 
-            # 所有模型都失败
-            raise Exception("所有LLM模型调用都失败")
+        # 多个候选模型时失败立即切换，不等待重试
+        for candidate in ranked:
+            try:
+                return await self._acompletion_once(
+                    model=candidate,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    route=False,
+                    **kwargs
+                )
+            except Exception as e:
+                logger.warning(f"模型 {candidate} 调用失败，尝试下一个模型: {str(e)}")
+
+        # 所有模型都失败
+        raise Exception("所有LLM模型调用都失败")
 
     async def generate_text(
         self,
@@ -508,18 +752,21 @@ class LLMService:
             # 获取适配器
             adapter = self._get_adapter(model)
 
-            # 调用适配器
-            response = await adapter.acompletion_streaming(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs
-            )
-
-            # 返回流式响应
-            async for chunk in response:
-                yield chunk
+            # 调用适配器，准入许可在整个流式响应期间保持
+            async with self._get_limiter(model).acquire(
+                token_counter.count_message_tokens(messages) + max_tokens
+            ):
+                response = await adapter.acompletion_streaming(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **kwargs
+                )
+
+                # 返回流式响应
+                async for chunk in response:
+                    yield chunk
 
             # 记录token使用
             # 注意：流式调用的token统计需要在完成后进行
@@ -551,6 +798,24 @@ class LLMService:
         """获取token使用情况"""
         return self.token_usage
 
+    def get_limiter_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各提供商的准入控制指标（排队深度、等待时间等）"""
+        return provider_limiters.get_stats()
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """获取各模型的延迟、错误率和熔断状态，以及对冲请求统计"""
+        return {
+            "models": self.router.get_stats(),
+            "hedging": self.hedge_stats
+        }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取响应缓存和请求合并统计信息"""
+        return {
+            **self.response_cache.get_stats(),
+            "single_flight": self.single_flight.get_stats()
+        }
+
     def reset_token_usage(self):
         """重置token使用统计"""
         self.token_usage = {
@@ -0,0 +1,256 @@
+"""
+模型路由：按滚动延迟、错误率和熔断状态为每次调用选择最健康的模型
+"""
+
+from typing import Dict, List, Any, Optional
+from collections import deque
+import time
+from app.core.config import settings
+from app.core.logger import get_llm_logger
+
+logger = get_llm_logger("model_router")
+
+# 熔断器状态
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class ModelUnavailableError(Exception):
+    """模型熔断器半开且探测名额已满，本次调用应改用其他模型"""
+    pass
+
+
+class ModelHealth:
+    """单个模型的健康状况：滚动窗口内的延迟和成功率，以及熔断器"""
+
+    def __init__(
+        self,
+        model: str,
+        window_size: int = 50,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.5,
+        min_samples: int = 10,
+        cooldown: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        """初始化模型健康状况"""
+        self.model = model
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        # 半开状态同时允许的探测请求数，其余请求继续路由到其他模型
+        self.half_open_probes = max(1, half_open_probes)
+        self.probes_in_flight = 0
+
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+
+    def record_success(self, latency: float, probe: bool = False) -> None:
+        """记录一次成功调用，只有半开状态下的探测请求成功才关闭熔断器
+
+        熔断器打开前发出、打开后才返回的慢调用只记录延迟和成败，不跳过冷却和半开探测。
+        """
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        if self.state == CIRCUIT_CLOSED:
+            self.consecutive_failures = 0
+        elif self.state == CIRCUIT_HALF_OPEN and probe:
+            logger.info(f"模型 {self.model} 探测成功，熔断器关闭")
+            self.state = CIRCUIT_CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._open("半开状态探测失败")
+        elif self.state == CIRCUIT_CLOSED:
+            if self.consecutive_failures >= self.failure_threshold:
+                self._open(f"连续失败 {self.consecutive_failures} 次")
+            elif len(self.outcomes) >= self.min_samples and self.error_rate() >= self.error_rate_threshold:
+                self._open(f"错误率 {self.error_rate():.0%}")
+
+    def _open(self, reason: str) -> None:
+        """打开熔断器"""
+        self.state = CIRCUIT_OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"模型 {self.model} 熔断器打开: {reason}，冷却 {self.cooldown} 秒")
+
+    def is_available(self) -> bool:
+        """检查模型当前是否可以接收请求，冷却结束后进入半开状态，只在探测名额未满时可用"""
+        if self.state == CIRCUIT_OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = CIRCUIT_HALF_OPEN
+            logger.info(f"模型 {self.model} 冷却结束，熔断器半开")
+        if self.state == CIRCUIT_HALF_OPEN:
+            return self.probes_in_flight < self.half_open_probes
+        return True
+
+    def begin_call(self) -> bool:
+        """开始一次调用，返回是否为探测请求；半开状态且探测名额已满时抛出ModelUnavailableError"""
+        if not self.is_available() and self.state == CIRCUIT_HALF_OPEN:
+            raise ModelUnavailableError(f"模型 {self.model} 正在半开探测，暂不接收其他请求")
+        if self.state == CIRCUIT_HALF_OPEN:
+            self.probes_in_flight += 1
+            return True
+        return False
+
+    def end_call(self, probe: bool) -> None:
+        """结束一次调用，释放探测名额"""
+        if probe:
+            self.probes_in_flight = max(0, self.probes_in_flight - 1)
+
+    def error_rate(self) -> float:
+        """滚动窗口内的错误率"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """滚动窗口内延迟的百分位数，没有样本时返回None"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def score(self, default_latency: float) -> float:
+        """健康评分，越小越好：p95延迟按错误率加权"""
+        p95 = self.percentile(95)
+        if p95 is None:
+            p95 = default_latency
+        return p95 * (1.0 + 4.0 * self.error_rate())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取健康状况"""
+        return {
+            "state": self.state,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": self.error_rate(),
+            "samples": len(self.outcomes),
+            "consecutive_failures": self.consecutive_failures,
+            "probes_in_flight": self.probes_in_flight
+        }
+
+
+class ModelRouter:
+    """为每个智能体类型在候选模型中选择最健康的模型，配置来自llm.routing"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化路由器"""
+        if config is None:
+            config = settings.config.get("llm", {}).get("routing", {})
+        self.enabled = config.get("enabled", True)
+        self.window_size = config.get("window_size", 50)
+        self.failure_threshold = config.get("failure_threshold", 5)
+        self.error_rate_threshold = config.get("error_rate_threshold", 0.5)
+        self.min_samples = config.get("min_samples", 10)
+        self.cooldown = config.get("cooldown", 30)
+        self.half_open_probes = config.get("half_open_probes", 1)
+        self.switch_ratio = config.get("switch_ratio", 2.0)
+        self.default_latency = config.get("default_latency", 10.0)
+        self.agent_models: Dict[str, List[str]] = config.get("agent_models", {}) or {}
+        self.health: Dict[str, ModelHealth] = {}
+
+    def get_health(self, model: str) -> ModelHealth:
+        """获取或创建模型的健康状况"""
+        if model not in self.health:
+            self.health[model] = ModelHealth(
+                model,
+                window_size=self.window_size,
+                failure_threshold=self.failure_threshold,
+                error_rate_threshold=self.error_rate_threshold,
+                min_samples=self.min_samples,
+                cooldown=self.cooldown,
+                half_open_probes=self.half_open_probes
+            )
+        return self.health[model]
+
+    def record_success(self, model: str, latency: float, probe: bool = False) -> None:
+        """记录成功调用，probe为begin_call的返回值"""
+        self.get_health(model).record_success(latency, probe)
+
+    def record_failure(self, model: str) -> None:
+        """记录失败调用"""
+        self.get_health(model).record_failure()
+
+    def begin_call(self, model: str) -> bool:
+        """开始一次调用，返回是否为探测请求，见ModelHealth.begin_call"""
+        if not self.enabled:
+            return False
+        return self.get_health(model).begin_call()
+
+    def end_call(self, model: str, probe: bool) -> None:
+        """结束一次调用"""
+        self.get_health(model).end_call(probe)
+
+    def candidates(
+        self,
+        preferred: str,
+        agent_type: Optional[str],
+        available_models: List[str],
+        fallback_models: List[str]
+    ) -> List[str]:
+        """候选模型：首选模型、智能体配置的候选模型、回退模型，去重并过滤不可用模型"""
+        ordered = [preferred] + list(self.agent_models.get(agent_type, []) if agent_type else []) + list(fallback_models)
+        result = []
+        for model in ordered:
+            if model and model in available_models and model not in result:
+                result.append(model)
+        return result
+
+    def rank(self, preferred: str, candidates: List[str]) -> List[str]:
+        """按健康状况排序候选模型，熔断打开的模型被排除
+
+        首选模型健康时保持首位，只有当其评分比最优模型差switch_ratio倍以上时才让位，避免抖动。
+        """
+        eligible = [m for m in candidates if self.get_health(m).is_available()]
+        if not eligible:
+            return []
+
+        by_score = sorted(eligible, key=lambda m: self.get_health(m).score(self.default_latency))
+        if preferred in eligible:
+            best_score = self.get_health(by_score[0]).score(self.default_latency)
+            preferred_score = self.get_health(preferred).score(self.default_latency)
+            if preferred_score <= best_score * self.switch_ratio:
+                by_score.remove(preferred)
+                by_score.insert(0, preferred)
+        return by_score
+
+    def select(
+        self,
+        preferred: str,
+        agent_type: Optional[str],
+        available_models: List[str],
+        fallback_models: List[str]
+    ) -> str:
+        """为一次调用选择模型，所有候选模型都熔断时仍返回首选模型"""
+        if not self.enabled:
+            return preferred
+
+        ranked = self.rank(preferred, self.candidates(preferred, agent_type, available_models, fallback_models))
+        if not ranked:
+            logger.warning(f"所有候选模型熔断器均打开，仍使用首选模型: {preferred}")
+            return preferred
+
+        selected = ranked[0]
+        if selected != preferred:
+            logger.info(f"路由切换: 智能体={agent_type}, {preferred} -> {selected}")
+        return selected
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有模型的健康状况"""
+        return {model: health.get_stats() for model, health in self.health.items()}
+
+
+# 创建全局模型路由器
+model_router = ModelRouter()
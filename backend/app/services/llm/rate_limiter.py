@@ -0,0 +1,184 @@
+"""
+LLM提供商准入控制：并发限制和令牌桶限流（每分钟请求数/token数）
+"""
+
+from typing import Dict, Any, Optional
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from app.core.config import settings
+from app.core.logger import get_llm_logger
+
+logger = get_llm_logger("rate_limiter")
+
+
+class TokenBucket:
+    """令牌桶，按每分钟速率匀速补充"""
+
+    def __init__(self, per_minute: int, capacity: Optional[int] = None):
+        """初始化令牌桶"""
+        self.capacity = float(capacity or per_minute)
+        self.fill_rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        """按经过的时间补充令牌"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.fill_rate)
+        self.updated_at = now
+
+    def time_until_available(self, amount: float) -> float:
+        """获取凑齐amount个令牌需要等待的秒数"""
+        self._refill()
+        # 单次请求超过桶容量时按容量计算，避免永远等待
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.fill_rate
+
+    def consume(self, amount: float) -> None:
+        """消耗令牌，允许为负数（用于事后按实际用量修正）"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        """归还多扣的令牌"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderLimiter:
+    """单个提供商的准入控制器"""
+
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int = 0,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0
+    ):
+        """初始化准入控制器，0表示不限制"""
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        # 保证等待令牌桶的请求按到达顺序放行
+        self._bucket_lock = asyncio.Lock()
+
+        # 指标
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.total_requests = 0
+        self.throttled_requests = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    async def _wait_for_buckets(self, tokens: int) -> None:
+        """等待请求令牌桶和token令牌桶都有足够余量"""
+        if self.request_bucket is None and self.token_bucket is None:
+            return
+
+        async with self._bucket_lock:
+            while True:
+                wait_time = 0.0
+                if self.request_bucket is not None:
+                    wait_time = max(wait_time, self.request_bucket.time_until_available(1))
+                if self.token_bucket is not None:
+                    wait_time = max(wait_time, self.token_bucket.time_until_available(tokens))
+                if wait_time <= 0:
+                    break
+                await asyncio.sleep(wait_time)
+
+            if self.request_bucket is not None:
+                self.request_bucket.consume(1)
+            if self.token_bucket is not None:
+                self.token_bucket.consume(tokens)
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0):
+        """获取一次调用的准入许可，tokens为预估的token数"""
+        start_time = time.monotonic()
+        self.queue_depth += 1
+        try:
+            if self.semaphore is not None:
+                await self.semaphore.acquire()
+            try:
+                await self._wait_for_buckets(tokens)
+            except BaseException:
+                if self.semaphore is not None:
+                    self.semaphore.release()
+                raise
+        finally:
+            self.queue_depth -= 1
+
+        wait_time = time.monotonic() - start_time
+        self.total_requests += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+        if wait_time > 0.05:
+            self.throttled_requests += 1
+            logger.info(f"提供商 {self.provider} 准入等待 {wait_time:.2f} 秒，当前排队: {self.queue_depth}")
+
+        self.in_flight += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+            if self.semaphore is not None:
+                self.semaphore.release()
+
+    def record_actual_tokens(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """按实际token用量修正token令牌桶"""
+        if self.token_bucket is None or actual_tokens <= 0:
+            return
+        delta = actual_tokens - estimated_tokens
+        if delta > 0:
+            self.token_bucket.consume(delta)
+        elif delta < 0:
+            self.token_bucket.refund(-delta)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取指标"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "throttled_requests": self.throttled_requests,
+            "avg_wait_time": self.total_wait_time / self.total_requests if self.total_requests else 0.0,
+            "max_wait_time": self.max_wait_time
+        }
+
+
+class ProviderLimiterRegistry:
+    """按提供商管理准入控制器，配置来自llm.provider_limits"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化注册表"""
+        if config is None:
+            config = settings.config.get("llm", {}).get("provider_limits", {})
+        self.config = config or {}
+        self.limiters: Dict[str, ProviderLimiter] = {}
+
+    def get(self, provider: str) -> ProviderLimiter:
+        """获取或创建提供商的准入控制器"""
+        if provider not in self.limiters:
+            limits = {**self.config.get("default", {}), **self.config.get(provider, {})}
+            self.limiters[provider] = ProviderLimiter(
+                provider,
+                max_concurrency=int(limits.get("max_concurrency", 0)),
+                requests_per_minute=int(limits.get("requests_per_minute", 0)),
+                tokens_per_minute=int(limits.get("tokens_per_minute", 0))
+            )
+            logger.info(f"创建提供商准入控制器: {provider}, 配置: {limits}")
+        return self.limiters[provider]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有提供商的指标"""
+        return {provider: limiter.get_stats() for provider, limiter in self.limiters.items()}
+
+
+# 创建全局准入控制器注册表
+provider_limiters = ProviderLimiterRegistry()
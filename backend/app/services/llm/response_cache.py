@@ -0,0 +1,174 @@
+"""
+LLM响应缓存，按请求内容（模型、消息、温度、max_tokens）寻址
+"""
+
+from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import time
+from app.core.config import settings
+from app.core.logger import get_llm_logger
+
+logger = get_llm_logger("response_cache")
+
+
+def build_request_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float,
+    max_tokens: int,
+    extra_params: Optional[Dict[str, Any]] = None
+) -> str:
+    """根据请求内容生成规范化的请求键，供响应缓存和请求合并共用"""
+    request = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+    # 其他影响输出的参数（如top_p）也参与计算
+    if extra_params:
+        request["extra_params"] = extra_params
+    payload = json.dumps(
+        request,
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM响应缓存，内存为一级缓存（有界LRU），Redis为可选的二级缓存"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化响应缓存"""
+        if config is None:
+            config = settings.config.get("llm", {}).get("response_cache", {})
+
+        self.enabled = config.get("enabled", False)
+        self.max_entries = config.get("max_entries", 1000)
+        self.default_ttl = config.get("default_ttl", 3600)
+        self.agent_ttls = config.get("agent_ttls", {}) or {}
+        self.use_redis = config.get("redis", False)
+        self.redis_prefix = config.get("redis_prefix", "llm_response:")
+
+        # 内存缓存: key -> (expires_at, response)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._redis = None
+
+        self.stats = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0
+        }
+
+        logger.info(
+            f"LLM响应缓存初始化完成，启用: {self.enabled}, "
+            f"最大条目数: {self.max_entries}, Redis: {self.use_redis}"
+        )
+
+    def get_ttl(self, agent_type: Optional[str] = None) -> int:
+        """获取智能体类型对应的TTL，0表示不缓存"""
+        if agent_type and agent_type in self.agent_ttls:
+            return int(self.agent_ttls[agent_type])
+        return int(self.default_ttl)
+
+    def is_cacheable(self, agent_type: Optional[str] = None) -> bool:
+        """检查该智能体类型的请求是否可以缓存"""
+        return self.enabled and self.get_ttl(agent_type) > 0
+
+    def _get_redis(self):
+        """延迟获取Redis缓存实例"""
+        if not self.use_redis:
+            return None
+        if self._redis is None:
+            try:
+                from app.core.cache import cache
+                self._redis = cache
+            except Exception as e:
+                logger.error(f"Redis缓存不可用，仅使用内存缓存: {str(e)}")
+                self.use_redis = False
+                return None
+        return self._redis
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取缓存的响应"""
+        item = self._memory.get(key)
+        if item is not None:
+            expires_at, response = item
+            if expires_at >= time.time():
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return response
+            del self._memory[key]
+
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                envelope = await loop.run_in_executor(
+                    None, redis_cache.get_object, f"{self.redis_prefix}{key}"
+                )
+                if envelope is not None:
+                    # Redis中保存{"expires_at", "response"}，回填内存缓存时使用条目自身的过期时间，
+                    # 短TTL的响应不会因回填而比配置的TTL存活更久
+                    if isinstance(envelope, dict) and "expires_at" in envelope:
+                        remaining = envelope["expires_at"] - time.time()
+                        if remaining > 0:
+                            self.stats["redis_hits"] += 1
+                            self._set_memory(key, envelope["response"], remaining)
+                            return envelope["response"]
+                    else:
+                        # 旧格式的条目没有过期时间，只返回不回填
+                        self.stats["redis_hits"] += 1
+                        return envelope
+            except Exception as e:
+                logger.warning(f"读取Redis响应缓存失败: {str(e)}")
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, response: Any, ttl: int) -> None:
+        """缓存响应"""
+        if ttl <= 0:
+            return
+
+        self._set_memory(key, response, ttl)
+        self.stats["sets"] += 1
+
+        redis_cache = self._get_redis()
+        if redis_cache is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                envelope = {"expires_at": time.time() + ttl, "response": response}
+                await loop.run_in_executor(
+                    None, redis_cache.set_object, f"{self.redis_prefix}{key}", envelope, ttl
+                )
+            except Exception as e:
+                logger.warning(f"写入Redis响应缓存失败: {str(e)}")
+
+    def _set_memory(self, key: str, response: Any, ttl: float) -> None:
+        """写入内存缓存，超出容量时淘汰最久未使用的条目"""
+        self._memory[key] = (time.time() + ttl, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """清空内存缓存"""
+        self._memory.clear()
+        logger.info("LLM响应内存缓存已清空")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {**self.stats, "size": len(self._memory), "enabled": self.enabled}
+
+
+# 创建全局响应缓存实例
+response_cache = LLMResponseCache()
@@ -0,0 +1,72 @@
+"""
+单飞（single-flight）请求合并，相同键的并发请求共享一次实际调用
+"""
+
+from typing import Dict, Any, Callable, Awaitable
+import asyncio
+from app.core.logger import get_llm_logger
+
+logger = get_llm_logger("single_flight")
+
+
+class SingleFlight:
+    """合并相同键的并发调用，只有第一个调用者（leader）真正执行，其余调用者等待同一结果"""
+
+    def __init__(self):
+        """初始化请求合并器"""
+        self._calls: Dict[str, asyncio.Future] = {}
+        # 每个共享调用当前的等待者数量
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.stats = {
+            "calls": 0,
+            "coalesced": 0,
+            "abandoned": 0
+        }
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入键为key的调用
+
+        共享调用在独立任务中运行，并通过asyncio.shield等待，
+        单个等待者被取消不会影响其他等待者；只有当所有等待者都取消时才取消共享调用。
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+            logger.info(f"合并进行中的相同LLM请求: {key[:12]}..., 等待者数: {self._waiters[task] + 1}")
+
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] <= 0:
+                del self._waiters[task]
+                if not task.done():
+                    # 没有任何等待者，取消共享调用，并立即移除以免新的调用者加入已取消的任务
+                    logger.info(f"所有等待者均已取消，取消共享LLM请求: {key[:12]}...")
+                    self.stats["abandoned"] += 1
+                    if self._calls.get(key) is task:
+                        del self._calls[key]
+                    task.cancel()
+
+    def _on_done(self, key: str, task: asyncio.Future) -> None:
+        """共享调用完成后清理"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # 读取异常，避免等待者全部取消后出现"异常未被获取"的警告
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        """获取进行中的共享调用数"""
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {**self.stats, "in_flight": self.in_flight()}
@@ -0,0 +1,173 @@
+"""
+论文去重：规范化标题、DOI/arXiv ID匹配和MinHash近似重复检测，重复论文的元数据合并到首次出现的论文中
+"""
+
+from typing import Dict, List, Any, Optional, Set
+from collections import Counter
+import random
+import re
+import unicodedata
+import zlib
+from app.core.config import settings
+from app.core.logger import get_logger
+
+# 创建日志器
+logger = get_logger("paper_dedup")
+
+DOI_PATTERN = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+)", re.IGNORECASE)
+ARXIV_ID_PATTERN = re.compile(
+    r"arxiv\.org/(?:abs|pdf)/((?:\d{4}\.\d{4,5})|(?:[a-z\-]+(?:\.[A-Z]{2})?/\d{7}))(?:v\d+)?",
+    re.IGNORECASE
+)
+
+
+def normalize_title(title: str) -> str:
+    """规范化标题：统一Unicode形式和大小写，去掉重音符号和标点，合并空白"""
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"\w+", text.casefold()))
+
+
+def extract_identifiers(paper: Dict[str, Any]) -> List[str]:
+    """提取论文的DOI、arXiv ID和Semantic Scholar ID"""
+    identifiers = []
+
+    text = " ".join(str(paper.get(field) or "") for field in ("doi", "url", "entry_id"))
+    doi_match = DOI_PATTERN.search(text)
+    if doi_match:
+        identifiers.append("doi:" + doi_match.group(1).lower().rstrip("."))
+    arxiv_match = ARXIV_ID_PATTERN.search(text)
+    if arxiv_match:
+        identifiers.append("arxiv:" + arxiv_match.group(1).lower())
+    if paper.get("paper_id"):
+        identifiers.append("s2:" + str(paper["paper_id"]))
+    return identifiers
+
+
+def _shingles(normalized_title: str, size: int = 4) -> Set[str]:
+    """字符级shingle集合"""
+    text = normalized_title.replace(" ", "")
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class PaperDeduplicator:
+    """论文去重器，配置来自academic_search.dedup
+
+    依次按标识符（DOI/arXiv ID/Semantic Scholar ID）、规范化标题和MinHash LSH查找重复论文，
+    LSH候选再用shingle的Jaccard相似度确认。每篇论文最多确认max_candidates个候选，整体为线性时间。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化去重器"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("dedup", {})
+        self.similarity_threshold = config.get("similarity_threshold", 0.8)
+        self.bands = config.get("bands", 6)
+        self.rows = config.get("rows", 3)
+        self.shingle_size = config.get("shingle_size", 4)
+        # 每篇论文最多确认的LSH候选数，保证最坏情况下仍为线性时间
+        self.max_candidates = config.get("max_candidates", 10)
+
+        # 固定种子生成随机掩码，保证结果可复现
+        rng = random.Random(42)
+        self._masks = [rng.getrandbits(32) for _ in range(self.bands * self.rows)]
+
+    def _minhash(self, shingles: Set[str]) -> List[int]:
+        """计算MinHash签名，用异或随机掩码代替独立哈希函数，LSH候选最终由Jaccard相似度确认"""
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+        return [min(map(mask.__xor__, hashes)) for mask in self._masks]
+
+    def _bands(self, signature: List[int]) -> List[tuple]:
+        """把签名切分为LSH桶键"""
+        return [
+            (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        ]
+
+    def _merge_into(self, target: Dict[str, Any], duplicate: Dict[str, Any]) -> None:
+        """把重复论文的元数据合并到保留的论文中"""
+        for field in ("venue", "year", "url", "doi", "paper_id", "entry_id"):
+            if not target.get(field) and duplicate.get(field):
+                target[field] = duplicate[field]
+
+        if len(str(duplicate.get("abstract") or "")) > len(str(target.get("abstract") or "")):
+            target["abstract"] = duplicate["abstract"]
+
+        citations = [c for c in (target.get("citations"), duplicate.get("citations")) if isinstance(c, (int, float))]
+        if citations:
+            target["citations"] = max(citations)
+
+        if duplicate.get("categories"):
+            categories = list(target.get("categories") or [])
+            for category in duplicate["categories"]:
+                if category not in categories:
+                    categories.append(category)
+            target["categories"] = categories
+
+    def deduplicate(self, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """去重并保持首次出现的顺序，返回合并后的论文（不修改输入）"""
+        kept: List[Dict[str, Any]] = []
+        kept_shingles: List[Set[str]] = []
+        by_identifier: Dict[str, int] = {}
+        by_title: Dict[str, int] = {}
+        buckets: Dict[tuple, List[int]] = {}
+        duplicates = 0
+
+        for paper in papers:
+            normalized = normalize_title(str(paper.get("title") or ""))
+            if not normalized:
+                continue
+            identifiers = extract_identifiers(paper)
+
+            # 1. 标识符匹配
+            match = next((by_identifier[i] for i in identifiers if i in by_identifier), None)
+
+            # 2. 规范化标题完全相同
+            if match is None:
+                match = by_title.get(normalized)
+
+            # 3. MinHash LSH候选，用Jaccard相似度确认
+            shingles = _shingles(normalized, self.shingle_size)
+            band_keys = self._bands(self._minhash(shingles)) if shingles else []
+            if match is None and band_keys:
+                # 优先确认共享桶最多的候选
+                collisions = Counter(candidate for key in band_keys for candidate in buckets.get(key, ()))
+                for candidate, _ in collisions.most_common(self.max_candidates):
+                    if _jaccard(shingles, kept_shingles[candidate]) >= self.similarity_threshold:
+                        match = candidate
+                        break
+
+            if match is not None:
+                self._merge_into(kept[match], paper)
+                duplicates += 1
+            else:
+                match = len(kept)
+                kept.append(dict(paper))
+                kept_shingles.append(shingles)
+                for key in band_keys:
+                    bucket = buckets.setdefault(key, [])
+                    # 桶过大说明是大量相似的短标题，限制桶大小避免退化为平方复杂度
+                    if len(bucket) < self.max_candidates * 4:
+                        bucket.append(match)
+
+            # 重复论文的标识符和标题也指向保留的论文
+            for identifier in identifiers:
+                by_identifier.setdefault(identifier, match)
+            by_title.setdefault(normalized, match)
+
+        if duplicates:
+            logger.info(f"去重完成: {len(papers)} 篇 -> {len(kept)} 篇，合并 {duplicates} 篇重复论文")
+        return kept
+
+
+# 创建全局论文去重器
+paper_deduplicator = PaperDeduplicator()
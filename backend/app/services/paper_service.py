@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncGenerator
 import asyncio
 import json
 from app.core.logger import get_logger
@@ -262,6 +262,86 @@ class PaperService:
                 "token_usage": {"total_tokens": 0}
             }
 
+    async def _prepare_literature(
+        self,
+        topic: str,
+        literature: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """准备论文生成使用的文献数据，未传入文献时搜索arXiv"""
+        literature_data = None
+        try:
+            # 如果传入了文献，直接使用
+            if literature:
+                logger.info(f"使用传入的文献数据，共{len(literature)}篇")
+                literature_data = {
+                    "results": literature,
+                    "total": len(literature),
+                    "query": topic
+                }
+            else:
+                # 搜索学术论文
+                logger.info(f"搜索相关文献: {topic}")
+                try:
+                    # 优先使用arXiv搜索，不需要API密钥
+                    search_results = await academic_search_service.search_academic_papers(
+                        query=topic,
+                        limit=10,
+                        sources=["arxiv"]  # 明确指定使用arXiv
+                    )
+                    # 确保返回的是字典类型
+                    if not isinstance(search_results, dict):
+                        logger.warning(f"搜索结果不是字典类型: {type(search_results)}, 将使用空字典代替")
+                        search_results = {"results": [], "total": 0, "query": topic}
+                except Exception as e:
+                    logger.error(f"搜索相关文献失败: {str(e)}")
+                    search_results = {"results": [], "total": 0, "query": topic}
+
+                # 验证结果是否是可序列化的对象
+                if search_results is None or not isinstance(search_results, dict):
+                    logger.warning(f"搜索结果为None或不是字典格式: {type(search_results)}, 将使用空字典代替")
+                    literature_data = {"results": [], "total": 0, "query": topic}
+                else:
+                    # 创建一个新的可序列化字典，避免引用可能包含不可序列化对象的原始字典
+                    literature_data = {
+                        "results": [],
+                        "total": search_results.get("total", 0),
+                        "query": search_results.get("query", topic)
+                    }
+
+                    # 确保结果列表中的每个论文对象都是可序列化的
+                    results = search_results.get("results", [])
+                    if results and isinstance(results, list):
+                        for paper in results[:10]:  # 只使用前10篇文章
+                            if not isinstance(paper, dict):
+                                logger.warning(f"论文对象不是字典格式: {type(paper)}, 跳过")
+                                continue
+
+                            serializable_paper = {
+                                "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
+                                "authors": paper.get("authors", []) if isinstance(paper.get("authors"), list) else [],
+                                "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
+                                "abstract": str(paper.get("abstract", ""))[:300] if paper.get("abstract") is not None else "",  # 限制摘要长度
+                                "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
+                                "source": str(paper.get("source", "arxiv")) if paper.get("source") is not None else "arxiv"
+                            }
+                            literature_data["results"].append(serializable_paper)
+                    else:
+                        logger.warning(f"搜索结果列表为空或不是列表类型: {type(results)}")
+        except Exception as e:
+            logger.error(f"处理相关文献失败: {str(e)}")
+            literature_data = {"results": [], "total": 0, "query": topic}
+
+        return literature_data
+
+    def _get_section_ids(self, outline: Dict[str, Any]) -> List[str]:
+        """获取提纲中所有章节和子章节的ID"""
+        section_ids = []
+        for section in outline.get("sections", []):
+            section_ids.append(section.get("id"))
+            for subsection in section.get("subsections", []):
+                section_ids.append(subsection.get("id"))
+        return section_ids
+
     async def generate_full_paper(
         self,
         topic: str,
@@ -273,75 +353,10 @@ class PaperService:
             logger.info(f"生成完整论文: 主题={topic}")
 
             # 处理相关文献
-            literature_data = None
-            try:
-                # 如果传入了文献，直接使用
-                if literature:
-                    logger.info(f"使用传入的文献数据，共{len(literature)}篇")
-                    literature_data = {
-                        "results": literature,
-                        "total": len(literature),
-                        "query": topic
-                    }
-                else:
-                    # 搜索学术论文
-                    logger.info(f"搜索相关文献: {topic}")
-                    try:
-                        # 优先使用arXiv搜索，不需要API密钥
-                        search_results = await academic_search_service.search_academic_papers(
-                            query=topic,
-                            limit=10,
-                            sources=["arxiv"]  # 明确指定使用arXiv
-                        )
-                        # 确保返回的是字典类型
-                        if not isinstance(search_results, dict):
-                            logger.warning(f"搜索结果不是字典类型: {type(search_results)}, 将使用空字典代替")
-                            search_results = {"results": [], "total": 0, "query": topic}
-                    except Exception as e:
-                        logger.error(f"搜索相关文献失败: {str(e)}")
-                        search_results = {"results": [], "total": 0, "query": topic}
-
-                    # 验证结果是否是可序列化的对象
-                    if search_results is None or not isinstance(search_results, dict):
-                        logger.warning(f"搜索结果为None或不是字典格式: {type(search_results)}, 将使用空字典代替")
-                        literature_data = {"results": [], "total": 0, "query": topic}
-                    else:
-                        # 创建一个新的可序列化字典，避免引用可能包含不可序列化对象的原始字典
-                        literature_data = {
-                            "results": [],
-                            "total": search_results.get("total", 0),
-                            "query": search_results.get("query", topic)
-                        }
-
-                        # 确保结果列表中的每个论文对象都是可序列化的
-                        results = search_results.get("results", [])
-                        if results and isinstance(results, list):
-                            for paper in results[:10]:  # 只使用前10篇文章
-                                if not isinstance(paper, dict):
-                                    logger.warning(f"论文对象不是字典格式: {type(paper)}, 跳过")
-                                    continue
-
-                                serializable_paper = {
-                                    "title": str(paper.get("title", "")) if paper.get("title") is not None else "",
-                                    "authors": paper.get("authors", []) if isinstance(paper.get("authors"), list) else [],
-                                    "year": str(paper.get("year", "")) if paper.get("year") is not None else "",
-                                    "abstract": str(paper.get("abstract", ""))[:300] if paper.get("abstract") is not None else "",  # 限制摘要长度
-                                    "url": str(paper.get("url", "")) if paper.get("url") is not None else "",
-                                    "source": str(paper.get("source", "arxiv")) if paper.get("source") is not None else "arxiv"
-                                }
-                                literature_data["results"].append(serializable_paper)
-                        else:
-                            logger.warning(f"搜索结果列表为空或不是列表类型: {type(results)}")
-            except Exception as e:
-                logger.error(f"处理相关文献失败: {str(e)}")
-                literature_data = {"results": [], "total": 0, "query": topic}
+            literature_data = await self._prepare_literature(topic, literature)
 
             # 获取所有章节ID
-            section_ids = []
-            for section in outline.get("sections", []):
-                section_ids.append(section.get("id"))
-                for subsection in section.get("subsections", []):
-                    section_ids.append(subsection.get("id"))
+            section_ids = self._get_section_ids(outline)
 
             # 并行生成所有章节
             tasks = []
@@ -434,6 +449,108 @@ class PaperService:
                 "token_usage": 0
             }
 
+    async def generate_full_paper_streaming(
+        self,
+        topic: str,
+        outline: Dict[str, Any],
+        literature: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式生成完整论文，每个章节完成后立即返回，最后返回摘要和完整论文
+
+        事件类型: status, section, abstract, complete, error
+        """
+        tasks = []
+        try:
+            logger.info(f"流式生成完整论文: 主题={topic}")
+            yield {"type": "status", "message": "正在准备相关文献..."}
+
+            # 处理相关文献
+            literature_data = await self._prepare_literature(topic, literature)
+            literature_results = literature_data.get("results", []) if isinstance(literature_data, dict) else []
+            if not isinstance(literature_results, list):
+                literature_results = []
+
+            # 获取所有有效的章节ID
+            section_ids = [section_id for section_id in self._get_section_ids(outline) if section_id]
+            if not section_ids:
+                logger.warning("没有有效的章节ID，无法生成论文")
+                yield {"type": "error", "message": "无法生成论文，没有有效的章节"}
+                return
+
+            yield {
+                "type": "status",
+                "message": f"正在生成 {len(section_ids)} 个章节...",
+                "total_sections": len(section_ids)
+            }
+
+            # 并行生成所有章节，按完成顺序返回
+            tasks = [
+                asyncio.ensure_future(self.generate_paper_section(
+                    topic=topic,
+                    outline=outline,
+                    section_id=section_id,
+                    literature=literature_results
+                ))
+                for section_id in section_ids
+            ]
+
+            sections = {}
+            total_tokens = 0
+            completed = 0
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result = await next_done
+                except Exception as e:
+                    logger.error(f"章节生成异常: {str(e)}")
+                    continue
+
+                completed += 1
+                if not isinstance(result, dict) or not result.get("section_id"):
+                    logger.error(f"章节生成结果无效: {type(result)}")
+                    continue
+
+                section_id = result["section_id"]
+                sections[section_id] = {
+                    "title": result.get("title", ""),
+                    "content": result.get("content", "")
+                }
+                total_tokens += result.get("token_usage", {}).get("total_tokens", 0)
+
+                yield {
+                    "type": "section",
+                    "data": {"section_id": section_id, **sections[section_id]},
+                    "completed": completed,
+                    "total_sections": len(section_ids)
+                }
+
+            # 按提纲顺序排列章节
+            sections = {section_id: sections[section_id] for section_id in section_ids if section_id in sections}
+
+            # 生成摘要
+            yield {"type": "status", "message": "正在生成摘要..."}
+            abstract = await self.generate_abstract(topic, outline, sections)
+            yield {"type": "abstract", "data": abstract}
+
+            paper = {
+                "title": outline.get("title", topic),
+                "abstract": abstract,
+                "keywords": outline.get("keywords", []),
+                "sections": sections,
+                "token_usage": total_tokens
+            }
+
+            logger.info(f"论文流式生成完成: 标题={paper['title']}, 总tokens={total_tokens}")
+            yield {"type": "complete", "data": paper}
+
+        except Exception as e:
+            logger.error(f"流式生成完整论文失败: {str(e)}")
+            yield {"type": "error", "message": f"生成完整论文失败: {str(e)}"}
+        finally:
+            # 客户端断开时取消尚未完成的章节生成
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
     async def generate_abstract(
         self,
         topic: str,
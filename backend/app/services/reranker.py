@@ -0,0 +1,155 @@
+"""
+搜索结果相关性重排序：用本地TF-IDF模型计算查询与论文标题、摘要的余弦相似度，只使用CPU
+"""
+
+from typing import Dict, List, Any, Optional
+from collections import Counter
+import math
+import re
+from app.core.config import settings
+from app.core.logger import get_logger
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# 创建日志器
+logger = get_logger("reranker")
+
+# 英文单词/数字，或单个汉字
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[一-鿿]")
+
+
+def tokenize(text: str) -> List[str]:
+    """分词：单词和相邻词组成的二元组"""
+    words = TOKEN_PATTERN.findall((text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TfidfReranker:
+    """TF-IDF重排序器，配置来自academic_search.rerank
+
+    IDF按当前候选集计算，标题词频乘以title_weight。NumPy可用时对整批候选做向量化运算，否则使用纯Python实现。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化重排序器"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("rerank", {})
+        self.enabled = config.get("enabled", True)
+        self.title_weight = config.get("title_weight", 2.0)
+        if not NUMPY_AVAILABLE:
+            logger.warning("NumPy未安装，重排序使用纯Python实现")
+
+    def _document_counts(self, paper: Dict[str, Any]) -> Counter:
+        """论文的加权词频"""
+        counts = Counter()
+        for token in tokenize(str(paper.get("title") or "")):
+            counts[token] += self.title_weight
+        counts.update(tokenize(str(paper.get("abstract") or "")))
+        return counts
+
+    def score(self, query: str, papers: List[Dict[str, Any]]) -> List[float]:
+        """计算每篇论文与查询的余弦相似度"""
+        query_counts = Counter(tokenize(query))
+        if not papers or not query_counts:
+            return [0.0] * len(papers)
+
+        doc_counts = [self._document_counts(paper) for paper in papers]
+
+        # 词表和文档频率
+        vocabulary: Dict[str, int] = {}
+        document_frequency = Counter()
+        for counts in doc_counts:
+            document_frequency.update(counts.keys())
+            for token in counts:
+                vocabulary.setdefault(token, len(vocabulary))
+        for token in query_counts:
+            vocabulary.setdefault(token, len(vocabulary))
+
+        n = len(papers)
+        if NUMPY_AVAILABLE:
+            return self._score_numpy(query_counts, doc_counts, vocabulary, document_frequency, n)
+        return self._score_python(query_counts, doc_counts, document_frequency, n)
+
+    def _score_numpy(
+        self,
+        query_counts: Counter,
+        doc_counts: List[Counter],
+        vocabulary: Dict[str, int],
+        document_frequency: Counter,
+        n: int
+    ) -> List[float]:
+        """NumPy向量化计算：以稀疏坐标形式（行、列、词频）一次性计算整批候选的权重、范数和点积"""
+        rows = np.fromiter((row for row, counts in enumerate(doc_counts) for _ in counts), dtype=np.int64)
+        columns = np.fromiter((vocabulary[token] for counts in doc_counts for token in counts), dtype=np.int64)
+        tf = np.fromiter((tf for counts in doc_counts for tf in counts.values()), dtype=np.float64)
+
+        df = np.zeros(len(vocabulary), dtype=np.float64)
+        df[[vocabulary[token] for token in document_frequency]] = list(document_frequency.values())
+        idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+
+        query_vector = np.zeros(len(vocabulary), dtype=np.float64)
+        query_columns = [vocabulary[token] for token in query_counts]
+        # 次线性词频
+        query_vector[query_columns] = (1.0 + np.log(list(query_counts.values()))) * idf[query_columns]
+        query_norm = np.linalg.norm(query_vector)
+        if query_norm == 0 or tf.size == 0:
+            return [0.0] * n
+
+        weights = (1.0 + np.log(tf)) * idf[columns]
+        doc_norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=n))
+        dots = np.bincount(rows, weights=weights * query_vector[columns], minlength=n)
+        scores = dots / (np.maximum(doc_norms, 1e-12) * query_norm)
+        return scores.tolist()
+
+    def _score_python(
+        self,
+        query_counts: Counter,
+        doc_counts: List[Counter],
+        document_frequency: Counter,
+        n: int
+    ) -> List[float]:
+        """纯Python计算，NumPy不可用时使用"""
+        def weights(counts: Counter) -> Dict[str, float]:
+            return {
+                token: (1.0 + math.log(tf)) * (math.log((1.0 + n) / (1.0 + document_frequency.get(token, 0))) + 1.0)
+                for token, tf in counts.items() if tf > 0
+            }
+
+        query_weights = weights(query_counts)
+        query_norm = math.sqrt(sum(w * w for w in query_weights.values()))
+        if query_norm == 0:
+            return [0.0] * n
+
+        scores = []
+        for counts in doc_counts:
+            doc_weights = weights(counts)
+            doc_norm = math.sqrt(sum(w * w for w in doc_weights.values()))
+            dot = sum(w * doc_weights.get(token, 0.0) for token, w in query_weights.items())
+            scores.append(dot / (doc_norm * query_norm) if doc_norm else 0.0)
+        return scores
+
+    def rerank(self, query: str, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按相关性降序排列论文，返回带relevance_score的副本；得分相同时保持原顺序"""
+        if not papers:
+            return []
+        try:
+            scores = self.score(query, papers)
+        except Exception as e:
+            logger.error(f"相关性重排序失败: {str(e)}")
+            return papers
+
+        ranked = []
+        for paper, score in zip(papers, scores):
+            ranked_paper = dict(paper)
+            ranked_paper["relevance_score"] = round(float(score), 4)
+            ranked.append(ranked_paper)
+        ranked.sort(key=lambda p: p["relevance_score"], reverse=True)
+        return ranked
+
+
+# 创建全局重排序器
+reranker = TfidfReranker()
@@ -0,0 +1,132 @@
+"""
+搜索源执行器：为scholarly、arxiv等同步客户端提供按搜索源隔离的有界线程池和超时控制
+"""
+
+from typing import Dict, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+from app.core.config import settings
+from app.core.logger import get_logger
+
+# 创建日志器
+logger = get_logger("source_executor")
+
+
+class SourceTimeoutError(Exception):
+    """搜索源调用超时"""
+    pass
+
+
+class SourcePool:
+    """单个搜索源的线程池
+
+    并发槽位在线程真正结束时才释放：超时的调用无法中断，仍然占用工作线程，
+    新的调用会排队等待槽位而不是在线程池队列中无限堆积。
+    """
+
+    def __init__(self, source: str, max_workers: int = 4, timeout: float = 20.0):
+        """初始化线程池"""
+        self.source = source
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"source-{source}")
+        self.slots = asyncio.Semaphore(self.max_workers)
+
+        # 指标
+        self.in_flight = 0
+        self.total_calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.total_wait_time = 0.0
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """在线程池中执行同步函数，超时（包括等待槽位的时间）抛出SourceTimeoutError"""
+        timeout = self.timeout if timeout is None else timeout
+        self.total_calls += 1
+        try:
+            return await asyncio.wait_for(self._submit(func, *args), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"搜索源 {self.source} 调用超过 {timeout} 秒，放弃等待")
+            raise SourceTimeoutError(f"{self.source} 调用超时（{timeout}秒）")
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def _submit(self, func: Callable, *args) -> Any:
+        """获取槽位后提交到线程池"""
+        loop = asyncio.get_event_loop()
+        wait_start = time.monotonic()
+        await self.slots.acquire()
+        self.total_wait_time += time.monotonic() - wait_start
+        self.in_flight += 1
+
+        def release(_):
+            loop.call_soon_threadsafe(self._release)
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        """线程结束后释放槽位"""
+        self.in_flight -= 1
+        self.slots.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取线程池指标"""
+        return {
+            "max_workers": self.max_workers,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "total_calls": self.total_calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_wait_time": self.total_wait_time / self.total_calls if self.total_calls else 0.0
+        }
+
+
+class SourceExecutor:
+    """按搜索源管理线程池，配置来自academic_search.executor"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化执行器"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("executor", {})
+        self.config = config or {}
+        self.pools: Dict[str, SourcePool] = {}
+
+    def get_pool(self, source: str) -> SourcePool:
+        """获取或创建搜索源的线程池"""
+        if source not in self.pools:
+            default = self.config.get("default", {})
+            source_config = {**default, **(self.config.get(source, {}) or {})}
+            self.pools[source] = SourcePool(
+                source,
+                max_workers=source_config.get("max_workers", 4),
+                timeout=source_config.get("timeout", 20)
+            )
+            logger.info(
+                f"创建搜索源线程池: {source}, 工作线程: {self.pools[source].max_workers}, "
+                f"超时: {self.pools[source].timeout}秒"
+            )
+        return self.pools[source]
+
+    async def run(self, source: str, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """在搜索源的线程池中执行同步函数"""
+        return await self.get_pool(source).run(func, *args, timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有线程池的指标"""
+        return {source: pool.get_stats() for source, pool in self.pools.items()}
+
+    def shutdown(self) -> None:
+        """关闭所有线程池，不等待仍在运行的调用"""
+        for pool in self.pools.values():
+            pool.executor.shutdown(wait=False)
+        self.pools.clear()
+
+
+# 创建全局搜索源执行器
+source_executor = SourceExecutor()
@@ -0,0 +1,267 @@
+"""
+搜索源限流：按搜索源的令牌桶，通过Redis在多个工作进程之间共享配额，Redis不可用时退回进程内令牌桶；
+收到429时按Retry-After暂停该搜索源的所有请求
+"""
+
+from typing import Dict, Any, Optional
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import asyncio
+import random
+import time
+from app.core.config import settings
+from app.core.logger import get_logger
+
+# 创建日志器
+logger = get_logger("source_rate_limiter")
+
+# 令牌桶脚本：KEYS[1]令牌桶，KEYS[2]暂停截止时间；ARGV为每毫秒补充的令牌数、容量、请求的令牌数
+# 返回需要等待的毫秒数，0表示已获取令牌。使用Redis服务器时间，避免各主机时钟不一致
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local blocked_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if blocked_until > now then
+    return blocked_until - now
+end
+
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = math.ceil((requested - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return wait
+"""
+
+# 暂停脚本：KEYS[1]暂停截止时间；ARGV[1]暂停的毫秒数。只延长不缩短，返回实际剩余的暂停毫秒数
+PENALIZE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ms > current then
+    redis.call('SET', KEYS[1], until_ms, 'PX', tonumber(ARGV[1]) + 1000)
+    return until_ms - now
+end
+return current - now
+"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期），无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class SourceLimit:
+    """单个搜索源的限流状态和指标"""
+
+    def __init__(self, source: str, requests_per_second: float, burst: int):
+        """初始化限流状态"""
+        self.source = source
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        # 进程内回退令牌桶和暂停截止时间
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+        # 指标
+        self.total_requests = 0
+        self.throttled_requests = 0
+        self.throttled_time = 0.0
+        self.rate_limited = 0
+        self.penalty_time = 0.0
+
+    def local_wait(self) -> float:
+        """进程内令牌桶：获取令牌，返回需要等待的秒数（0表示已获取）"""
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.requests_per_second)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.requests_per_second
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取指标"""
+        return {
+            "requests_per_second": self.requests_per_second,
+            "burst": self.burst,
+            "total_requests": self.total_requests,
+            "throttled_requests": self.throttled_requests,
+            "throttled_time": round(self.throttled_time, 3),
+            "rate_limited": self.rate_limited,
+            "penalty_time": round(self.penalty_time, 3)
+        }
+
+
+class SourceRateLimiter:
+    """搜索源限流器，配置来自academic_search.rate_limits"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """初始化限流器"""
+        if config is None:
+            config = settings.config.get("academic_search", {}).get("rate_limits", {})
+        self.config = config or {}
+        self.use_redis = self.config.get("redis", True)
+        self.key_prefix = self.config.get("key_prefix", "apa-ratelimit:")
+        self.sources = self.config.get("sources", {}) or {}
+        self.limits: Dict[str, SourceLimit] = {}
+
+        self._redis = None
+        self._acquire_script = None
+        self._penalize_script = None
+        # Redis出错后在这个时间之前使用进程内令牌桶
+        self._redis_retry_at = 0.0
+        self.redis_errors = 0
+
+    def get_limit(self, source: str) -> Optional[SourceLimit]:
+        """获取搜索源的限流状态，未配置限流的搜索源返回None"""
+        if source not in self.limits:
+            source_config = self.sources.get(source)
+            if not source_config or not source_config.get("requests_per_second"):
+                return None
+            self.limits[source] = SourceLimit(
+                source,
+                float(source_config["requests_per_second"]),
+                int(source_config.get("burst", 1))
+            )
+        return self.limits[source]
+
+    def _get_redis(self):
+        """延迟获取Redis连接并注册脚本，不可用时返回None"""
+        if not self.use_redis or time.monotonic() < self._redis_retry_at:
+            return None
+        if self._redis is None:
+            try:
+                from app.core.cache import cache
+                self._redis = cache.redis
+                self._acquire_script = self._redis.register_script(ACQUIRE_SCRIPT)
+                self._penalize_script = self._redis.register_script(PENALIZE_SCRIPT)
+            except Exception as e:
+                logger.error(f"Redis不可用，搜索源限流只在进程内生效: {str(e)}")
+                self.use_redis = False
+                return None
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        """Redis调用失败，30秒内退回进程内令牌桶"""
+        self.redis_errors += 1
+        self._redis_retry_at = time.monotonic() + 30
+        logger.warning(f"Redis限流调用失败，30秒内使用进程内令牌桶: {str(error)}")
+
+    async def _wait_time(self, limit: SourceLimit) -> float:
+        """尝试获取令牌，返回需要等待的秒数"""
+        if self._get_redis() is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                wait_ms = await loop.run_in_executor(
+                    None,
+                    lambda: self._acquire_script(
+                        keys=[f"{self.key_prefix}{limit.source}", f"{self.key_prefix}{limit.source}:blocked"],
+                        args=[limit.requests_per_second / 1000.0, limit.burst, 1]
+                    )
+                )
+                return int(wait_ms) / 1000.0
+            except Exception as e:
+                self._redis_failed(e)
+        return limit.local_wait()
+
+    async def acquire(self, source: str) -> None:
+        """等待直到可以向搜索源发起一次请求"""
+        limit = self.get_limit(source)
+        if limit is None:
+            return
+
+        limit.total_requests += 1
+        start_time = time.monotonic()
+        throttled = False
+        while True:
+            wait = await self._wait_time(limit)
+            if wait <= 0:
+                break
+            throttled = True
+            # 加少量抖动，避免多个进程同时醒来
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+        if throttled:
+            waited = time.monotonic() - start_time
+            limit.throttled_requests += 1
+            limit.throttled_time += waited
+            logger.debug(f"搜索源 {source} 限流等待 {waited:.2f} 秒")
+
+    async def penalize(self, source: str, retry_after: Optional[str], default: float) -> float:
+        """收到429时暂停该搜索源的所有请求，优先使用Retry-After，返回暂停的秒数"""
+        seconds = parse_retry_after(retry_after)
+        if seconds is None:
+            seconds = default
+
+        limit = self.get_limit(source)
+        if limit is None:
+            # 未配置限流的搜索源直接在本地等待
+            await asyncio.sleep(seconds)
+            return seconds
+
+        limit.rate_limited += 1
+        limit.penalty_time += seconds
+        limit.blocked_until = max(limit.blocked_until, time.monotonic() + seconds)
+
+        if self._get_redis() is not None:
+            try:
+                loop = asyncio.get_event_loop()
+                remaining_ms = await loop.run_in_executor(
+                    None,
+                    lambda: self._penalize_script(
+                        keys=[f"{self.key_prefix}{source}:blocked"],
+                        args=[int(seconds * 1000)]
+                    )
+                )
+                seconds = int(remaining_ms) / 1000.0
+            except Exception as e:
+                self._redis_failed(e)
+
+        logger.warning(f"搜索源 {source} 返回429，所有请求暂停 {seconds:.1f} 秒")
+        return seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取所有搜索源的限流指标"""
+        return {
+            "backend": "redis" if self.use_redis and time.monotonic() >= self._redis_retry_at else "local",
+            "redis_errors": self.redis_errors,
+            "sources": {source: limit.get_stats() for source, limit in self.limits.items()}
+        }
+
+
+# 创建全局搜索源限流器
+source_rate_limiter = SourceRateLimiter()
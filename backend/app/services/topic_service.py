@@ -66,8 +66,10 @@ class TopicService:
         try:
             logger.info(f"推荐论文主题: 兴趣={user_interests}, 领域={academic_field}, 级别={academic_level}")
 
-            # 获取研究趋势
-            trends = await self.academic_search_service.get_research_trends(academic_field)
+            # 获取研究趋势（优先使用趋势缓存，最多等待trends.topic_wait秒）
+            trends = await self.academic_search_service.get_research_trends(
+                academic_field, max_wait=self.academic_search_service.trends_topic_wait
+            )
 
             # 使用智能体协调器进行多智能体协作
             from app.services.agent_service import agent_coordinator
@@ -502,7 +504,9 @@ class TopicService:
             # 获取研究趋势
             try:
                 # 不直接传递academic_search_service对象，而是调用其方法
-                trends = await self.academic_search_service.get_research_trends(academic_field)
+                trends = await self.academic_search_service.get_research_trends(
+                    academic_field, max_wait=self.academic_search_service.trends_topic_wait
+                )
                 # 确保trends是可序列化的对象
                 if not isinstance(trends, (list, dict)):
                     logger.warning(f"研究趋势不是可序列化的对象类型: {type(trends)}")
@@ -708,7 +712,8 @@ class TopicService:
             response = await self.llm_service.acompletion(
                 messages=[{"role": "system", "content": system_prompt}],
                 max_tokens=1000,
-                temperature=0.5
+                temperature=0.5,
+                hedge=True  # 交互式调用，使用对冲请求降低尾延迟
             )
 
             # 解析响应
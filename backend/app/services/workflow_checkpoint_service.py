@@ -0,0 +1,158 @@
+"""
+工作流检查点服务：持久化每个步骤的结果，工作流失败后可以从检查点恢复执行
+"""
+
+from typing import Dict, List, Any, Optional, Callable
+import asyncio
+import hashlib
+import json
+import uuid
+from app.core.config import settings
+from app.core.logger import get_logger
+from app.core.context import get_current_user_id
+from app.db.session import SessionLocal
+from app.models.workflow_run import WorkflowRun
+from app.models.workflow_checkpoint import WorkflowCheckpoint
+from app.utils.json_utils import safe_dumps
+
+# 创建日志器
+logger = get_logger("workflow_checkpoint_service")
+
+
+def build_step_key(agent_id: str, task: str, inputs: Dict[str, Any]) -> str:
+    """根据智能体、任务和解析后的输入生成步骤键"""
+    payload = json.dumps(
+        {"agent": agent_id, "task": task, "inputs": inputs},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class WorkflowCheckpointService:
+    """工作流检查点服务，数据库操作在线程池中执行"""
+
+    def __init__(self):
+        """初始化检查点服务"""
+        config = settings.config.get("workflow", {}).get("checkpoint", {})
+        self.enabled = config.get("enabled", True)
+        # 是否复用其他运行中输入完全相同的步骤结果
+        self.reuse_across_runs = config.get("reuse_across_runs", False)
+        logger.info(f"工作流检查点服务初始化完成，启用: {self.enabled}, 跨运行复用: {self.reuse_across_runs}")
+
+    async def _run_db(self, func: Callable, *args) -> Any:
+        """在线程池中执行同步数据库操作，避免阻塞事件循环"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def create_run(self, workflow: List[Dict[str, Any]], initial_context: Dict[str, Any]) -> str:
+        """创建工作流运行记录，返回运行ID"""
+        return await self._run_db(self._create_run, workflow, initial_context, get_current_user_id())
+
+    async def load(self, run_id: str, step_key: str) -> Optional[Dict[str, Any]]:
+        """加载步骤检查点，返回{"result": ...}，没有检查点时返回None"""
+        return await self._run_db(self._load, run_id, step_key)
+
+    async def save(self, run_id: str, step_index: int, step_key: str, agent_id: str, task: str, result: Any) -> None:
+        """保存步骤检查点"""
+        await self._run_db(self._save, run_id, step_index, step_key, agent_id, task, result)
+
+    async def load_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """异步获取工作流运行记录"""
+        return await self._run_db(self.get_run, run_id)
+
+    async def finish_run(self, run_id: str, status: str, error: Optional[str] = None) -> None:
+        """记录工作流运行的最终状态"""
+        await self._run_db(self._finish_run, run_id, status, error)
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """获取工作流运行记录及其检查点"""
+        db = SessionLocal()
+        try:
+            run = db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
+            if run is None:
+                return None
+            checkpoints = (
+                db.query(WorkflowCheckpoint)
+                .filter(WorkflowCheckpoint.run_id == run_id)
+                .order_by(WorkflowCheckpoint.step_index)
+                .all()
+            )
+            return {
+                "run_id": run.id,
+                "user_id": run.user_id,
+                "workflow": run.workflow,
+                "initial_context": run.initial_context or {},
+                "status": run.status,
+                "error": run.error,
+                "completed_steps": [
+                    {"step_index": c.step_index, "agent": c.agent, "task": c.task}
+                    for c in checkpoints
+                ]
+            }
+        finally:
+            db.close()
+
+    def _create_run(self, workflow: List[Dict[str, Any]], initial_context: Dict[str, Any], user_id: Optional[int]) -> str:
+        """创建工作流运行记录"""
+        db = SessionLocal()
+        try:
+            run = WorkflowRun(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                workflow=json.loads(safe_dumps(workflow)),
+                initial_context=json.loads(safe_dumps(initial_context)),
+                status="running"
+            )
+            db.add(run)
+            db.commit()
+            return run.id
+        finally:
+            db.close()
+
+    def _load(self, run_id: str, step_key: str) -> Optional[Dict[str, Any]]:
+        """加载步骤检查点"""
+        db = SessionLocal()
+        try:
+            query = db.query(WorkflowCheckpoint).filter(WorkflowCheckpoint.step_key == step_key)
+            if not self.reuse_across_runs:
+                query = query.filter(WorkflowCheckpoint.run_id == run_id)
+            checkpoint = query.order_by(WorkflowCheckpoint.id.desc()).first()
+            if checkpoint is None:
+                return None
+            return {"result": checkpoint.result}
+        finally:
+            db.close()
+
+    def _save(self, run_id: str, step_index: int, step_key: str, agent_id: str, task: str, result: Any) -> None:
+        """保存步骤检查点"""
+        db = SessionLocal()
+        try:
+            db.add(WorkflowCheckpoint(
+                run_id=run_id,
+                step_index=step_index,
+                step_key=step_key,
+                agent=agent_id,
+                task=task[:255],
+                result=json.loads(safe_dumps(result))
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish_run(self, run_id: str, status: str, error: Optional[str]) -> None:
+        """记录工作流运行的最终状态"""
+        db = SessionLocal()
+        try:
+            run = db.query(WorkflowRun).filter(WorkflowRun.id == run_id).first()
+            if run is not None:
+                run.status = status
+                run.error = error
+                db.commit()
+        finally:
+            db.close()
+
+
+# 创建全局工作流检查点服务实例
+workflow_checkpoint_service = WorkflowCheckpointService()
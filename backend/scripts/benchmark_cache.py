@@ -0,0 +1,182 @@
+"""
+缓存性能基准测试
+
+比较旧的缓存键生成方式（json.dumps参数、逐个检查kwargs是否可序列化、再对结果做一次完整的可序列化检查）
+和按函数签名生成缓存键的方式，测量缓存命中路径的单次耗时，以及各序列化格式和压缩方式对一篇完整论文的大小和耗时。
+只使用进程内缓存，不需要Redis。
+
+用法:
+    python scripts/benchmark_cache.py [--iterations 20000]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.cache_service import CacheService
+from app.services import cache_serializers
+from app.services.cache_serializers import CacheSerializer
+
+
+def legacy_generate_key(prefix: str, args: tuple, kwargs: dict) -> str:
+    """旧的缓存键生成方式，用于对比"""
+    def is_serializable(obj):
+        try:
+            json.dumps(obj)
+            return True
+        except (TypeError, OverflowError):
+            return False
+
+    args_str = json.dumps(args[1:], sort_keys=True)
+    serializable_kwargs = {k: v for k, v in kwargs.items() if is_serializable(v)}
+    kwargs_str = json.dumps(serializable_kwargs, sort_keys=True)
+    key = f"{prefix}:{args_str}:{kwargs_str}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def sample_search_kwargs() -> dict:
+    """与/search/literature端点相同的调用参数"""
+    return {
+        "query": "deep learning lung nodule detection",
+        "limit": 10,
+        "sources": ["arxiv", "semantic_scholar"],
+        "sort_by": "relevance",
+        "years": "last_5",
+        "categories": ["cs.CV", "eess.IV"],
+        "fields": None,
+        "use_local_index": None
+    }
+
+
+def sample_search_result(count: int = 10) -> dict:
+    """一次搜索的结果"""
+    return {
+        "results": [
+            {
+                "title": f"Deep Learning for Lung Nodule Detection, Part {i}",
+                "authors": ["Smith, J.", "Johnson, R.", "Wang, L."],
+                "year": "2023",
+                "abstract": "We propose a deep learning approach for lung nodule detection. " * 5,
+                "url": f"https://arxiv.org/pdf/2301.{i:05d}",
+                "source": "arxiv",
+                "citations": i * 3,
+                "relevance_score": 0.5
+            }
+            for i in range(count)
+        ],
+        "total": count,
+        "query": "deep learning lung nodule detection",
+        "sources_stats": {"arxiv": count}
+    }
+
+
+def sample_full_paper(sections: int = 12) -> dict:
+    """一篇完整论文（大负载）"""
+    paragraph = "本研究提出了一种基于深度学习的肺结节检测方法，在公开数据集上取得了较好的效果。" * 20
+    return {
+        "title": "基于深度学习的肺部CT图像肺结节检测系统",
+        "abstract": paragraph,
+        "keywords": ["深度学习", "肺结节", "CT图像"],
+        "sections": {str(i): {"title": f"第{i}章", "content": paragraph * 4} for i in range(sections)},
+        "token_usage": 15000
+    }
+
+
+def timed(func, iterations: int) -> float:
+    """执行iterations次，返回每次的平均耗时（微秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def benchmark_keys(iterations: int) -> None:
+    """缓存键生成"""
+    cache = CacheService()
+
+    async def search_academic_papers(self, query, limit=None, sources=None, sort_by=None, years=None,
+                                     categories=None, fields=None, fan_out=None, use_local_index=None):
+        return None
+
+    build_key = cache._make_key_builder("academic_papers_search", search_academic_papers)
+    kwargs = sample_search_kwargs()
+    result = sample_search_result()
+    service = object()
+
+    # 旧的装饰器在写缓存前还要对结果做一次完整的json.dumps检查
+    legacy = timed(lambda: legacy_generate_key("academic_papers_search", (service,), kwargs), iterations)
+    legacy_check = timed(lambda: json.dumps(result), iterations)
+    fast = timed(lambda: build_key(service, **kwargs), iterations)
+
+    print("缓存键生成（每次调用，微秒）")
+    print(f"  旧方式:             {legacy:8.2f}")
+    print(f"  旧方式结果检查:     {legacy_check:8.2f}（未命中时额外执行）")
+    print(f"  按签名生成:         {fast:8.2f}  ({legacy / fast:.1f}x)")
+
+
+async def benchmark_hit_path(iterations: int) -> None:
+    """缓存命中路径（装饰器 + L1）"""
+    cache = CacheService()
+
+    @cache.cached(prefix="academic_papers_search", ttl=3600)
+    async def search_academic_papers(self, query, limit=None, sources=None, sort_by=None, years=None,
+                                     categories=None, fields=None, fan_out=None, use_local_index=None):
+        return sample_search_result()
+
+    kwargs = sample_search_kwargs()
+    service = object()
+    await search_academic_papers(service, **kwargs)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await search_academic_papers(service, **kwargs)
+    elapsed = (time.perf_counter() - start) / iterations * 1e6
+    print(f"\n缓存命中路径（每次调用，微秒）: {elapsed:.2f}，命中 {cache.hits} 次")
+
+
+def benchmark_serializers(iterations: int) -> None:
+    """序列化格式和压缩方式"""
+    payload = {"v": sample_full_paper(), "f": time.time()}
+    variants = [("json", "none"), ("json", "zlib"), ("json", "zstd"), ("json", "lz4"), ("msgpack", "none"), ("msgpack", "zstd")]
+
+    print(f"\n完整论文序列化（orjson: {cache_serializers.ORJSON_AVAILABLE}, msgpack: {cache_serializers.MSGPACK_AVAILABLE}, "
+          f"zstd: {cache_serializers.ZSTD_AVAILABLE}, lz4: {cache_serializers.LZ4_AVAILABLE}）")
+    stdlib = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    stdlib_dumps = timed(lambda: json.dumps(payload, ensure_ascii=False).encode("utf-8"), iterations)
+    stdlib_loads = timed(lambda: json.loads(stdlib), iterations)
+    print(f"  {'标准库json':<16} {len(stdlib):>9} 字节  序列化 {stdlib_dumps:9.1f} 微秒  反序列化 {stdlib_loads:9.1f} 微秒")
+
+    seen = set()
+    for serializer_name, compression in variants:
+        serializer = CacheSerializer({"serializer": serializer_name, "compression": compression, "compress_min_bytes": 4096})
+        actual = (serializer.format, serializer.compression)
+        # 库未安装时会退回到已经测过的组合
+        if actual in seen:
+            continue
+        seen.add(actual)
+        data = serializer.serialize(payload)
+        dumps = timed(lambda: serializer.serialize(payload), iterations)
+        loads = timed(lambda: serializer.deserialize(data), iterations)
+        label = f"{serializer_name}+{compression}"
+        print(f"  {label:<16} {len(data):>9} 字节  序列化 {dumps:9.1f} 微秒  反序列化 {loads:9.1f} 微秒")
+
+
+def main():
+    """运行所有基准测试"""
+    parser = argparse.ArgumentParser(description="缓存性能基准测试")
+    parser.add_argument("--iterations", type=int, default=20000, help="键生成和命中路径的迭代次数")
+    args = parser.parse_args()
+
+    benchmark_keys(args.iterations)
+    asyncio.run(benchmark_hit_path(args.iterations))
+    benchmark_serializers(max(1, args.iterations // 100))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+导入arXiv元数据快照到本地文献索引
+
+arXiv元数据快照（arxiv-metadata-oai-snapshot.json）为JSONL格式，每行一篇论文，完整文件有数GB。
+本脚本逐行流式读取（支持.gz），内存占用恒定，把记录转换为与search_arxiv相同的结构后按批次写入本地文献索引。
+每个批次提交后记录文件偏移量，中断后重新运行同一命令即可从上次的位置继续。
+
+用法:
+    python scripts/ingest_arxiv_snapshot.py arxiv-metadata-oai-snapshot.json [--batch-size 5000] [--categories cs. stat.ML]
+"""
+import sys
+import os
+import argparse
+import gzip
+import json
+import re
+import time
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.core.logger import setup_logging, get_logger
+from app.services.literature_index import LiteratureIndex
+
+logger = get_logger("arxiv_ingest")
+
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+
+
+def normalize_record(record: dict) -> dict:
+    """把快照记录转换为与search_arxiv相同的结构"""
+    arxiv_id = record.get("id", "")
+
+    authors = []
+    for parts in record.get("authors_parsed") or []:
+        # authors_parsed的格式为[姓, 名, 后缀]
+        name = " ".join(p for p in [parts[1] if len(parts) > 1 else "", parts[0], parts[2] if len(parts) > 2 else ""] if p)
+        if name:
+            authors.append(name)
+    if not authors and record.get("authors"):
+        authors = [a.strip() for a in re.split(r",| and ", record["authors"]) if a.strip()]
+
+    # 年份取第一个版本的提交时间，没有版本信息时使用更新日期
+    year = ""
+    versions = record.get("versions") or []
+    if versions:
+        match = YEAR_PATTERN.search(versions[0].get("created", ""))
+        if match:
+            year = int(match.group(0))
+    if not year and record.get("update_date"):
+        year = int(record["update_date"][:4])
+
+    return {
+        "title": " ".join((record.get("title") or "").split()),
+        "authors": authors,
+        "year": year,
+        "abstract": (record.get("abstract") or "").strip(),
+        "url": f"https://arxiv.org/pdf/{arxiv_id}",
+        "categories": (record.get("categories") or "").split(),
+        "venue": record.get("journal-ref") or "",
+        "entry_id": f"http://arxiv.org/abs/{arxiv_id}",
+        "source": "arxiv"
+    }
+
+
+def matches_categories(paper: dict, prefixes: list) -> bool:
+    """检查论文类别是否匹配任一前缀"""
+    if not prefixes:
+        return True
+    return any(cat.startswith(prefix) for cat in paper["categories"] for prefix in prefixes)
+
+
+def load_state(state_path: str, snapshot: str, restart: bool = False) -> dict:
+    """读取导入进度，快照文件不同或指定restart时从头开始"""
+    if not restart and os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("snapshot") == os.path.abspath(snapshot):
+            return state
+        logger.warning(f"进度文件对应的快照不同，从头开始导入: {state.get('snapshot')}")
+    return {"snapshot": os.path.abspath(snapshot), "offset": 0, "lines": 0, "ingested": 0}
+
+
+def save_state(state_path: str, state: dict) -> None:
+    """原子写入导入进度"""
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def ingest(args) -> None:
+    """流式导入快照"""
+    config = dict(settings.config.get("academic_search", {}).get("local_index", {}))
+    config["enabled"] = True
+    if args.index_path:
+        config["path"] = args.index_path
+    index = LiteratureIndex(config)
+
+    state_path = args.state or str(index.path) + ".ingest_state.json"
+    state = load_state(state_path, args.snapshot, args.restart)
+    if state["offset"]:
+        logger.info(f"从上次的进度继续: 已读取 {state['lines']} 行，已导入 {state['ingested']} 篇")
+
+    total_bytes = os.path.getsize(args.snapshot)
+    opener = gzip.open if args.snapshot.endswith(".gz") else open
+    start_time = time.monotonic()
+    session_ingested = 0
+    batch = []
+
+    def flush(offset: int) -> None:
+        """提交一个批次并记录进度"""
+        nonlocal batch, session_ingested
+        if batch:
+            index.add_papers_sync(batch)
+            state["ingested"] += len(batch)
+            session_ingested += len(batch)
+            batch = []
+        state["offset"] = offset
+        save_state(state_path, state)
+
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        # gzip文件的偏移量是解压后的位置，无法换算为进度百分比
+        progress = f"{offset / total_bytes:.1%}, " if opener is open and total_bytes else ""
+        logger.info(
+            f"进度: {progress}已读取 {state['lines']} 行，已导入 {state['ingested']} 篇，"
+            f"速度 {session_ingested / elapsed:.0f} 篇/秒"
+        )
+
+    with opener(args.snapshot, "rb") as f:
+        f.seek(state["offset"])
+        while True:
+            # 达到本次导入上限时停在当前行之前，下次从这一行继续
+            position = f.tell()
+            if args.limit and session_ingested + len(batch) >= args.limit:
+                break
+            line = f.readline()
+            if not line:
+                break
+            state["lines"] += 1
+
+            try:
+                paper = normalize_record(json.loads(line))
+            except Exception as e:
+                logger.error(f"解析第 {state['lines']} 行失败: {str(e)}")
+                continue
+
+            if paper["title"] and matches_categories(paper, args.categories):
+                batch.append(paper)
+
+            if len(batch) >= args.batch_size:
+                flush(f.tell())
+
+        flush(position)
+
+    index.close()
+    elapsed = time.monotonic() - start_time
+    logger.info(f"导入完成: 本次导入 {session_ingested} 篇，用时 {elapsed:.1f} 秒，索引: {index.path}")
+
+
+def main():
+    """解析参数并开始导入"""
+    parser = argparse.ArgumentParser(description="导入arXiv元数据快照到本地文献索引")
+    parser.add_argument("snapshot", help="arXiv元数据快照文件（JSONL，可以是.gz）")
+    parser.add_argument("--batch-size", type=int, default=5000, help="每个事务写入的论文数")
+    parser.add_argument("--categories", nargs="*", default=[], help="只导入匹配这些类别前缀的论文，例如 cs. stat.ML")
+    parser.add_argument("--limit", type=int, default=0, help="本次最多导入的论文数，0表示不限制")
+    parser.add_argument("--index-path", default=None, help="索引文件路径，默认使用academic_search.local_index.path")
+    parser.add_argument("--state", default=None, help="进度文件路径，默认为索引文件路径加.ingest_state.json")
+    parser.add_argument("--restart", action="store_true", help="忽略已有进度，从头开始导入")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        ingest(args)
+    except KeyboardInterrupt:
+        logger.info("导入已中断，重新运行同一命令即可继续")
+
+
+if __name__ == "__main__":
+    main()
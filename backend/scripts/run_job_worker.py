@@ -0,0 +1,38 @@
+"""
+后台任务工作进程
+
+与API服务分开运行，用于执行完整论文生成、智能体工作流等长时间任务。
+此时可以在配置中设置 jobs.run_in_api: false，API进程只负责提交和查询任务。
+
+用法:
+    python scripts/run_job_worker.py [--concurrency N]
+"""
+import sys
+import os
+import argparse
+import asyncio
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.logger import setup_logging, get_logger
+from app.services.job_service import job_service
+
+logger = get_logger("job_worker")
+
+def main():
+    """启动工作进程"""
+    parser = argparse.ArgumentParser(description="后台任务工作进程")
+    parser.add_argument("--concurrency", type=int, default=None, help="并发执行的任务数，默认使用配置中的jobs.concurrency")
+    args = parser.parse_args()
+
+    setup_logging()
+    logger.info(f"后台任务工作进程启动: {job_service.worker_id}")
+
+    try:
+        asyncio.run(job_service.run_forever(args.concurrency))
+    except KeyboardInterrupt:
+        logger.info("后台任务工作进程已停止")
+
+if __name__ == "__main__":
+    main()